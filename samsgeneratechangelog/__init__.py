@@ -1,5 +1,26 @@
 """SamsGenerateChangelog helps you generate changelogs from the commits between two refs."""
-from .generatechangelog import GenerateChangelog
-from .githelper import GitHelper, FileCommit
+import importlib
 
 __all__ = ['GenerateChangelog', 'GitHelper', 'FileCommit']
+
+# The module each public name is imported from when it is first used, so that importing
+# the package (e.g. to run the command line) doesn't import git or Jinja2
+_LAZY_IMPORTS = {
+    'GenerateChangelog': '.generatechangelog',
+    'GitHelper': '.githelper',
+    'FileCommit': '.githelper',
+}
+
+
+def __getattr__(name):
+    """Import a public name from its module the first time it is used."""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List the public names along with the module's attributes."""
+    return sorted(set(globals()) | set(__all__))
@@ -1,13 +1,132 @@
 """Container for commandline entrypoints."""
+import sys
+import json
 import logging
-from .generatechangelog import GenerateChangelog
+from . import profiling
 from .config import arg_parser, arg_variable_to_dict
 
 
 def main():
-    """Entry point for gcs commandline."""
+    """Entry point for gcs commandline.
+
+    git and Jinja2 are only imported once the arguments have been parsed, so that
+    ``--help`` and argument errors are quick.
+    """
     args = arg_parser().parse_args()
     logging.basicConfig(level=args.log_level.upper())
+    if not (args.profile or args.profile_trace):
+        run(args)
+        return
+    with profiling.profile() as profiler:
+        run(args)
+    json.dump(profiler.summary(), sys.stderr, indent=2)
+    sys.stderr.write('\n')
+    if args.profile_trace:
+        profiler.write_chrome_trace(args.profile_trace)
+
+
+def run(args):
+    """Run the verb given on the commandline."""
+    if args.verb.lower() == 'serve':
+        from .server import ChangelogServer, serve
+        serve(ChangelogServer(**changelog_parameters(args)), args.host, args.port, args.socket)
+        return
+
+    if args.verb.lower() == 'export':
+        export(args)
+        return
+
+    if args.verb.lower() == 'watch':
+        watch(args)
+        return
+
+    with profiling.stage('setup'):
+        gc = create_generate_changelog(args)
+
+    if args.verb.lower() == 'print':
+        if args.stream:
+            for chunk in gc.render_markdown_stream():
+                sys.stdout.write(chunk)
+            sys.stdout.write('\n')
+        else:
+            print(gc.render_markdown())
+
+    if args.verb.lower() == 'save':
+        gc.render_markdown_to_file(
+            file_path=args.output_file,
+            entry_id=args.entry_id,
+            stream=args.stream
+        )
+
+    if args.verb.lower() == 'backfill':
+        gc.render_backfill_to_file(
+            file_path=args.output_file,
+            tag_pattern=args.tag_pattern,
+            tag_sort=args.tag_sort
+        )
+
+
+def export(args):
+    """Write the FileCommits between the refs to stdout as JSON, without importing Jinja2.
+
+    Raises:
+        ValueError: If given a manifest, which isn't supported
+    """
+    if args.manifest:
+        raise ValueError('sgc export reads a single repository, use --git-path rather than --manifest')
+    from .githelper import GitHelper
+    from .export import export_file_commits
+    from .constants import GIT_HELPER_OPTIONS
+    parameters = changelog_parameters(args)
+    with profiling.stage('setup'):
+        git_helper = GitHelper(args.git_path, **{option: parameters[option] for option in GIT_HELPER_OPTIONS})
+    with profiling.stage('export'):
+        export_file_commits(git_helper.commit_log(args.start_ref, args.end_ref), sys.stdout, args.export_format)
+
+
+def watch(args):
+    """Print the changelog, or save it if given an output file and entry ID, now and whenever its refs move.
+
+    Runs until interrupted.
+
+    Raises:
+        ValueError: If given a manifest, which isn't supported
+    """
+    if args.manifest:
+        raise ValueError('sgc watch reads a single repository, use --git-path rather than --manifest')
+    from .watch import WatchedChangelog
+    changelog = WatchedChangelog(poll_interval=args.poll_interval, **changelog_parameters(args))
+
+    def on_change(changelog):
+        if args.output_file and args.entry_id:
+            changelog.render_markdown_to_file(file_path=args.output_file, entry_id=args.entry_id, stream=args.stream)
+            logging.info(f'Updated {args.output_file} with {changelog.end_ref} at {changelog.hexshas[1]}')
+            return
+        print(changelog.render_markdown(), flush=True)
+
+    try:
+        changelog.watch(on_change)
+    except KeyboardInterrupt:
+        pass
+
+
+def create_generate_changelog(args):
+    """Import GenerateChangelog and create one configured by the commandline arguments.
+
+    A ManifestChangelog is created instead if given a manifest of many repositories.
+    """
+    parameters = changelog_parameters(args)
+    if args.manifest:
+        from .manifest import ManifestChangelog
+        for param in ['start_ref', 'end_ref', 'git_path']:
+            del parameters[param]
+        return ManifestChangelog(args.manifest, max_workers=args.manifest_workers, **parameters)
+    from .generatechangelog import GenerateChangelog
+    return GenerateChangelog(**parameters)
+
+
+def changelog_parameters(args):
+    """Return the GenerateChangelog keyword arguments given by the commandline arguments."""
     parameters = {
         param: getattr(args, param)
         for param in [
@@ -16,17 +135,22 @@ def main():
             'git_path',
             'custom_attributes',
             'template_file',
-            'template_name'
+            'template_name',
+            'template_cache_dir',
+            'cache_dir',
+            'rebuild_cache',
+            'jobs',
+            'git_backend',
+            'paths',
+            'exclude_paths',
+            'first_parent',
+            'rename_threshold',
+            'rename_limit'
         ]
     }
     parameters['template_variables'] = arg_variable_to_dict(args.var)
-    gc = GenerateChangelog(**parameters)
-
-    if args.verb.lower() == 'print':
-        print(gc.render_markdown())
-
-    if args.verb.lower() == 'save':
-        gc.render_markdown_to_file(
-            file_path=args.output_file,
-            entry_id=args.entry_id
-        )
+    parameters['use_cache'] = args.cache and not args.no_cache
+    parameters['detect_renames'] = not args.no_renames
+    parameters['aggregate_by'] = args.aggregate_by or ([] if args.aggregate else None)
+    parameters['cache_max_size'] = args.cache_max_size * 1024 * 1024
+    return parameters
@@ -1,10 +1,27 @@
 """Helpers to aid in the manipulation of changelog files."""
-import re
+import os
+import mmap
+import shutil
+import locale
 import logging
+import tempfile
+from contextlib import contextmanager, suppress
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # Windows, where changelog files are updated without a lock
+    fcntl = None
+from . import profiling
 
 
 class ChangelogFileHelper:
-    """A class to help idempotently update changelog files."""
+    """A class to help idempotently update changelog files.
+
+    Each update reads the file once, finds the entry to replace by indexing its delimiters and
+    splices the new entry in. The result is written to a temporary file which then replaces the
+    changelog, so it's never left half written, and where `fcntl` is available updates hold an
+    advisory lock on the changelog so that parallel runs can't lose each other's entries.
+    """
     markdown_comment_syntax = '[//]: # ({comment_value})'
 
     def __init__(self, file_path):
@@ -17,47 +34,95 @@ class ChangelogFileHelper:
         Places the entry at the beginning of the changelog
         if an entry with entry_id does not exist or replaces one if it does.
         """
-        if self._has_existing_entry(entry_id):
-            logging.debug(f"Found existing changelog entry for {entry_id} in {self.file_path}, replacing it.")
-            new_contents = self._replace_existing_entry(entry, entry_id)
-        else:
-            new_contents = self._prepend_entry(entry, entry_id)
-        self._overwrite_file(new_contents)
-
-    def _has_existing_entry(self, entry_id):
-        """Does a changelog entry delimited with this entry_id exist in the file already?"""
-        file_content = self._get_file_contents()
-        pattern = self._get_pattern_to_match_existing_changelog_entry(entry_id)
-        return re.search(pattern, file_content)
+        self.write_entries([(entry, entry_id)])
 
-    def _delimit_entry(self, entry, entry_id):
-        """Wrap the entry in a markdown comment to delimit its start and end.
+    def write_entries(self, entries):
+        """Write many entries to the changelog with a single read and write, as :meth:`write_entry` would in turn.
 
-        This allows us to replace it later if need be.
+        Arguments:
+            entries (iterable): ``(entry, entry_id)`` tuples
         """
-        entry_delimiter = self._generate_entry_delimiter(entry_id)
-        return f"{entry_delimiter}\n{entry}\n{entry_delimiter}"
+        with profiling.stage('file_write'), self._locked():
+            file_content = self._get_file_contents()
+            for entry, entry_id in entries:
+                file_content = self._insert_entry(file_content, entry, entry_id)
+            self._overwrite_file(file_content)
 
-    def _prepend_entry(self, entry, entry_id):
-        """Add the (delimited) entry to the beginning of the existing file contents."""
-        file_content = self._get_file_contents()
-        return f'{self._delimit_entry(entry, entry_id)}\n\n{file_content}'
+    def write_entry_stream(self, chunks, entry_id):
+        """Write an entry rendered as a stream of chunks, as :meth:`write_entry` would.
 
-    def _replace_existing_entry(self, entry, entry_id):
-        """Replace all text delimited by entry_id delimiter with entry.
+        The chunks are spooled to a temporary file which is then spliced into the changelog, which is
+        memory-mapped rather than read, so neither the entry nor the changelog is ever held in memory.
 
         Arguments:
-            entry (str): The replacement entry
+            chunks (iterable): The entry, in pieces
             entry_id (str): The ID to use as a delimiter for the changelog entry (usually semantic version number)
         """
-        file_content = self._get_file_contents()
-        pattern = self._get_pattern_to_match_existing_changelog_entry(entry_id)
-        return re.sub(pattern, self._delimit_entry(entry, entry_id), file_content)
+        with tempfile.TemporaryFile('w+') as entry_file:
+            for chunk in chunks:
+                entry_file.write(chunk)
+            entry_file.flush()
+            entry_delimiter = self._encode(self._generate_entry_delimiter(entry_id))
+            # The changelog is unmapped and closed before it's replaced, which Windows requires
+            with profiling.stage('file_write'), self._locked(), self._replacement('wb') as file, \
+                    self._mapped_file_contents() as file_content:
+                spans = self._find_entry_spans(file_content, entry_delimiter)
+                if spans:
+                    logging.debug(f"Found existing changelog entry for {entry_id} in {self.file_path}, replacing it.")
+                with memoryview(file_content) as view:
+                    position = 0
+                    for start, end in spans or [(0, 0)]:
+                        file.write(view[position:start])
+                        file.write(entry_delimiter + self._encode('\n'))
+                        entry_file.buffer.seek(0)
+                        shutil.copyfileobj(entry_file.buffer, file)
+                        file.write(self._encode('\n') + entry_delimiter)
+                        position = end
+                    if not spans:
+                        file.write(self._encode('\n\n'))
+                    file.write(view[position:])
+
+    def _insert_entry(self, file_content, entry, entry_id):
+        """Return the file content with the entry replacing an existing one with entry_id, or prepended."""
+        spans = self._find_entry_spans(file_content, self._generate_entry_delimiter(entry_id))
+        delimited_entry = self._delimit_entry(entry, entry_id)
+        if not spans:
+            return f'{delimited_entry}\n\n{file_content}'
+        logging.debug(f"Found existing changelog entry for {entry_id} in {self.file_path}, replacing it.")
+        parts = []
+        position = 0
+        for start, end in spans:
+            parts.extend([file_content[position:start], delimited_entry])
+            position = end
+        parts.append(file_content[position:])
+        return ''.join(parts)
+
+    @staticmethod
+    def _find_entry_spans(file_content, entry_delimiter):
+        """Return the ``(start, end)`` index of each pair of entry delimiters and the text between them.
+
+        Arguments:
+            file_content (str): The changelog, or its encoded bytes along with an encoded entry_delimiter
+            entry_delimiter (str): The delimiter of the entry
+        """
+        spans = []
+        start = file_content.find(entry_delimiter)
+        while start != -1:
+            end = file_content.find(entry_delimiter, start + len(entry_delimiter))
+            if end == -1:
+                break
+            end += len(entry_delimiter)
+            spans.append((start, end))
+            start = file_content.find(entry_delimiter, end)
+        return spans
+
+    def _delimit_entry(self, entry, entry_id):
+        """Wrap the entry in a markdown comment to delimit its start and end.
 
-    def _get_pattern_to_match_existing_changelog_entry(self, entry_id):
+        This allows us to replace it later if need be.
+        """
         entry_delimiter = self._generate_entry_delimiter(entry_id)
-        escaped_entry_delimiter = re.escape(entry_delimiter)
-        return re.compile(f'{escaped_entry_delimiter}.*?{escaped_entry_delimiter}', re.DOTALL)
+        return f"{entry_delimiter}\n{entry}\n{entry_delimiter}"
 
     def _generate_entry_delimiter(self, entry_id):
         """Generate a markdown comment that will serve as a delimiter.
@@ -68,13 +133,75 @@ class ChangelogFileHelper:
             comment_value=f"SamsGenerateChangelog-{entry_id}"
         )
 
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive advisory lock on the changelog, creating it if it doesn't exist.
+
+        The changelog is replaced rather than rewritten, so once locked it is checked that the
+        path still refers to the file that was locked rather than one which replaced it while waiting.
+        Without `fcntl` (i.e. on Windows) the changelog is only created, as a file can't be replaced
+        there while it is open.
+        """
+        if fcntl is None:
+            os.close(os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o666))
+            yield
+            return
+        while True:
+            fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                with suppress(FileNotFoundError):
+                    if os.path.samestat(os.fstat(fd), os.stat(self.file_path)):
+                        break
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+        try:
+            yield
+        finally:
+            # Closing the file releases the lock
+            os.close(fd)
+
+    @contextmanager
+    def _mapped_file_contents(self):
+        """Memory-map the changelog's bytes, which are empty if it's empty."""
+        with open(self.file_path, 'rb') as file:
+            if not os.fstat(file.fileno()).st_size:
+                yield b''
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    @staticmethod
+    def _encode(text):
+        """Encode text as it would be written to a file opened in text mode."""
+        return text.replace('\n', os.linesep).encode(locale.getpreferredencoding(False))
+
     def _get_file_contents(self):
         try:
-            with open(self.file_path, 'r+') as file:
+            with open(self.file_path, 'r') as file:
                 return file.read()
         except IOError:
             return ''
 
     def _overwrite_file(self, contents):
-        with open(self.file_path, 'w') as file:
+        with self._replacement() as file:
             file.write(contents)
+
+    @contextmanager
+    def _replacement(self, mode='w'):
+        """Yield a temporary file alongside the changelog which is moved over the changelog once written."""
+        directory, file_name = os.path.split(os.path.abspath(self.file_path))
+        fd, temp_path = tempfile.mkstemp(prefix=f'.{file_name}.', suffix='.tmp', dir=directory)
+        try:
+            with open(fd, mode) as file:
+                yield file
+                file.flush()
+                os.fsync(file.fileno())
+            shutil.copymode(self.file_path, temp_path)
+            os.replace(temp_path, self.file_path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
@@ -0,0 +1,230 @@
+"""Caches of the metadata and changed files of each commit, persistent and in memory."""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from .gitlog import LogCommit
+
+
+class CommitCache:
+    """A SQLite backed cache of each commit's metadata and changed files keyed by commit sha.
+
+    A commit never changes once it exists, so an entry never needs invalidating. Entries are
+    additionally keyed by a `variant` describing the diff options used to produce them
+    (e.g. rename detection) so that different options never share results.
+
+    Parameters:
+        directory (str): The directory to store the cache database in (created if need be)
+        max_size (int): The size in bytes the cached entries are evicted down to,
+            least recently used first
+        rebuild (bool): Discard every existing entry
+    """
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+    DATABASE_NAME = 'commits.sqlite'
+    _query_chunk_size = 500
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE, rebuild=False):
+        """Init CommitCache and create the database if it doesn't exist yet."""
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, self.DATABASE_NAME)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS commits ('
+                ' hexsha TEXT NOT NULL, variant TEXT NOT NULL, data TEXT NOT NULL,'
+                ' size INTEGER NOT NULL, last_used REAL NOT NULL,'
+                ' PRIMARY KEY (hexsha, variant))'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS commits_last_used ON commits (last_used)')
+        if rebuild:
+            self.clear()
+
+    @classmethod
+    def for_repo(cls, repo, directory=None, **kwargs):
+        """Return a CommitCache stored in `directory`, or under the repo's `.git` folder by default.
+
+        Returns:
+            CommitCache: or ``None`` if the cache could not be opened, in which case a warning is logged
+        """
+        directory = directory or os.path.join(repo.git_dir, 'sgc-cache')
+        try:
+            return cls(directory, **kwargs)
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f'Unable to use the commit cache in {directory}, continuing without it: {e}')
+            return None
+
+    def contains(self, hexshas, variant):
+        """Return the subset of hexshas which are cached.
+
+        Returns:
+            set
+        """
+        found = set()
+        for chunk in self._chunks(hexshas):
+            found.update(row[0] for row in self._select('hexsha', chunk, variant))
+        return found
+
+    def get_many(self, repo, hexshas, variant):
+        """Return the cached entries for hexshas.
+
+        Returns:
+            dict: ``(LogCommit, changes)`` tuples keyed by sha, where each LogCommit's
+                `hexsha_short` has still to be set
+        """
+        entries = {}
+        now = time.time()
+        for chunk in self._chunks(hexshas):
+            for hexsha, data in self._select('hexsha, data', chunk, variant):
+                entries[hexsha] = self._deserialise(repo, data)
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    'UPDATE commits SET last_used = ? WHERE hexsha = ? AND variant = ?',
+                    [(now, hexsha, variant) for hexsha in chunk]
+                )
+        return entries
+
+    def put_many(self, entries, variant):
+        """Store ``(LogCommit, changes)`` tuples."""
+        now = time.time()
+        rows = []
+        for commit, changes in entries:
+            data = self._serialise(commit, changes)
+            rows.append((commit.hexsha, variant, data, len(data), now))
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?)', rows)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is no larger than max_size."""
+        with self._lock, self._connection:
+            total_size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM commits').fetchone()[0]
+            if total_size <= self.max_size:
+                return
+            logging.debug(f'Commit cache is {total_size} bytes, evicting down to {self.max_size}')
+            excess = total_size - self.max_size
+            cursor = self._connection.execute('SELECT hexsha, variant, size FROM commits ORDER BY last_used')
+            evicted = []
+            for hexsha, variant, size in cursor:
+                if excess <= 0:
+                    break
+                evicted.append((hexsha, variant))
+                excess -= size
+            self._connection.executemany('DELETE FROM commits WHERE hexsha = ? AND variant = ?', evicted)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM commits')
+
+    def _select(self, columns, hexshas, variant):
+        placeholders = ', '.join('?' * len(hexshas))
+        with self._lock:
+            return self._connection.execute(
+                f'SELECT {columns} FROM commits WHERE variant = ? AND hexsha IN ({placeholders})',
+                [variant, *hexshas]
+            ).fetchall()
+
+    def _chunks(self, hexshas):
+        hexshas = list(hexshas)
+        for start in range(0, len(hexshas), self._query_chunk_size):
+            yield hexshas[start:start + self._query_chunk_size]
+
+    @staticmethod
+    def _serialise(commit, changes):
+        return json.dumps([commit.to_fields(), changes])
+
+    @staticmethod
+    def _deserialise(repo, data):
+        fields, changes = json.loads(data)
+        return LogCommit.from_fields(repo, fields), [tuple(change) for change in changes]
+
+
+class MemoryCommitCache:
+    """An in-memory cache of each commit's LogCommit and changed files, with the same interface as CommitCache.
+
+    Used by long-lived processes (e.g. ``sgc serve``) so that commits are only ever read once. Entries are
+    kept as they are rather than serialised, so a cached LogCommit is shared by every read of it.
+    Any entry missing from memory is looked for in the `backing` cache, which new entries are also
+    written to, so that a new process starts warm.
+
+    Parameters:
+        max_commits (int): The number of entries to evict down to, least recently used first
+        backing (CommitCache): A persistent cache to read through and write to, or ``None``
+    """
+    DEFAULT_MAX_COMMITS = 200000
+
+    def __init__(self, max_commits=DEFAULT_MAX_COMMITS, backing=None):
+        """Init MemoryCommitCache empty."""
+        self.max_commits = max_commits
+        self.backing = backing
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, hexshas, variant):
+        """Return the subset of hexshas which are cached, in memory or by the backing cache.
+
+        Returns:
+            set
+        """
+        with self._lock:
+            found = {hexsha for hexsha in hexshas if (hexsha, variant) in self._entries}
+        if self.backing is not None:
+            found.update(self.backing.contains([hexsha for hexsha in hexshas if hexsha not in found], variant))
+        return found
+
+    def get_many(self, repo, hexshas, variant):
+        """Return the cached entries for hexshas, copying any only held by the backing cache into memory.
+
+        Returns:
+            dict: ``(LogCommit, changes)`` tuples keyed by sha
+        """
+        entries = {}
+        with self._lock:
+            for hexsha in hexshas:
+                entry = self._entries.get((hexsha, variant))
+                if entry is not None:
+                    self._entries.move_to_end((hexsha, variant))
+                    entries[hexsha] = entry
+        missing = [hexsha for hexsha in hexshas if hexsha not in entries]
+        if missing and self.backing is not None:
+            backed = self.backing.get_many(repo, missing, variant)
+            self._put(backed.values(), variant)
+            entries.update(backed)
+        return entries
+
+    def put_many(self, entries, variant):
+        """Store ``(LogCommit, changes)`` tuples, in memory and in the backing cache."""
+        entries = list(entries)
+        self._put(entries, variant)
+        if self.backing is not None:
+            self.backing.put_many(entries, variant)
+
+    def _put(self, entries, variant):
+        with self._lock:
+            for commit, changes in entries:
+                self._entries[(commit.hexsha, variant)] = (commit, changes)
+                self._entries.move_to_end((commit.hexsha, variant))
+
+    def evict(self):
+        """Remove the least recently used entries until no more than max_commits are held in memory."""
+        with self._lock:
+            while len(self._entries) > self.max_commits:
+                self._entries.popitem(last=False)
+        if self.backing is not None:
+            self.backing.evict()
+
+    def clear(self):
+        """Remove every entry, from the backing cache too."""
+        with self._lock:
+            self._entries.clear()
+        if self.backing is not None:
+            self.backing.clear()
+
+    def __len__(self):
+        """Return the number of entries held in memory."""
+        return len(self._entries)
@@ -2,7 +2,7 @@
 import sys
 import json
 import configargparse
-from .generatechangelog import GenerateChangelog
+from .constants import GIT_BACKENDS, TEMPLATE_NAMES, DEFAULT_MANIFEST_WORKERS, EXPORT_FORMATS
 
 
 def arg_variable_to_dict(arg_values):
@@ -15,6 +15,10 @@ def arg_variable_to_dict(arg_values):
 
 def arg_parser():
     """Returns a configured ArgParser object from configargparse."""
+    # The refs come from the tags when backfilling, each request when serving and the manifest if given
+    refs_required = not any(
+        arg in ('backfill', 'serve', '--manifest') or arg.startswith('--manifest=') for arg in sys.argv
+    )
     parser = configargparse.ArgParser(
         default_config_files=['.sgc'],
         config_file_parser_class=configargparse.YAMLConfigFileParser,
@@ -22,7 +26,7 @@ def arg_parser():
     )
     parser.add(
         'verb',
-        choices=['print', 'save'],
+        choices=['print', 'save', 'backfill', 'serve', 'export', 'watch'],
         default='print'
     )
     parser.add(
@@ -35,13 +39,13 @@ def arg_parser():
     parser.add(
         '--start-ref',
         env_var='SGC_start_ref',
-        required=True,
+        required=refs_required,
         help='The commit sha or git ref (tag/head/etc) that the comparison will start from'
     )
     parser.add(
         '--end-ref',
         env_var='SGC_end_ref',
-        required=True,
+        required=refs_required,
         help='The commit sha or git ref (tag/head/etc) that the comparison will end at'
     )
     parser.add(
@@ -59,6 +63,22 @@ def arg_parser():
         env_var='SGC_git_path',
         help='The path (relative to the cwd or absolute) that contains the `.git` folder'
     )
+    parser.add(
+        '--manifest',
+        required=False,
+        default=None,
+        env_var='SGC_manifest',
+        help='The path to a YAML manifest listing the git-path, start-ref and end-ref of many repositories '
+             'to generate a single changelog from, rather than --git-path, --start-ref and --end-ref'
+    )
+    parser.add(
+        '--manifest-workers',
+        required=False,
+        default=DEFAULT_MANIFEST_WORKERS,
+        type=int,
+        env_var='SGC_manifest_workers',
+        help='The number of repositories listed by --manifest to read at once'
+    )
     parser.add(
         '--template-file',
         required=False,
@@ -71,7 +91,84 @@ def arg_parser():
         default='author_by_change_type',
         env_var='SGC_template_name',
         help='The name of one of the templates bundled with the SamsGenerateChangelog package',
-        choices=GenerateChangelog.get_template_names(),
+        choices=TEMPLATE_NAMES,
+    )
+    parser.add(
+        '--template-cache-dir',
+        required=False,
+        default=None,
+        env_var='SGC_template_cache_dir',
+        help='A directory to cache compiled Jinja2 templates in between runs'
+    )
+    parser.add(
+        '--path',
+        dest='paths',
+        action='append',
+        required=False,
+        env_var='SGC_path',
+        help='Only include files matching this path or glob pattern (relative to the root of the repo), '
+        'may be given more than once'
+    )
+    parser.add(
+        '--exclude',
+        dest='exclude_paths',
+        action='append',
+        required=False,
+        env_var='SGC_exclude',
+        help='Exclude files matching this path or glob pattern (relative to the root of the repo), '
+        'may be given more than once'
+    )
+    parser.add(
+        '--first-parent',
+        required=False,
+        action='store_true',
+        env_var='SGC_first_parent',
+        help='Only walk the first parent of each commit and include merge commits, diffed against their first '
+        'parent, rather than the commits they merged'
+    )
+    parser.add(
+        '--no-renames',
+        required=False,
+        action='store_true',
+        env_var='SGC_no_renames',
+        help="Don't detect renamed files and report them as deleted and added instead, "
+        'which is much faster for commits that add and delete thousands of files '
+        '(it can not be combined with --rename-threshold or --rename-limit)'
+    )
+    parser.add(
+        '--rename-threshold',
+        required=False,
+        default=None,
+        type=int,
+        env_var='SGC_rename_threshold',
+        help="The percentage similarity for a deleted and added file to be a rename (defaults to git's 50), "
+        '100 only detects renames of identical files, which is fast'
+    )
+    parser.add(
+        '--rename-limit',
+        required=False,
+        default=None,
+        type=int,
+        env_var='SGC_rename_limit',
+        help='Only detect renames of files which are not identical in commits with at most this many added '
+        "and deleted files (defaults to git's limit), 0 for no limit"
+    )
+    parser.add(
+        '--aggregate',
+        required=False,
+        action='store_true',
+        env_var='SGC_aggregate',
+        help='Pass the template one record per changed path, with its latest and first file commit, change count '
+        'and authors, rather than a record per file per commit'
+    )
+    parser.add(
+        '--aggregate-by',
+        dest='aggregate_by',
+        action='append',
+        required=False,
+        env_var='SGC_aggregate_by',
+        help='Aggregate each value of this file commit attribute (e.g. `author.name`) separately, implies '
+        '--aggregate and may be given more than once'
     )
     parser.add(
         '--custom-attributes',
@@ -82,7 +179,7 @@ def arg_parser():
     )
     parser.add(
         '--output-file',
-        required='save' in sys.argv,
+        required='save' in sys.argv or 'backfill' in sys.argv,
         env_var='SGC_output_file',
         help='The path to a changelog file to update',
     )
@@ -93,6 +190,138 @@ def arg_parser():
         help='An ID unique to this changelog entry that can be used to '
         'update it in future if required (normally the semantic version)',
     )
+    parser.add(
+        '--tag-pattern',
+        required=False,
+        default=None,
+        env_var='SGC_tag_pattern',
+        help='Only backfill entries for tags whose names match this glob, e.g. `v*`'
+    )
+    parser.add(
+        '--tag-sort',
+        required=False,
+        default='creatordate',
+        env_var='SGC_tag_sort',
+        help='The `git for-each-ref` key to order tags by when backfilling, e.g. `creatordate` or `version:refname`'
+    )
+    parser.add(
+        '--stream',
+        required=False,
+        action='store_true',
+        env_var='SGC_stream',
+        help='Write the changelog entry out as it is rendered rather than rendering it all first, '
+        'so that memory use does not grow with the size of the entry'
+    )
+    parser.add(
+        '--export-format',
+        required=False,
+        default='ndjson',
+        choices=EXPORT_FORMATS,
+        env_var='SGC_export_format',
+        help='How `sgc export` writes each file commit, a JSON object per line (ndjson) or a single JSON array (json)'
+    )
+    parser.add(
+        '--jobs',
+        required=False,
+        default=1,
+        type=int,
+        env_var='SGC_jobs',
+        help='The number of worker processes to read and diff commits with'
+    )
+    parser.add(
+        '--git-backend',
+        required=False,
+        default='subprocess',
+        choices=GIT_BACKENDS,
+        env_var='SGC_git_backend',
+        help='How commits are read: `subprocess` streams them from `git log`, '
+        '`batch` reads them one at a time through long-lived git processes and '
+        '`native` reads them straight from the `.git` folder without running git (it refuses repositories '
+        'with replacement objects and only resolves refs and shas with ~, ^ and ^{commit} suffixes, '
+        'not e.g. @{1} or :/text)'
+    )
+    parser.add(
+        '--cache',
+        required=False,
+        action='store_true',
+        env_var='SGC_cache',
+        help="Keep a persistent cache of each commit's metadata and changed files (a SQLite database of up to "
+        '--cache-max-size megabytes in --cache-dir), so that later runs only read new commits from git'
+    )
+    parser.add(
+        '--no-cache',
+        required=False,
+        action='store_true',
+        env_var='SGC_no_cache',
+        help="Don't read or write the commit cache even if --cache is set, e.g. in a config file"
+    )
+    parser.add(
+        '--rebuild-cache',
+        required=False,
+        action='store_true',
+        env_var='SGC_rebuild_cache',
+        help='Discard the existing commit cache entries and rebuild them'
+    )
+    parser.add(
+        '--cache-dir',
+        required=False,
+        default=None,
+        env_var='SGC_cache_dir',
+        help='The directory to keep the commit cache in (defaults to `sgc-cache` inside the `.git` folder)'
+    )
+    parser.add(
+        '--cache-max-size',
+        required=False,
+        default=256,
+        type=int,
+        env_var='SGC_cache_max_size',
+        help='The size in megabytes that the commit cache is evicted down to, least recently used first'
+    )
+    parser.add(
+        '--host',
+        required=False,
+        default='127.0.0.1',
+        env_var='SGC_host',
+        help='The address for `sgc serve` to listen on'
+    )
+    parser.add(
+        '--port',
+        required=False,
+        default=8000,
+        type=int,
+        env_var='SGC_port',
+        help='The port for `sgc serve` to listen on'
+    )
+    parser.add(
+        '--socket',
+        required=False,
+        default=None,
+        env_var='SGC_socket',
+        help='The path of a Unix socket for `sgc serve` to listen on rather than a port'
+    )
+    parser.add(
+        '--poll-interval',
+        required=False,
+        default=1.0,
+        type=float,
+        env_var='SGC_poll_interval',
+        help='How many seconds `sgc watch` waits between checking whether the refs have moved'
+    )
+    parser.add(
+        '--profile',
+        required=False,
+        action='store_true',
+        env_var='SGC_profile',
+        help='Print a JSON summary of the time spent in each stage and the git processes, '
+        'commits and files processed to stderr'
+    )
+    parser.add(
+        '--profile-trace',
+        required=False,
+        default=None,
+        env_var='SGC_profile_trace',
+        help='The path to write a Chrome trace (viewable in chrome://tracing) of each stage to, implies --profile'
+    )
 
     parser.add(
         '--log-level',
@@ -0,0 +1,30 @@
+"""Values the command line needs, kept apart so that its arguments can be parsed without importing git or Jinja2."""
+import os
+
+MODULE_DIR = os.path.dirname(os.path.realpath(__file__))
+TEMPLATES_DIR = os.path.sep.join([MODULE_DIR, 'templates'])
+
+# The templates bundled in TEMPLATES_DIR, listed here so that they're known without listing the directory
+TEMPLATE_NAMES = (
+    'author_all_commits',
+    'author_by_change_type',
+    'change_type_all_commits',
+    'jira_id_all_commits',
+    'jira_id_by_change_type',
+    'root_folder_all_commits',
+)
+
+# The ways commits and their changed files can be read, see GitHelper
+GIT_BACKENDS = ('subprocess', 'batch', 'native')
+
+# The number of repositories listed by a manifest that are read at once, see ManifestChangelog
+DEFAULT_MANIFEST_WORKERS = 8
+
+# The GenerateChangelog arguments which configure how commits are read by GitHelper
+GIT_HELPER_OPTIONS = (
+    'custom_attributes', 'use_cache', 'cache_dir', 'rebuild_cache', 'cache_max_size', 'jobs', 'git_backend',
+    'paths', 'exclude_paths', 'first_parent', 'detect_renames', 'rename_threshold', 'rename_limit'
+)
+
+# The formats FileCommits can be exported in, see export_file_commits
+EXPORT_FORMATS = ('ndjson', 'json')
@@ -0,0 +1,112 @@
+"""Derive custom attributes of each changed file from its commit or path."""
+import re
+import sys
+import logging
+
+
+class CustomAttributes:
+    """Custom attributes with their patterns compiled once, ready to be applied to many FileCommits.
+
+    An attribute derived from a commit level source (e.g. `message` or `author`) has the same value
+    for every file in a commit, so it is only evaluated for the first file of each commit and
+    shared by the rest. Attributes derived from the file (e.g. `file_path`) are evaluated per file.
+
+    Each file's values are kept as a tuple ordered by :attr:`names` rather than a dictionary,
+    and files with the same values share a single tuple.
+
+    Parameters:
+        custom_attributes (dict): A dictionary of custom attributes with the attribute name as the key,
+            and subkeys of `pattern` and `derived_from`
+    """
+    # Sources which differ between the files of a single commit
+    FILE_SOURCES = ('file_path', 'change_type', 'friendly_change_type')
+    _max_shared_values = 4096
+
+    def __init__(self, custom_attributes=None):
+        """Init CustomAttributes by compiling each attribute's pattern."""
+        self.specs = custom_attributes or {}
+        self.commit_attributes = []
+        self.file_attributes = []
+        file_level = set(self.FILE_SOURCES)
+        for name, attribute_spec in self.specs.items():
+            logging.debug(f"Compiling custom attribute {name} "
+                          f"using {attribute_spec['pattern']} against {attribute_spec['derived_from']}")
+            attribute = (name, attribute_spec['derived_from'], re.compile(attribute_spec['pattern'], re.IGNORECASE))
+            if attribute_spec['derived_from'] in file_level:
+                # Anything derived from a file level attribute is file level too
+                file_level.add(name)
+                self.file_attributes.append(attribute)
+            else:
+                self.commit_attributes.append(attribute)
+        self.names = tuple(name for name, _, _ in self.commit_attributes + self.file_attributes)
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self._last_commit = None
+        self._last_commit_values = {}
+        self._shared_values = {}
+
+    @classmethod
+    def from_spec(cls, custom_attributes):
+        """Return `custom_attributes` if already compiled, otherwise compile them."""
+        if isinstance(custom_attributes, cls):
+            return custom_attributes
+        return cls(custom_attributes)
+
+    @property
+    def sources(self):
+        """The names of the attributes that custom attributes are derived from.
+
+        Returns:
+            set
+        """
+        return {attribute_spec['derived_from'] for attribute_spec in self.specs.values()}
+
+    def __bool__(self):
+        """Whether there are any custom attributes."""
+        return bool(self.specs)
+
+    def evaluate(self, file_commit):
+        """Return every custom attribute's value for a FileCommit, in the order of :attr:`names`.
+
+        Returns:
+            tuple
+        """
+        values = {}
+        if self.commit_attributes:
+            commit = file_commit.commit
+            last_commit, last_commit_values = self._last_commit, self._last_commit_values
+            if last_commit is not commit:
+                last_commit_values = self._apply(self.commit_attributes, file_commit, {})
+                self._last_commit, self._last_commit_values = commit, last_commit_values
+            values.update(last_commit_values)
+        self._apply(self.file_attributes, file_commit, values)
+        result = tuple(values[name] for name in self.names)
+        if len(self._shared_values) >= self._max_shared_values:
+            self._shared_values.clear()
+        return self._shared_values.setdefault(result, result)
+
+    def _apply(self, attributes, file_commit, values):
+        for name, derived_from, pattern in attributes:
+            if derived_from in values:
+                source = values[derived_from]
+            else:
+                source = getattr(file_commit, derived_from) or getattr(file_commit.commit, derived_from)
+            if not isinstance(source, (str, bytes)):
+                # e.g. an Actor, which is matched against its name
+                source = str(source)
+            values[name] = sys.intern(first_matching_group(pattern, source))
+        return values
+
+
+def first_matching_group(pattern, string):
+    """Return the first non-empty group matched by the compiled `pattern`, or the whole match if it has none.
+
+    Returns:
+        str: or an empty string if nothing matches
+    """
+    match = pattern.search(string)
+    if not match:
+        return ''
+    groups = [group for group in match.groups() if group]
+    if groups:
+        return groups[0]
+    return match.group(0)
@@ -17,7 +17,19 @@ class DebugOutput:
         return self.__class__(self.func.__get__(obj, type_), type_)
 
     def __call__(self, *args, **kwargs):
-        """Execute the decorated method and log the number of results."""
+        """Execute the decorated method and log the number of results.
+
+        Results without a length, such as generators, are counted as they are consumed
+        and logged once they are exhausted.
+        """
         result = self.func(*args, **kwargs)
+        if not hasattr(result, '__len__'):
+            return self._counted(result)
         logging.debug(f"Returned {len(result)} values from {self.func.__name__}")
         return result
+
+    def _counted(self, result):
+        count = 0
+        for count, value in enumerate(result, 1):
+            yield value
+        logging.debug(f"Returned {count} values from {self.func.__name__}")
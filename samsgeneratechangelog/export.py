@@ -0,0 +1,87 @@
+"""Export FileCommits as JSON for other tools, without rendering a template."""
+import json
+from json.encoder import encode_basestring_ascii as encode_string
+from datetime import datetime, timezone
+from .constants import EXPORT_FORMATS
+
+
+def file_commit_records(file_commits):
+    """Yield each FileCommit as a JSON object on a single line.
+
+    Each object has the commit's `hexsha`, `hexsha_short`, `parent_hexshas`, `author` and `committer`
+    (each with a `name` and `email`), `authored_date` and `committed_date` (as ISO 8601 in UTC) and
+    `message`, followed by the file's `file_path`, `change_type` (e.g. `A`), its `repository` if it was
+    read from a manifest, and its `custom_attributes` if there are any. The commit's part is only
+    serialised once, however many of its files follow it.
+
+    Args:
+        file_commits (iterable): FileCommit objects, e.g. from :meth:`GitHelper.commit_log`
+
+    Returns:
+        iterator: str
+    """
+    commit, commit_json = None, None
+    for file_commit in file_commits:
+        if file_commit.commit is not commit:
+            commit = file_commit.commit
+            # Without its closing brace, so that the file's fields can follow
+            commit_json = json.dumps({
+                'hexsha': commit.hexsha,
+                'hexsha_short': file_commit.hexsha_short,
+                'parent_hexshas': list(commit.parent_hexshas),
+                'author': _actor(commit.author),
+                'authored_date': _iso_date(commit.authored_date),
+                'committer': _actor(commit.committer),
+                'committed_date': _iso_date(commit.committed_date),
+                'message': commit.message,
+            })[:-1]
+        # Change types are single letters which never need escaping
+        record = f'{commit_json}, "file_path": {encode_string(file_commit.file_path)}, ' \
+            f'"change_type": "{file_commit.change_type}"'
+        if file_commit.repository is not None:
+            record += f', "repository": {encode_string(file_commit.repository)}'
+        custom_attribute_values = file_commit.custom_attribute_values
+        if custom_attribute_values:
+            record += f', "custom_attributes": {json.dumps(custom_attribute_values, default=str)}'
+        yield record + '}'
+
+
+def export_file_commits(file_commits, writer, export_format='ndjson'):
+    """Write FileCommits to a file as JSON as they are read, so that memory use doesn't grow with their number.
+
+    Args:
+        file_commits (iterable): FileCommit objects, e.g. from :meth:`GitHelper.commit_log`
+        writer (file): A text file to write to, e.g. `sys.stdout`
+        export_format (str): `ndjson` to write a line per FileCommit, as :func:`file_commit_records` does,
+            or `json` to write a single array of them
+
+    Returns:
+        int: The number of FileCommits written
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format {export_format}, expected one of {", ".join(EXPORT_FORMATS)}')
+    json_array = export_format == 'json'
+    if json_array:
+        writer.write('[')
+    count = 0
+    for record in file_commit_records(file_commits):
+        if json_array:
+            writer.write(',\n' if count else '\n')
+            writer.write(record)
+        else:
+            writer.write(record + '\n')
+        count += 1
+    if json_array:
+        writer.write('\n]\n')
+    return count
+
+
+def _actor(actor):
+    return {'name': actor.name, 'email': actor.email}
+
+
+def _iso_date(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
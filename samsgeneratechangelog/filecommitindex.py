@@ -0,0 +1,238 @@
+"""An index of FileCommits which groups them in Python rather than with Jinja filters, and folds them per path."""
+
+
+class Group:
+    """A group of FileCommits sharing the same value of an attribute.
+
+    Like the groups returned by Jinja's ``groupby`` filter it unpacks as ``grouper, list``.
+
+    Attributes:
+        grouper: The value of the attribute the group was grouped by, as held by its first FileCommit
+        list (list): The FileCommits in their original order or, when grouped by further
+            attributes, the next level of groups
+        latest (FileCommit): The FileCommit with the latest `committed_date`, the last of any that are equal
+    """
+    __slots__ = ('grouper', 'list', 'latest')
+
+    def __init__(self, grouper, items, latest):
+        """Init Group with its grouper, items and latest FileCommit."""
+        self.grouper = grouper
+        self.list = items
+        self.latest = latest
+
+    def __iter__(self):
+        """Iterate over ``grouper, list`` so a Group unpacks like a Jinja group."""
+        return iter((self.grouper, self.list))
+
+    def sorted(self, attribute):
+        """Return the group's FileCommits or subgroups sorted by an attribute, as Jinja's ``sort`` filter would."""
+        return sorted(self.list, key=_sort_key(attribute))
+
+    def __repr__(self):
+        """Return representation of the group."""
+        return f'Group({self.grouper!r}, {len(self.list)} items)'
+
+
+class FileCommitIndex:
+    """FileCommits grouped by any attributes in a single linear pass.
+
+    The FileCommits are read from the iterable the index is created with the first time they are
+    needed, after which the index can be iterated any number of times. Groups produced by
+    :meth:`by` are cached, and are ordered and built exactly as the Jinja filters
+    ``groupby(attribute) | sort(attribute='grouper')`` would, i.e. case insensitively.
+
+    Parameters:
+        file_commits (iterable): The FileCommits to index
+    """
+
+    def __init__(self, file_commits):
+        """Init FileCommitIndex without reading the FileCommits yet."""
+        self._source = file_commits
+        self._file_commits = None
+        self._groups = {}
+
+    @property
+    def file_commits(self):
+        """Every FileCommit, in their original order.
+
+        Returns:
+            list
+        """
+        if self._file_commits is None:
+            self._file_commits = list(self._source)
+            self._source = None
+        return self._file_commits
+
+    def __iter__(self):
+        """Iterate over the FileCommits in their original order."""
+        return iter(self.file_commits)
+
+    def __len__(self):
+        """Return the number of FileCommits."""
+        return len(self.file_commits)
+
+    def by(self, *attributes):
+        """Group the FileCommits by each of one or more attributes in turn, which may be dotted (``author.name``).
+
+        Returns:
+            list: :class:`Group` objects ordered by their grouper, each grouped by the
+                next attribute in turn
+        """
+        if attributes not in self._groups:
+            getters = [_attribute_getter(attribute) for attribute in attributes]
+            get_committed_date = _attribute_getter('committed_date')
+            root = _Node(None)
+            for file_commit in self.file_commits:
+                committed_date = get_committed_date(file_commit)
+                node = root
+                for get in getters:
+                    value = get(file_commit)
+                    key = _ignore_case(value)
+                    child = node.children.get(key)
+                    if child is None:
+                        child = node.children[key] = _Node(value)
+                    node = child
+                    if node.latest is None or committed_date >= node.latest_date:
+                        node.latest, node.latest_date = file_commit, committed_date
+                node.items.append(file_commit)
+            self._groups[attributes] = root.groups()
+        return self._groups[attributes]
+
+    def sorted(self, attribute):
+        """Return the FileCommits sorted by an attribute, as Jinja's ``sort`` filter would."""
+        return sorted(self.file_commits, key=_sort_key(attribute))
+
+
+class PathAggregate:
+    """Every change to a single path (within one value of each attribute aggregated by) folded together.
+
+    It stands in for its latest FileCommit, so that any attribute it doesn't have itself is read from
+    that FileCommit and a :class:`FileCommitIndex` groups it just as it would that FileCommit.
+
+    Parameters:
+        file_commit (FileCommit): The first FileCommit of the path to fold
+        group (tuple): The values of the attributes aggregated by
+
+    Attributes:
+        group (tuple): The values of the attributes aggregated by
+        latest (FileCommit): The FileCommit with the latest `committed_date`, the last of any that are equal
+            as for :attr:`Group.latest`
+        first (FileCommit): The FileCommit with the earliest `committed_date`, the last of any that are equal
+            (i.e. the oldest by ``git log``)
+        count (int): The number of FileCommits folded in
+    """
+    __slots__ = ('group', 'latest', 'first', 'count', '_latest_date', '_first_date', '_authors')
+
+    def __init__(self, file_commit, group=()):
+        """Init PathAggregate with its first FileCommit."""
+        self.group = group
+        self.latest = self.first = file_commit
+        self._latest_date = self._first_date = file_commit.commit.committed_date
+        self.count = 1
+        self._authors = (file_commit.author,)
+
+    def add(self, file_commit):
+        """Fold another FileCommit of the same path in."""
+        committed_date = file_commit.commit.committed_date
+        if committed_date >= self._latest_date:
+            self.latest, self._latest_date = file_commit, committed_date
+        if committed_date <= self._first_date:
+            self.first, self._first_date = file_commit, committed_date
+        self.count += 1
+        author = file_commit.author
+        if author not in self._authors:
+            self._authors += (author,)
+
+    # The attributes templates group and sort by most, which are quicker to read as properties than through __getattr__
+    file_path = property(lambda self: self.latest.file_path)
+    change_type = property(lambda self: self.latest.change_type)
+    friendly_change_type = property(lambda self: self.latest.friendly_change_type)
+    author = property(lambda self: self.latest.author)
+    committed_date = property(lambda self: self.latest.committed_date)
+
+    @property
+    def authors(self):
+        """The :class:`~git.util.Actor` of everyone who changed the path, in the order they were folded in.
+
+        Returns:
+            list
+        """
+        return list(self._authors)
+
+    def __getattr__(self, attr):
+        """Return the attribute of the latest FileCommit."""
+        if attr in PathAggregate.__slots__:
+            raise AttributeError(attr)
+        return getattr(self.latest, attr)
+
+    def __repr__(self):
+        """Return representation of the path aggregate."""
+        return f'PathAggregate({self.latest.file_path}, {self.group}, {self.count} changes)'
+
+
+def aggregate_file_commits(file_commits, attributes=()):
+    """Fold FileCommits into a :class:`PathAggregate` for each path, as they are streamed.
+
+    Only the aggregates are kept, so memory grows with the number of distinct paths rather than
+    the number of file changes. Templates which only show the latest change to each path
+    (e.g. ``by('author.name', 'friendly_change_type', 'file_path')``) render the same from the aggregates
+    as from the FileCommits, so long as every attribute they group by before the path is aggregated by.
+
+    Arguments:
+        file_commits (iterable): The FileCommits to fold, which are read the first time an aggregate is needed
+        attributes (iterable): Attributes, which may be dotted (``author.name``), whose values are aggregated
+            separately, e.g. so that each author's changes to a path are folded on their own
+
+    Returns:
+        iterator: The PathAggregates, in the order their paths were first seen
+    """
+    getters = [_attribute_getter(attribute) for attribute in attributes]
+    aggregates = {}
+    for file_commit in file_commits:
+        group = tuple(get(file_commit) for get in getters)
+        # Keyed by the path alone unless aggregating by attributes, which saves a tuple per path
+        key = (*group, file_commit.file_path) if group else file_commit.file_path
+        aggregate = aggregates.get(key)
+        if aggregate is None:
+            aggregates[key] = PathAggregate(file_commit, group)
+        else:
+            aggregate.add(file_commit)
+    yield from aggregates.values()
+
+
+class _Node:
+    """A group while the index is being built, its children are keyed by their case insensitive grouper."""
+    __slots__ = ('grouper', 'children', 'items', 'latest', 'latest_date')
+
+    def __init__(self, grouper):
+        self.grouper = grouper
+        self.children = {}
+        self.items = []
+        self.latest = None
+        self.latest_date = None
+
+    def groups(self):
+        return [
+            Group(child.grouper, child.groups() if child.children else child.items, child.latest)
+            for _, child in sorted(self.children.items(), key=lambda item: item[0])
+        ]
+
+
+def _attribute_getter(attribute):
+    parts = attribute.split('.')
+
+    def get(item):
+        for part in parts:
+            item = getattr(item, part)
+        return item
+    return get
+
+
+def _sort_key(attribute):
+    get = _attribute_getter(attribute)
+    return lambda item: _ignore_case(get(item))
+
+
+def _ignore_case(value):
+    """Lower case strings, as Jinja's filters do unless asked to be case sensitive."""
+    return value.lower() if isinstance(value, str) else value
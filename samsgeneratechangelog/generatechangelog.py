@@ -1,25 +1,53 @@
 """Generate a changelog from git commit history."""
 import os
-from jinja2 import Environment, FileSystemLoader
+import asyncio
+import functools
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from .githelper import GitHelper
 from .changelogfilehelper import ChangelogFileHelper
-
-MODULE_DIR = os.path.dirname(os.path.realpath(__file__))
-TEMPLATES_DIR = os.path.sep.join([MODULE_DIR, 'templates'])
+from .commitcache import CommitCache
+from .filecommitindex import FileCommitIndex, aggregate_file_commits
+from . import profiling
+from .constants import MODULE_DIR, TEMPLATES_DIR, TEMPLATE_NAMES  # noqa: F401
 
 
 class GenerateChangelog:
     """Generate a changelog by rendering a simple but flexible CommitFile object using jinja2.
 
     Parameters:
-        start_ref (string): The commit sha or git ref (tag/head/etc) that the comparison will start from
-        end_ref (string): The commit sha or git ref (tag/head/etc) that the comparison will end at
+        start_ref (string): The commit sha or git ref (tag/head/etc) that the comparison will start from,
+            not needed to backfill
+        end_ref (string): The commit sha or git ref (tag/head/etc) that the comparison will end at,
+            not needed to backfill
         template_variables (dict): A dict of variables to pass to Jinja's Template
         git_path (string): The path (relative to the cwd or absolute) that contains the `.git` folder
         template_file (string): The path (relative to the cwd or absolute) to a custom jinja2 template file
         template_name (string): The name of one of the templates bundled with the SamsGenerateChangelog package
         custom_attributes (dict): A dictionary of of custom attributes to make available under each file object
             in the template
+        use_cache (bool): Whether to keep each commit's metadata and changed files in a persistent cache
+        cache_dir (string): The directory to keep the cache in, defaults to `sgc-cache` inside the `.git` folder
+        rebuild_cache (bool): Discard the existing cache entries before use
+        cache_max_size (int): The size in bytes to evict the cache down to after each use
+        jobs (int): The number of worker processes to read commits with
+        git_backend (str): How commits are read, `subprocess` (the default), `batch` or `native`
+        template_cache_dir (string): A directory to cache compiled templates in between runs
+        paths (list): Only include files matching these paths or glob patterns (relative to the root of the repo),
+            commits which change none of them aren't read at all
+        exclude_paths (list): Exclude files matching these paths or glob patterns
+        first_parent (bool): Only walk the mainline, diffing each merge against its first parent so that
+            a merged branch's changes appear once, under the merge, rather than commit by commit
+        detect_renames (bool): Detect renamed files, otherwise they are reported as deleted and added,
+            which is much faster for commits that add and delete thousands of files
+        rename_threshold (int): The percentage similarity for a deleted and added file to be a rename,
+            defaults to git's 50%
+        rename_limit (int): Only detect renames of files which aren't identical in commits with at most
+            this many added and deleted files, defaults to git's limit and is unlimited if 0
+        aggregate_by (list): Fold the file commits into a
+            :class:`~samsgeneratechangelog.filecommitindex.PathAggregate` per path and value of each of these
+            attributes (which may be empty) as they are read, and pass the aggregates to the template instead
+        git_helper (GitHelper): An existing GitHelper to read commits with, e.g. one shared by many changelogs,
+            in which case every option about reading commits (from `git_path` to `rename_limit`) is ignored
     """
     _templates_requiring_custom_attributes = [
         'jira_id_all_commits',
@@ -27,9 +55,16 @@ class GenerateChangelog:
         'root_folder_all_commits'
     ]
 
-    def __init__(self, start_ref, end_ref, git_path='.', template_variables=None,
+    # How many of the template's output chunks are joined together by render_markdown_stream
+    _stream_buffer_size = 64
+
+    def __init__(self, start_ref=None, end_ref=None, git_path='.', template_variables=None,
                  custom_attributes=None, template_file=None,
-                 template_name='author_by_change_type'):
+                 template_name='author_by_change_type', use_cache=False, cache_dir=None,
+                 rebuild_cache=False, cache_max_size=CommitCache.DEFAULT_MAX_SIZE, jobs=1,
+                 git_backend='subprocess', template_cache_dir=None, paths=None, exclude_paths=None,
+                 first_parent=False, detect_renames=True, rename_threshold=None, rename_limit=None,
+                 aggregate_by=None, git_helper=None):
         """Inits GenerateChangeLog.
 
         Attributes:
@@ -39,6 +74,7 @@ class GenerateChangelog:
             git_path,
             custom_attributes,
             template_file
+            template_cache_dir
             git_helper
         """
         self.start_ref = start_ref
@@ -48,19 +84,30 @@ class GenerateChangelog:
         self.custom_attributes = custom_attributes
         self.template_file = self._get_template_file(
             template_file, template_name)
-        self.git_helper = GitHelper(
-            self.git_path,
-            self.custom_attributes
+        self.aggregate_by = aggregate_by
+        self.template_cache_dir = template_cache_dir and os.path.abspath(template_cache_dir)
+        self.git_helper = git_helper or self._create_git_helper(
+            use_cache=use_cache,
+            cache_dir=cache_dir,
+            rebuild_cache=rebuild_cache,
+            cache_max_size=cache_max_size,
+            jobs=jobs,
+            git_backend=git_backend,
+            paths=paths,
+            exclude_paths=exclude_paths,
+            first_parent=first_parent,
+            detect_renames=detect_renames,
+            rename_threshold=rename_threshold,
+            rename_limit=rename_limit
         )
 
+    def _create_git_helper(self, **options):
+        return GitHelper(self.git_path, self.custom_attributes, **options)
+
     @classmethod
     def get_template_names(cls):
         """Returns a list of valid template names."""
-        return [
-            os.path.splitext(file_name)[0]
-            for file_name in os.listdir(TEMPLATES_DIR)
-            if os.path.isfile(os.path.join(TEMPLATES_DIR, file_name))
-        ]
+        return list(TEMPLATE_NAMES)
 
     def _get_template_file(self, template_file, template_name):
         if template_file:
@@ -81,22 +128,103 @@ class GenerateChangelog:
         return os.path.abspath(file_path)
 
     def render_markdown(self):
-        """Return the rendered markdown provided by the template."""
-        return self._get_markdown_template().render(
-            start_ref=self.start_ref,
-            end_ref=self.end_ref,
-            file_commits=self.git_helper.commit_log(
-                self.start_ref, self.end_ref
-            ),
+        """Return the rendered markdown provided by the template.
+
+        Templates are given both `file_commits` and `file_commits_index`, a :class:`FileCommitIndex`
+        of the same FileCommits which can group them without Jinja's filters. If aggregating, both
+        hold a :class:`~samsgeneratechangelog.filecommitindex.PathAggregate` per path instead.
+        """
+        return self._render(self._get_markdown_template(), self.start_ref, self.end_ref, self._file_commits())
+
+    async def render_markdown_async(self, executor=None):
+        """Asynchronously return the same markdown as :meth:`render_markdown` without blocking the event loop.
+
+        The commits are read by :meth:`GitHelper.commit_log_async` while the template is compiled, then it
+        is rendered, in `executor`, so that many changelogs can be awaited concurrently from one process.
+
+        Arguments:
+            executor (Executor): The executor to compile and render the template in, defaults to the event loop's
+        """
+        loop = asyncio.get_running_loop()
+        template = loop.run_in_executor(executor, self._get_markdown_template)
+        try:
+            file_commits = [file_commit async for file_commit in self._file_commits_async(executor)]
+        finally:
+            template = await template
+        return await loop.run_in_executor(
+            executor, self._render, template, self.start_ref, self.end_ref, file_commits
+        )
+
+    def render_markdown_stream(self):
+        """Return an iterator over the markdown provided by the template, rendered a few chunks at a time.
+
+        Unlike :meth:`render_markdown` the rendered markdown is never held in memory as a whole.
+        """
+        stream = self._get_markdown_template().stream(
+            **self._template_context(self.start_ref, self.end_ref, self._file_commits())
+        )
+        stream.enable_buffering(self._stream_buffer_size)
+        return profiling.timed('render', stream)
+
+    def _file_commits(self):
+        return self.git_helper.commit_log(self.start_ref, self.end_ref)
+
+    def _file_commits_async(self, executor):
+        return self.git_helper.commit_log_async(self.start_ref, self.end_ref, executor)
+
+    def _render(self, template, start_ref, end_ref, file_commits):
+        with profiling.stage('render'):
+            return template.render(**self._template_context(start_ref, end_ref, file_commits))
+
+    def _template_context(self, start_ref, end_ref, file_commits):
+        if self.aggregate_by is not None:
+            file_commits = aggregate_file_commits(file_commits, self.aggregate_by)
+        file_commits_index = FileCommitIndex(file_commits)
+        return dict(
+            start_ref=start_ref,
+            end_ref=end_ref,
+            file_commits=file_commits_index,
+            file_commits_index=file_commits_index,
             **self.template_variables
         )
 
-    def render_markdown_to_file(self, file_path, entry_id):
+    def render_backfill(self, tag_pattern=None, tag_sort='creatordate'):
+        """Yield a ``(tag, markdown)`` tuple for every tag but the first, rendered for the range from the tag before it.
+
+        The tags are listed by a single ``git for-each-ref`` and the history of them all is read at
+        once by :meth:`GitHelper.commit_logs`, so no commit is read more than once.
+
+        Arguments:
+            tag_pattern (str): Only use tags whose names match this glob, e.g. `v*`
+            tag_sort (str): The ``for-each-ref`` key to order the tags by, e.g. `creatordate` or `version:refname`
+        """
+        tags = self.git_helper.list_tags(tag_pattern, tag_sort)
+        ranges = list(zip(tags, tags[1:]))
+        template = self._get_markdown_template()
+        range_file_commits = self.git_helper.commit_logs([(start[1], end[1]) for start, end in ranges])
+        for ((start_ref, _), (end_ref, _)), file_commits in zip(ranges, range_file_commits):
+            yield end_ref, self._render(template, start_ref, end_ref, file_commits)
+
+    def render_backfill_to_file(self, file_path, tag_pattern=None, tag_sort='creatordate'):
+        """Render an entry for every tag but the first, as :meth:`render_backfill` does, into a file.
+
+        Each entry uses its tag as its entry_id, so existing entries are overwritten and missing
+        ones are prepended oldest first. The file is read and written just once.
+        """
+        entries = [(entry, entry_id) for entry_id, entry in self.render_backfill(tag_pattern, tag_sort)]
+        ChangelogFileHelper(file_path=file_path).write_entries(entries)
+
+    def render_markdown_to_file(self, file_path, entry_id, stream=False):
         """Render the markdown provided by the template and prepend it to a file.
 
         If an entry already exists pertaining to the current entry_id it will be overwritten.
+        If `stream` is set the markdown is streamed to a temporary file which is spliced into the file,
+        so that neither are held in memory.
         """
         file_helper = ChangelogFileHelper(file_path=file_path)
+        if stream:
+            file_helper.write_entry_stream(self.render_markdown_stream(), entry_id)
+            return
         entry = self.render_markdown()
         file_helper.write_entry(entry, entry_id)
 
@@ -107,11 +235,35 @@ class GenerateChangelog:
         because Jinja2 does not allow absolute template paths for `get_template`
         when using FileSystemLoader.
         """
-        return Environment(
-            extensions=['jinja2.ext.do', 'jinja2.ext.loopcontrols'],
-            loader=FileSystemLoader([
-                os.getcwd(),
-                TEMPLATES_DIR,
-                os.path.dirname(self.template_file),
-            ])
-        ).get_template(os.path.basename(self.template_file))
+        search_path = (os.getcwd(), TEMPLATES_DIR, os.path.dirname(self.template_file))
+        with profiling.stage('template_compile'):
+            return get_environment(search_path, self.template_cache_dir).get_template(
+                os.path.basename(self.template_file)
+            )
+
+
+@functools.lru_cache(maxsize=32)
+def get_environment(search_path, template_cache_dir=None):
+    """Return the Jinja2 Environment shared by every render with the same search path.
+
+    The environment keeps each compiled template in memory and, as `auto_reload` is on,
+    recompiles it if its file has changed since. If `template_cache_dir` is given, compiled
+    templates are also cached there so that they're only recompiled when their source changes.
+
+    Args:
+        search_path (tuple): The directories to look for templates in, in order
+        template_cache_dir (string): An absolute path to the directory to cache compiled templates in
+
+    Returns:
+        Environment
+    """
+    bytecode_cache = None
+    if template_cache_dir:
+        os.makedirs(template_cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(template_cache_dir)
+    return Environment(
+        extensions=['jinja2.ext.do', 'jinja2.ext.loopcontrols'],
+        loader=FileSystemLoader(list(search_path)),
+        bytecode_cache=bytecode_cache,
+        auto_reload=True
+    )
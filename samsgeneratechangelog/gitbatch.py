@@ -0,0 +1,183 @@
+"""Long-lived ``git`` processes which commits are read through one at a time, used by the ``batch`` git backend."""
+import os
+import uuid
+import weakref
+import tempfile
+import threading
+import subprocess
+import git
+from .gitlog import DIFF_ARGS, expand_raw_changes, raw_change, raw_path_count
+from .nativegit import ParsedCommit
+from . import profiling
+
+# --always prints the commit id even when there is nothing to diff (e.g. a merge), so that
+# every commit fed in produces some output
+DIFF_TREE_ARGS = ['diff-tree', '--stdin', '-r', '-z', '--root', '--always', '--abbrev=7', '--no-color']
+# The id git gives a tree with nothing in it, which it knows of without the tree being stored
+EMPTY_TREE = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+
+class GitBatch:
+    """Read commits through persistent ``git diff-tree --stdin`` and ``git cat-file --batch`` processes.
+
+    Each process is started the first time it is needed and lives until :meth:`close` is called
+    (or the GitBatch is garbage collected), so reading a commit never pays for starting a process.
+    Like ``git log``, merge commits are not diffed (unless following first parents) and root commits,
+    along with the boundary commits of a shallow clone (whose parents are missing), are diffed against
+    the empty tree.
+
+    Parameters:
+        repo (Repo): The :class:`~git.repo.base.Repo` to read commits from
+        pathspec (Pathspec): Only diff the files it includes
+        first_parent (bool): Diff merge commits against their first parent
+        diff_args (list): The options which decide which files are reported as changed and how,
+            e.g. :attr:`RenameDetection.args <samsgeneratechangelog.gitlog.RenameDetection.args>`
+    """
+
+    def __init__(self, repo, pathspec=None, first_parent=False, diff_args=DIFF_ARGS):
+        """Init GitBatch without starting any processes yet."""
+        self.repo = repo
+        self.first_parent = first_parent
+        self._diff_tree_args = [*DIFF_TREE_ARGS, *diff_args, '--', *(pathspec.args if pathspec else [])]
+        # diff-tree echoes any line which isn't a commit id, which marks the end of each commit's output
+        self._sentinel = f'sgc-end-{uuid.uuid4().hex}\n'.encode('ascii')
+        self._processes = {}
+        self._lock = threading.Lock()
+        self._shallow = set()
+        self._shallow_state = None
+        self._finalizer = weakref.finalize(self, _close_processes, self._processes)
+
+    def read_commit(self, hexsha, hexsha_short=None):
+        """Return the ``(LogCommit, changes)`` tuple for a single commit.
+
+        Raises:
+            BadObject: If there is no commit with `hexsha`
+        """
+        commit = ParsedCommit(hexsha, self.read_object(hexsha, expected_type='commit'))
+        if hexsha in self._read_shallow():
+            commit.parents = []
+        parent = commit.parents[0] if self.first_parent and len(commit.parents) > 1 else None
+        return commit.to_log_commit(self.repo, hexsha_short), self.diff(hexsha, parent)
+
+    def read_commits(self, listing):
+        """Yield a ``(LogCommit, changes)`` tuple for each ``(hexsha, hexsha_short)`` in listing, in order."""
+        for hexsha, hexsha_short in listing:
+            yield self.read_commit(hexsha, hexsha_short)
+
+    def read_object(self, hexsha, expected_type=None):
+        """Return the content of an object read by ``git cat-file --batch``.
+
+        Raises:
+            BadObject: If the object doesn't exist or isn't of `expected_type`
+        """
+        with self._lock:
+            process = self._process('cat-file', '--batch')
+            self._write(process, f'{hexsha}\n'.encode('ascii'))
+            header = process.stdout.readline()
+            if not header:
+                self._raise_exited('cat-file')
+            fields = header.split()
+            if len(fields) != 3:
+                raise git.BadObject(hexsha)
+            data = process.stdout.read(int(fields[2]) + 1)[:-1]
+        if expected_type and fields[1].decode('ascii') != expected_type:
+            raise git.BadObject(f'{hexsha} is a {fields[1].decode("ascii")} not a {expected_type}')
+        return data
+
+    def diff(self, hexsha, parent=None):
+        """Return the ``(file_path, change_type)`` tuples for the files a commit changed.
+
+        Arguments:
+            hexsha (str): The sha of the commit
+            parent (str): The sha of the parent to diff the commit against, rather than its own parents
+        """
+        if hexsha in self._read_shallow():
+            # Its parents are missing, so like git log it's diffed as a root commit, which diff-tree can only
+            # be asked to do by giving it the trees, whose ids it prints followed by a newline rather than a NUL
+            tree = ParsedCommit(hexsha, self.read_object(hexsha, expected_type='commit')).tree
+            return self._diff(f'{EMPTY_TREE} {tree}\n', b'\n')
+        return self._diff(f'{hexsha} {parent}\n' if parent else f'{hexsha}\n', b'\0')
+
+    def _diff(self, line, header_end):
+        with self._lock:
+            process = self._process(*self._diff_tree_args)
+            self._write(process, line.encode('ascii') + self._sentinel)
+            output = b''
+            while not output.endswith(self._sentinel):
+                chunk = process.stdout.read1(65536)
+                if not chunk:
+                    self._raise_exited('diff-tree')
+                output += chunk
+        # The commit id, then each entry's meta and its one or two paths
+        tokens = output[:-len(self._sentinel)].partition(header_end)[2].split(b'\0')
+        raw_changes = []
+        index = 0
+        while index < len(tokens) and tokens[index][:1] == b':':
+            path_count = raw_path_count(tokens[index])
+            raw_changes.append(raw_change(tokens[index], tokens[index + 1:index + 1 + path_count]))
+            index += 1 + path_count
+        return list(expand_raw_changes(raw_changes))
+
+    def _read_shallow(self):
+        """Return the shas of a shallow clone's boundary commits, reading them again whenever git rewrites them."""
+        path = os.path.join(self.repo.common_dir, 'shallow')
+        try:
+            stat = os.stat(path)
+            state = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        except FileNotFoundError:
+            return set()
+        if state != self._shallow_state:
+            with open(path) as reader:
+                self._shallow = set(reader.read().split())
+            self._shallow_state = state
+        return self._shallow
+
+    def _process(self, *args):
+        if args not in self._processes:
+            profiling.count('git_processes')
+            stderr = tempfile.TemporaryFile()
+            process = subprocess.Popen(
+                [self.repo.git.GIT_PYTHON_GIT_EXECUTABLE, *args],
+                cwd=self.repo.working_dir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=stderr
+            )
+            self._processes[args] = (process, stderr)
+        return self._processes[args][0]
+
+    def _write(self, process, data):
+        try:
+            process.stdin.write(data)
+            process.stdin.flush()
+        except BrokenPipeError:
+            self._raise_exited(process.args[1])
+
+    def _raise_exited(self, command):
+        """Raise the error of a process which exited, so that it's restarted when next needed."""
+        for args, (process, stderr) in list(self._processes.items()):
+            if args[0] == command:
+                del self._processes[args]
+                status = process.wait()
+                stderr.seek(0)
+                message = stderr.read()
+                stderr.close()
+                raise git.GitCommandError(process.args, status, message)
+        raise RuntimeError(f'No git {command} process is running')
+
+    def close(self):
+        """Stop every process, they are started again if needed."""
+        with self._lock:
+            _close_processes(self._processes)
+
+
+def _close_processes(processes):
+    for process, stderr in processes.values():
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        process.wait()
+        process.stdout.close()
+        stderr.close()
+    processes.clear()
@@ -1,21 +1,48 @@
 """A series of helper classes for dealing with pygit."""
 import os
-import re
+import sys
+import asyncio
 import logging
-import git
+import subprocess
+import tempfile
+import threading
+from collections import defaultdict
+from contextlib import contextmanager, asynccontextmanager
 from datetime import datetime
+import git
+from concurrent.futures import ProcessPoolExecutor
+from .gitlog import GitLogParser, LogCommit, RenameDetection, log_args
+from .commitcache import CommitCache
+from .nativegit import NativeGit, DEFAULT_RENAME_SCORE, DEFAULT_RENAME_LIMIT, MAX_SCORE
+from .gitbatch import GitBatch
+from .customattributes import CustomAttributes
+from .filecommitindex import aggregate_file_commits
+from .pathspec import Pathspec
+from .constants import GIT_BACKENDS
+from . import profiling
+
+
+# Friendly names for the single character change types
+CHANGE_TYPES = {'A': 'Added', 'M': 'Modified', 'D': 'Deleted', 'R': 'Renamed', 'T': 'Type Change'}
 
 
 class FileCommit():
     """A single file changed by a commit.
 
+    A compact record of the change with its path and change type interned so that they are
+    shared between records. Anything else is read from its commit, which when read by
+    :meth:`GitHelper.commit_log` is a :class:`~samsgeneratechangelog.gitlog.LogCommit` shared
+    by every file in the commit that only loads the full :class:`~git.objects.commit.Commit`
+    when a template asks for something it doesn't hold.
+
     Parameters:
         commit (Commit): The :class:`~git.objects.commit.Commit` that this file was changed in
         file_path (str): The path of the file that was changed relative to the root of the repo
         change_type (str): The single character change type
         repo (Repo): The :class:`~git.repo.base.Repo` that the commit is from
         custom_attributes (dict): A dictionary of custom attributes with the attribute name as the key,
-            and subkeys of `pattern` and `derived_from`
+            and subkeys of `pattern` and `derived_from`, or the same already compiled
+            as :class:`~samsgeneratechangelog.customattributes.CustomAttributes`
 
     Attributes:
         commit (Commit): The :class:`~git.objects.commit.Commit` object for this commit
@@ -26,32 +53,71 @@ class FileCommit():
         message (str): The commit message
         file_path (str): The path to the file which was changed (relative to the root of the repo)
         friendly_change_type (str): The type of change that happend to this file.
+        repository (str): The name of the repository the commit is from when generating a changelog
+            from a manifest of many, otherwise ``None``
     """
 
+    __slots__ = (
+        'commit', 'repo', 'file_path', 'change_type', 'repository', '_hexsha_short', '_custom_attributes',
+        '_custom_values'
+    )
+    attributes = ('commit', 'repo', 'file_path', 'change_type', 'friendly_change_type', 'repository')
+
     def __init__(self, commit, file_path, change_type, repo, custom_attributes=None):
-        """Init FileCommit with  commit, file_path, change_type, friendly_change_type."""
-        change_types = {'A': 'Added', 'M': 'Modified',
-                        'D': 'Deleted', 'R': 'Renamed', 'T': 'Type Change'}
+        """Init FileCommit with  commit, file_path, change_type and any custom attributes."""
         self.commit = commit
-        self.file_path = file_path
-        self.change_type = change_type
-        self._generate_custom_attributes(custom_attributes or {})
-        self.friendly_change_type = change_types.get(
-            change_type,
-            'Unknown change type'
-        )
+        self.repo = repo
+        self.file_path = sys.intern(file_path)
+        self.change_type = sys.intern(change_type)
+        self.repository = None
         self._hexsha_short = None
+        self._custom_attributes = None
+        if custom_attributes:
+            custom_attributes = CustomAttributes.from_spec(custom_attributes)
+            if profiling.profiler is None:
+                self._custom_values = custom_attributes.evaluate(self)
+            else:
+                self._custom_values = profiling.call('custom_attributes', custom_attributes.evaluate, self)
+            self._custom_attributes = custom_attributes
+
+    @property
+    def friendly_change_type(self):
+        """The type of change that happened to this file, e.g. `Added`.
+
+        Returns:
+            str
+        """
+        return CHANGE_TYPES.get(self.change_type, 'Unknown change type')
 
     @property
     def hexsha_short(self):
         """Short version of the commit sha.
 
+        Commits read by :meth:`GitHelper.commit_log` already carry it so it is shared
+        by every file in the commit, otherwise it is resolved with git once per file commit.
+
         Returns:
             str
         """
         if not self._hexsha_short:
-            self._hexsha_sort = self.repo.git.rev_parse(self.hexsha, short=7)
-        return self._hexsha_sort
+            if not getattr(self.commit, 'hexsha_short', None):
+                profiling.count('git_processes')
+            self._hexsha_short = (
+                getattr(self.commit, 'hexsha_short', None)
+                or self.repo.git.rev_parse(self.hexsha, short=7)
+            )
+        return self._hexsha_short
+
+    @property
+    def custom_attribute_values(self):
+        """The value of each custom attribute keyed by its name.
+
+        Returns:
+            dict
+        """
+        if self._custom_attributes is None:
+            return {}
+        return dict(zip(self._custom_attributes.names, self._custom_values))
 
     @property
     def committed_date(self):
@@ -63,32 +129,15 @@ class FileCommit():
         return datetime.fromtimestamp(self.commit.committed_date)
 
     def __getattr__(self, attr):
-        """Return the value from the commit object if not found directly on FileCommit object."""
+        """Return a custom attribute, or the value from the commit object if not found directly on FileCommit object."""
+        if attr in FileCommit.__slots__:
+            raise AttributeError(attr)
+        if self._custom_attributes is not None:
+            position = self._custom_attributes.index.get(attr)
+            if position is not None:
+                return self._custom_values[position]
         return getattr(self.commit, attr)
 
-    def _generate_custom_attributes(self, custom_attributes):
-        for attr, attribute_spec in custom_attributes.items():
-            logging.debug(f"Getting custom attribute {attr} from commit"
-                          f"using {attribute_spec['pattern']} against {attribute_spec['derived_from']}")
-            derived_from = getattr(self, attribute_spec['derived_from'])
-            derived_from = derived_from or getattr(self.commit, attribute_spec['derived_from'])
-            result = self._get_first_matching_group(attribute_spec['pattern'], derived_from)
-            setattr(self, attr, result)
-
-    @staticmethod
-    def _get_first_matching_group(pattern, string):
-        match = re.search(
-            pattern,
-            string,
-            re.IGNORECASE
-        )
-        if not match:
-            return ''
-        groups = [group for group in match.groups() if group]
-        if groups:
-            return groups[0]
-        return match.group(0)
-
     def __repr__(self):
         """Return representation of the file commit."""
         return f"FileCommit({self.commit}, {self.file_path}, {self.change_type})"
@@ -101,34 +150,556 @@ class GitHelper:
         path (string): Path to the folder containing the git repo
         custom_attributes (dict): A dictionary of custom attributes with
             the attribute name as the key, and subkeys of `pattern` and `derived_from`
+        use_cache (bool): Whether to keep each commit's metadata and changed files in a persistent cache
+        cache_dir (string): The directory to keep the cache in, defaults to `sgc-cache` inside the `.git` folder
+        rebuild_cache (bool): Discard the existing cache entries before use
+        cache_max_size (int): The size in bytes to evict the cache down to after each use
+        jobs (int): The number of worker processes to read commits with
+        git_backend (str): How commits are read, either `subprocess` to stream them from ``git log``,
+            `batch` to read them one at a time through long-lived ``git`` processes
+            or `native` to read them straight from the `.git` folder without running ``git``, which
+            refuses repositories with replacement objects and only resolves refs, shas and ``~``, ``^``
+            and ``^{commit}`` suffixes (not e.g. ``@{1}`` or ``:/text``)
+        paths (list): Only include files matching these paths or glob patterns (relative to the root of the repo)
+        exclude_paths (list): Exclude files matching these paths or glob patterns
+        first_parent (bool): Only follow the first parent of each commit, so that just the mainline
+            is walked, and diff merge commits against their first parent rather than skipping them
+        detect_renames (bool): Pair deleted and added files as renames, otherwise a renamed file is
+            reported as deleted and added, which is much faster for commits changing thousands of files
+        rename_threshold (int): The percentage similarity for a deleted and added file to be a rename
+        rename_limit (int): Only detect renames of files which aren't identical in commits with at most
+            this many added and deleted files, 0 for no limit
 
     """
+    _cache_batch_size = 500
+    _max_job_chunk_size = 1000
 
-    def __init__(self, path, custom_attributes=None):
-        """Init GitHelper with repo, git, and custom_attributes."""
+    def __init__(self, path, custom_attributes=None, use_cache=False, cache_dir=None,
+                 rebuild_cache=False, cache_max_size=CommitCache.DEFAULT_MAX_SIZE, jobs=1,
+                 git_backend='subprocess', paths=None, exclude_paths=None, first_parent=False,
+                 detect_renames=True, rename_threshold=None, rename_limit=None):
+        """Init GitHelper with repo, git, custom_attributes, cache, jobs, git backend, pathspec, walk and renames."""
         logging.debug(f'Using git repo {path}')
         self.repo = git.Repo(path or os.path.dirname(
             os.path.realpath(__file__)
         ))
         self.git = self.repo.git
         self.custom_attributes = custom_attributes
+        self._custom_attributes = CustomAttributes(custom_attributes)
+        self.jobs = jobs
+        if git_backend not in GIT_BACKENDS:
+            raise ValueError(f'Unknown git backend {git_backend}, expected one of {", ".join(GIT_BACKENDS)}')
+        self.git_backend = git_backend
+        self.pathspec = Pathspec(paths, exclude_paths)
+        self.first_parent = first_parent
+        self.rename_detection = RenameDetection(detect_renames, rename_threshold, rename_limit)
+        self._log_args = log_args(self.rename_detection.args)
+        self.native = None
+        if git_backend == 'native':
+            self.native = NativeGit(
+                self.repo,
+                rename_score=DEFAULT_RENAME_SCORE if rename_threshold is None else rename_threshold * MAX_SCORE // 100,
+                rename_limit=DEFAULT_RENAME_LIMIT if rename_limit is None else rename_limit,
+                pathspec=self.pathspec,
+                first_parent=first_parent,
+                detect_renames=detect_renames
+            )
+        self.batch = None
+        if git_backend == 'batch':
+            self.batch = GitBatch(self.repo, self.pathspec, first_parent, self.rename_detection.args)
+        # Commits diffed with a pathspec only list some of their files, and merges are only
+        # diffed when following first parents, so either is cached separately, as are
+        # commits diffed with different rename detection
+        self._cache_variant = ' '.join([
+            *self.rename_detection.args,
+            *(['--first-parent'] if first_parent else []),
+            *(['--', *self.pathspec.args] if self.pathspec else [])
+        ])
+        self.cache = None
+        if use_cache:
+            self.cache = CommitCache.for_repo(
+                self.repo, cache_dir, max_size=cache_max_size, rebuild=rebuild_cache
+            )
 
     def commit_log(self, rev_a, rev_b):
-        """Get commit objects for every commit between rev_a and rev_b."""
-        commit_ids = self.git.log(
-            '--pretty=%H', f"{rev_a}...{rev_b}").split('\n')
-        for commit_id in commit_ids:
-            commit = self.repo.commit(commit_id)
-            if len(commit.parents) > 1:
-                # Skip merge commits
-                continue
-            for file_commit in self.generate_file_commits_from_commit(commit):
+        """Get FileCommit objects for every file changed by every commit between rev_a and rev_b.
+
+        The commits, their metadata and their changed files are all read from a single
+        ``git log`` process whose output is parsed as it is streamed (or from the `.git` folder
+        by the `native` backend), apart from any commits already in the commit cache when it is enabled.
+        Given a pathspec, git skips every commit that doesn't change a file it includes.
+        Merge commits are skipped unless following first parents, when each is diffed against its
+        first parent, so that a merged branch's changes are attributed to the merge.
+        """
+        for commit, changes in self._log_commits(rev_a, rev_b):
+            yield from self._file_commits(commit, changes)
+
+    async def commit_log_async(self, rev_a, rev_b, executor=None):
+        """Asynchronously get the same FileCommit objects as :meth:`commit_log` without blocking the event loop.
+
+        The `subprocess` backend streams ``git log`` through :func:`asyncio.create_subprocess_exec`
+        and parses its output as it arrives, so many logs can be read concurrently from one event loop.
+        Otherwise, e.g. through the commit cache or with the `native` backend, the commits are
+        read by :meth:`commit_log` in `executor`, in which case the GitHelper mustn't be used by anything else
+        until they have been read.
+
+        Arguments:
+            rev_a (str): The revision to start from
+            rev_b (str): The revision to end at
+            executor (Executor): The executor to read commits in when they can't be streamed,
+                defaults to the event loop's
+
+        Returns:
+            async iterator: FileCommit objects
+        """
+        if self.git_backend != 'subprocess' or self.cache is not None or self.jobs > 1:
+            loop = asyncio.get_running_loop()
+            for file_commit in await loop.run_in_executor(executor, list, self.commit_log(rev_a, rev_b)):
                 yield file_commit
+            return
+        async for commit, changes in self._stream_log_async(f'{rev_a}...{rev_b}', *self._revision_args):
+            for file_commit in self._file_commits(commit, changes):
+                yield file_commit
+
+    def _file_commits(self, commit, changes):
+        """Return a FileCommit for each of a commit's changes, or none for a skipped merge commit."""
+        profiling.count('commits')
+        if len(commit.parent_hexshas) > 1 and not self.first_parent:
+            # Skip merge commits
+            profiling.count('merge_commits_skipped')
+            return []
+        profiling.count('file_commits', len(changes))
+        return [
+            FileCommit(commit, file_path, change_type, self.repo, self._custom_attributes)
+            for file_path, change_type in changes
+        ]
+
+    def extend_commit_log(self, hexsha_b, new_hexsha_b):
+        """Get the FileCommits that a range has gained since its end moved from `hexsha_b` to `new_hexsha_b`.
+
+        Only the commits new since `hexsha_b` are read, so that a range whose end has been committed to can be
+        kept up to date in time proportional to the new commits. For a range ``a...b`` where `a` is an ancestor
+        of `b` they are the FileCommits that ``commit_log(a, new_hexsha_b)`` has on top of
+        ``commit_log(a, hexsha_b)``.
+
+        Arguments:
+            hexsha_b (str): The sha of the commit the range ended at
+            new_hexsha_b (str): The sha of the commit the range now ends at
+
+        Returns:
+            list: The new FileCommits newest first, or ``None`` if the range has to be read again because
+                `hexsha_b` isn't an ancestor of `new_hexsha_b` (e.g. after a force push) or, following first
+                parents, isn't on its first-parent chain
+        """
+        if not self.is_ancestor(hexsha_b, new_hexsha_b):
+            return None
+        entries = list(self._log_commits(hexsha_b, new_hexsha_b))
+        if self.first_parent and entries and hexsha_b not in entries[-1][0].parent_hexshas[:1]:
+            return None
+        return [file_commit for commit, changes in entries for file_commit in self._file_commits(commit, changes)]
+
+    def is_ancestor(self, rev_a, rev_b):
+        """Return whether rev_a is an ancestor of (or the same commit as) rev_b, with a single ``git merge-base``."""
+        profiling.count('git_processes')
+        try:
+            self.git.merge_base('--is-ancestor', rev_a, rev_b)
+        except git.GitCommandError as e:
+            if e.status == 1:
+                return False
+            raise
+        return True
+
+    def aggregate_log(self, rev_a, rev_b, attributes=()):
+        """Get a PathAggregate for every path changed between rev_a and rev_b, folded as commit_log is streamed.
+
+        Each holds the latest and first FileCommit of the path, how many times it changed and who by,
+        so that memory grows with the number of distinct paths rather than file changes.
+
+        Arguments:
+            rev_a (str): The revision to start from
+            rev_b (str): The revision to end at
+            attributes (iterable): Attributes of the FileCommits (e.g. `author.name`) whose values
+                are aggregated separately
+
+        Returns:
+            iterator: :class:`~samsgeneratechangelog.filecommitindex.PathAggregate` objects in the
+                order their paths were first seen
+        """
+        return aggregate_file_commits(self.commit_log(rev_a, rev_b), attributes)
+
+    def _log_commits(self, rev_a, rev_b):
+        """Yield a ``(LogCommit, changes)`` tuple for every commit in ``rev_a...rev_b``, newest first.
+
+        When profiling, a single streamed ``git log`` is timed as the `log_walk` stage, which
+        includes its diffs, otherwise the commits are listed (`log_walk`) then read (`diffs`).
+        """
+        if self.cache is None and self.jobs <= 1:
+            if self.git_backend == 'subprocess':
+                yield from profiling.timed('log_walk', self._stream_log(f'{rev_a}...{rev_b}', *self._revision_args))
+            else:
+                yield from profiling.timed('diffs', self._read_listed_commits(self._list_commits(rev_a, rev_b)))
+            return
+        yield from self._log_listed_commits(self._list_commits(rev_a, rev_b))
+
+    def _log_listed_commits(self, listing):
+        """Yield a ``(LogCommit, changes)`` tuple for each ``(hexsha, hexsha_short)`` in listing, in order.
+
+        Through the commit cache if it is enabled.
+        """
+        if self.cache is None:
+            return profiling.timed('diffs', self._read_commits(listing))
+        return self._log_commits_through_cache(listing)
+
+    def commit_logs(self, revision_ranges):
+        """Get the FileCommits of many ``(rev_a, rev_b)`` ranges from a single scan of their history.
+
+        The history of every revision is listed at once (without diffing anything) and split into
+        the ranges, then each commit in any of the ranges is read just once, even if the ranges overlap.
+
+        Returns:
+            list: A list of FileCommit objects for each range, in the same order as `revision_ranges`
+        """
+        revisions = list(dict.fromkeys(revision for revision_range in revision_ranges for revision in revision_range))
+        hexshas = dict(zip(revisions, self.resolve_commits(revisions)))
+        listing, parents = self._list_history(list(dict.fromkeys(hexshas.values())))
+        in_pathspec = self._list_in_pathspec(list(dict.fromkeys(hexshas.values())))
+        hexsha_ranges = [(hexshas[rev_a], hexshas[rev_b]) for rev_a, rev_b in revision_ranges]
+        ranges_of = defaultdict(list)
+        for index, members in enumerate(split_history(hexsha_ranges, parents)):
+            if self.first_parent:
+                members = first_parent_chains(hexsha_ranges[index], parents, members)
+            for hexsha in members:
+                ranges_of[hexsha].append(index)
+        logging.debug(f'Split {len(listing)} commits into {len(revision_ranges)} ranges')
+        file_commits = [[] for _ in revision_ranges]
+        for commit, changes in self._log_listed_commits([
+            entry for entry in listing if entry[0] in ranges_of and (in_pathspec is None or entry[0] in in_pathspec)
+        ]):
+            commit_file_commits = self._file_commits(commit, changes)
+            for index in ranges_of[commit.hexsha]:
+                file_commits[index].extend(commit_file_commits)
+        return file_commits
+
+    def list_tags(self, pattern=None, sort='creatordate'):
+        """Return a ``(name, hexsha)`` tuple for every tag of a commit, listed by a single ``git for-each-ref``.
+
+        Arguments:
+            pattern (str): Only list tags whose names match this glob, e.g. `v*`
+            sort (str): The ``for-each-ref`` key to order the tags by, e.g. `creatordate` or `version:refname`
+        """
+        profiling.count('git_processes')
+        with profiling.stage('resolve_refs'):
+            output = self.git.for_each_ref(
+                f'--sort={sort}',
+                '--format=%(refname:strip=2)%00%(objecttype)%00%(objectname)%00%(*objecttype)%00%(*objectname)',
+                f'refs/tags/{pattern}' if pattern else 'refs/tags'
+            )
+        tags = []
+        for line in output.splitlines():
+            name, object_type, hexsha, peeled_type, peeled_hexsha = line.split('\0')
+            if peeled_type:
+                # An annotated tag
+                object_type, hexsha = peeled_type, peeled_hexsha
+            if object_type == 'commit':
+                tags.append((name, hexsha))
+        return tags
+
+    def resolve_commits(self, revisions):
+        """Return the sha of the commit each revision refers to, with a single ``git rev-parse`` at most.
+
+        Raises:
+            GitCommandError: If a revision doesn't refer to a commit, or BadName from the `native` backend
+        """
+        with profiling.stage('resolve_refs'):
+            if self.native:
+                return [self.native.resolve(revision) for revision in revisions]
+            profiling.count('git_processes')
+            return self.git.rev_parse(*[f'{revision}^{{commit}}' for revision in revisions]).splitlines()
+
+    def _list_history(self, hexshas):
+        """List every commit reachable from any of `hexshas`, newest first.
+
+        Returns:
+            tuple: A list of ``(hexsha, hexsha_short)`` tuples and a dict of each commit's parent shas
+        """
+        with profiling.stage('log_walk'):
+            if self.native:
+                listing = [
+                    (hexsha, self.native.objects.shortest_unique_prefix(hexsha))
+                    for hexsha in self.native.walk(hexshas)
+                ]
+                return listing, {hexsha: self.native.parse_commit(hexsha).parents for hexsha, _ in listing}
+            listing = []
+            parents = {}
+            profiling.count('git_processes')
+            for line in self.git.log('--format=%H %h %P', '--abbrev=7', *hexshas, '--').splitlines():
+                hexsha, hexsha_short, *parent_hexshas = line.split(' ')
+                listing.append((hexsha, hexsha_short))
+                parents[hexsha] = parent_hexshas
+            return listing, parents
+
+    def _list_in_pathspec(self, hexshas):
+        """Return the shas of the commits reachable from `hexshas` which change a file in the pathspec.
+
+        Returns:
+            set: or ``None`` if there is no pathspec, or the commits are read by the `native` backend
+                which reads every commit to walk the history anyway
+        """
+        if not self.pathspec or self.native:
+            return None
+        with profiling.stage('log_walk'):
+            profiling.count('git_processes')
+            return set(self.git.log('--format=%H', *hexshas, *self._revision_args).split())
+
+    def _list_commits(self, rev_a, rev_b):
+        """Return a ``(hexsha, hexsha_short)`` tuple for every commit in ``rev_a...rev_b``, newest first.
+
+        Given a pathspec, only commits which change a file it includes are listed, apart from by
+        the `native` backend.
+        """
+        with profiling.stage('log_walk'):
+            if self.native:
+                return self.native.list_commits(rev_a, rev_b)
+            profiling.count('git_processes')
+            return [
+                tuple(line.split(' '))
+                for line in self.git.log(
+                    '--format=%H %h', '--abbrev=7', f'{rev_a}...{rev_b}', *self._revision_args
+                ).splitlines()
+            ]
+
+    @property
+    def _revision_args(self):
+        """The arguments which limit ``git log`` to the mainline if following first parents, and the pathspec.
+
+        Without ``--full-history`` git would also skip commits on branches whose changes a merge
+        discarded. Unless following first parents merges are never diffed, and ``git log --no-walk``
+        drops them given a pathspec, so they are left out of every listing for it to match.
+        """
+        args = ['--first-parent', '-m'] if self.first_parent else []
+        if not self.pathspec:
+            return [*args, '--']
+        return [*args, '--full-history', *([] if self.first_parent else ['--no-merges']), '--', *self.pathspec.args]
+
+    def _log_commits_through_cache(self, listing):
+        """Yield commits from the cache where possible, reading only the rest from git.
+
+        Listing the commits without diffing them is cheap, the commits missing from the cache
+        are then read in the same order by :meth:`_read_commits`.
+        """
+        with profiling.stage('commit_cache'):
+            cached_hexshas = self.cache.contains([hexsha for hexsha, _ in listing], self._cache_variant)
+        missing = [(hexsha, hexsha_short) for hexsha, hexsha_short in listing if hexsha not in cached_hexshas]
+        logging.debug(f'{len(listing) - len(missing)} of {len(listing)} commits found in the commit cache')
+        profiling.count('commit_cache_hits', len(listing) - len(missing))
+        fetched = profiling.timed('diffs', self._read_commits(missing))
+        new_entries = []
+        try:
+            for start in range(0, len(listing), self._cache_batch_size):
+                batch = listing[start:start + self._cache_batch_size]
+                with profiling.stage('commit_cache'):
+                    cached = self.cache.get_many(
+                        self.repo, [hexsha for hexsha, _ in batch if hexsha in cached_hexshas], self._cache_variant
+                    )
+                for hexsha, hexsha_short in batch:
+                    if hexsha in cached:
+                        commit, changes = cached[hexsha]
+                        commit.hexsha_short = hexsha_short
+                    else:
+                        commit, changes = next(fetched)
+                        new_entries.append((commit, changes))
+                    yield commit, changes
+                if len(new_entries) >= self._cache_batch_size:
+                    with profiling.stage('commit_cache'):
+                        self.cache.put_many(new_entries, self._cache_variant)
+                    new_entries = []
+        finally:
+            fetched.close()
+            with profiling.stage('commit_cache'):
+                self.cache.put_many(new_entries, self._cache_variant)
+                self.cache.evict()
+
+    def _read_commits(self, listing):
+        """Yield a ``(LogCommit, changes)`` tuple for each ``(hexsha, hexsha_short)`` in listing, in order.
+
+        The commits are read by :meth:`_read_listed_commits`, or when `jobs` is greater than one
+        they are split into contiguous chunks which are read (along with any attributes
+        custom attributes are derived from) by a pool of worker processes.
+        """
+        if not listing:
+            return
+        if self.jobs <= 1:
+            yield from self._read_listed_commits(listing)
+            return
+        chunk_size = min(self._max_job_chunk_size, -(-len(listing) // (self.jobs * 4)))
+        chunks = [
+            [hexsha for hexsha, _ in listing[start:start + chunk_size]]
+            for start in range(0, len(listing), chunk_size)
+        ]
+        logging.debug(f'Reading {len(listing)} commits in {len(chunks)} chunks with {self.jobs} jobs')
+        hexsha_shorts = iter(hexsha_short for _, hexsha_short in listing)
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            results = executor.map(
+                _read_commits_in_worker,
+                [
+                    (
+                        self.repo.working_dir, self.git_backend, self.pathspec.paths, self.pathspec.exclude_paths,
+                        self.first_parent, self._rename_options, chunk, self._prefetched_attributes
+                    )
+                    for chunk in chunks
+                ]
+            )
+            for result in results:
+                for fields, changes, prefetched in result:
+                    commit = LogCommit.from_fields(self.repo, fields, next(hexsha_shorts))
+                    commit.prefetched = prefetched
+                    yield commit, changes
+
+    def _read_listed_commits(self, listing):
+        """Yield a ``(LogCommit, changes)`` tuple for each ``(hexsha, hexsha_short)`` in listing from this process.
+
+        The subprocess backend reads them all with a single ``git log --no-walk`` which is fed their shas.
+        """
+        if self.native:
+            for hexsha, hexsha_short in listing:
+                yield self.native.read_commit(hexsha, hexsha_short)
+            return
+        if self.batch:
+            yield from self.batch.read_commits(listing)
+            return
+        yield from self._stream_log(
+            '--no-walk=unsorted', '--stdin', *self._revision_args, input='\n'.join(hexsha for hexsha, _ in listing)
+        )
+
+    def close(self):
+        """Stop any long-lived git processes and release memory-mapped packs."""
+        if self.batch:
+            self.batch.close()
+        if self.native:
+            self.native.close()
+
+    @property
+    def _rename_options(self):
+        """The rename detection keyword arguments to open the same GitHelper with in a worker process."""
+        return (
+            ('detect_renames', self.rename_detection.enabled),
+            ('rename_threshold', self.rename_detection.threshold),
+            ('rename_limit', self.rename_detection.limit)
+        )
+
+    @property
+    def _prefetched_attributes(self):
+        """The names of commit attributes that custom attributes are derived from which LogCommit lacks."""
+        return sorted(self._custom_attributes.sources - set(LogCommit.attributes) - set(FileCommit.attributes))
+
+    def _stream_log(self, *args, input=None):
+        """Yield a ``(LogCommit, changes)`` tuple for each commit output by a single ``git log``."""
+        parser = GitLogParser(self.repo)
+        with self._stream_git('log', *self._log_args, *args, input=input) as chunks:
+            for chunk in chunks:
+                yield from parser.feed(chunk)
+            yield from parser.close()
+
+    @contextmanager
+    def _stream_git(self, *args, input=None, chunk_size=65536):
+        """Run a git command and yield an iterator over chunks of its stdout.
+
+        stderr is spooled to a temporary file rather than a pipe so that a chatty
+        command (e.g. rename limit warnings) can never block on a full pipe.
+
+        Arguments:
+            input (str): Text to write to the command's stdin, from a thread so that
+                writing it can never block on reading the command's output
+
+        Raises:
+            GitCommandError: If the command exits with a non-zero status
+        """
+        command = [self.git.GIT_PYTHON_GIT_EXECUTABLE, *args]
+        profiling.count('git_processes')
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(
+                command,
+                cwd=self.repo.working_dir,
+                stdin=subprocess.DEVNULL if input is None else subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=stderr
+            )
+            if input is not None:
+                threading.Thread(target=_write_and_close, args=(process.stdin, input.encode()), daemon=True).start()
+            try:
+                yield iter(lambda: process.stdout.read1(chunk_size), b'')
+            finally:
+                process.stdout.close()
+                status = process.wait()
+            if status:
+                stderr.seek(0)
+                raise git.GitCommandError(command, status, stderr.read())
+
+    async def _stream_log_async(self, *args, input=None):
+        """Asynchronously yield a ``(LogCommit, changes)`` tuple for each commit output by a single ``git log``."""
+        parser = GitLogParser(self.repo)
+        async with self._stream_git_async('log', *self._log_args, *args, input=input) as chunks:
+            async for chunk in chunks:
+                for entry in parser.feed(chunk):
+                    yield entry
+            for entry in parser.close():
+                yield entry
+
+    @asynccontextmanager
+    async def _stream_git_async(self, *args, input=None, chunk_size=65536):
+        """Run a git command through asyncio and yield an async iterator over chunks of its stdout.
+
+        As :meth:`_stream_git` does, stderr is spooled to a temporary file and input is written concurrently.
+
+        Raises:
+            GitCommandError: If the command exits with a non-zero status
+        """
+        command = [self.git.GIT_PYTHON_GIT_EXECUTABLE, *args]
+        profiling.count('git_processes')
+        with tempfile.TemporaryFile() as stderr:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=self.repo.working_dir,
+                stdin=subprocess.DEVNULL if input is None else subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=stderr
+            )
+            writer = None
+            if input is not None:
+                writer = asyncio.ensure_future(_write_and_close_async(process.stdin, input.encode()))
+            try:
+                yield _read_chunks_async(process.stdout, chunk_size)
+            except BaseException:
+                # Stop git if the output is abandoned (e.g. the task is cancelled)
+                if process.returncode is None:
+                    process.kill()
+                raise
+            finally:
+                status = await process.wait()
+                if writer is not None:
+                    await writer
+            if status:
+                stderr.seek(0)
+                raise git.GitCommandError(command, status, stderr.read())
 
     def generate_file_commits_from_commit(self, commit):
-        """Returns a list of FileCommit objects from a given commit."""
-        # TODO: Support generating list of files added from first commit (i.e. commit without parents)
-        diff_to_parent = commit.parents[0].diff(commit)
+        """Returns a list of FileCommit objects from a given commit.
+
+        A root commit is diffed against the empty tree, so every file in it is added. The
+        `batch` backend diffs the commit with its long-lived ``git diff-tree`` process.
+        Renames are detected as configured by :attr:`rename_detection`.
+        """
+        if self.batch:
+            for file_path, change_type in self.batch.diff(commit.hexsha):
+                yield FileCommit(commit, file_path, change_type, self.repo, self._custom_attributes)
+            return
+        profiling.count('git_processes')
+        paths = self.pathspec.args or None
+        diff_kwargs = self.rename_detection.diff_kwargs
+        if commit.parents:
+            diff_to_parent = commit.parents[0].diff(commit, paths=paths, **diff_kwargs)
+        else:
+            diff_to_parent = commit.diff(git.NULL_TREE, paths=paths, **diff_kwargs)
         for change_type in diff_to_parent.change_type:
             for change in diff_to_parent.iter_change_type(change_type):
                 yield FileCommit(
@@ -136,5 +707,129 @@ class GitHelper:
                     change.b_path,
                     change_type,
                     self.repo,
-                    self.custom_attributes
+                    self._custom_attributes
                 )
+
+
+def split_history(ranges, parents):
+    """Split a commit graph into the commits of each ``(hexsha_a, hexsha_b)`` range, like ``git rev-list a...b``.
+
+    When each range starts where the previous one ended (e.g. consecutive tags) and is a
+    descendant of it, only the commits new to the range are walked.
+
+    Arguments:
+        ranges (list): ``(hexsha_a, hexsha_b)`` tuples
+        parents (dict): The parent shas of every commit reachable from the ranges
+
+    Returns:
+        list: The set of shas reachable from only one end of each range
+    """
+    results = []
+    previous_hexsha, previous_ancestors = None, None
+    for hexsha_a, hexsha_b in ranges:
+        if hexsha_a == previous_hexsha:
+            ancestors_a = previous_ancestors
+        else:
+            ancestors_a, _ = _ancestors(hexsha_a, parents)
+        new, reached = _ancestors(hexsha_b, parents, ancestors_a)
+        if hexsha_a in reached:
+            # a is an ancestor of b so everything reachable from a is reachable from b
+            ancestors_a.update(new)
+            ancestors_b = ancestors_a
+            results.append(new)
+        else:
+            ancestors_b, _ = _ancestors(hexsha_b, parents)
+            results.append(ancestors_a ^ ancestors_b)
+        previous_hexsha, previous_ancestors = hexsha_b, ancestors_b
+    return results
+
+
+def first_parent_chains(hexshas, parents, members):
+    """Return the members of a range on the first parent chain of either end, like ``git rev-list --first-parent``.
+
+    Arguments:
+        hexshas (tuple): The shas of the ends of the range
+        parents (dict): The parent shas of every commit in the range
+        members (set): The shas of the range's commits, as returned by :func:`split_history`
+    """
+    chains = set()
+    for hexsha in hexshas:
+        while hexsha in members and hexsha not in chains:
+            chains.add(hexsha)
+            hexsha = next(iter(parents.get(hexsha, ())), None)
+    return chains
+
+
+def _ancestors(hexsha, parents, stop=frozenset()):
+    """Return the commits reachable from `hexsha` without passing through `stop`, and the `stop` commits reached."""
+    ancestors = set()
+    reached = set()
+    pending = [hexsha]
+    while pending:
+        current = pending.pop()
+        if current in stop:
+            reached.add(current)
+        elif current not in ancestors:
+            ancestors.add(current)
+            pending.extend(parents.get(current, ()))
+    return ancestors, reached
+
+
+# GitHelpers opened by worker processes, keyed by path, git backend, pathspec, walk and rename detection
+_worker_git_helpers = {}
+
+
+def _read_commits_in_worker(args):
+    """Read the commits with the given shas in a worker process.
+
+    Returns:
+        list: A picklable ``(fields, changes, prefetched)`` tuple for each commit
+    """
+    path, git_backend, paths, exclude_paths, first_parent, rename_options, hexshas, prefetched_attributes = args
+    key = (path, git_backend, paths, exclude_paths, first_parent, rename_options)
+    if key not in _worker_git_helpers:
+        _worker_git_helpers[key] = GitHelper(
+            path, git_backend=git_backend, paths=paths, exclude_paths=exclude_paths, first_parent=first_parent,
+            **dict(rename_options)
+        )
+    git_helper = _worker_git_helpers[key]
+    results = []
+    for commit, changes in git_helper._read_listed_commits([(hexsha, None) for hexsha in hexshas]):
+        prefetched = {}
+        for attribute in prefetched_attributes:
+            value = getattr(commit.commit, attribute)
+            if isinstance(value, (str, bytes, int, float)):
+                # Anything else is left to be loaded lazily by the main process
+                prefetched[attribute] = value
+        results.append((commit.to_fields(), changes, prefetched))
+    return results
+
+
+def _write_and_close(stream, data):
+    try:
+        stream.write(data)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            stream.close()
+        except BrokenPipeError:
+            pass
+
+
+async def _write_and_close_async(stream, data):
+    try:
+        stream.write(data)
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        stream.close()
+
+
+async def _read_chunks_async(stream, chunk_size):
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,366 @@
+"""Helpers to read commits and their changed files from a single ``git log`` stream."""
+import sys
+import functools
+import git
+
+
+# Every field is NUL separated so that `-z` output can be tokenised without any ambiguity.
+# The message is deliberately the last field as it is the only one which may contain newlines.
+LOG_FORMAT = '%x00'.join([
+    '%H',   # hexsha
+    '%h',   # hexsha abbreviated to at least 7 characters, as `git rev-parse --short=7` would
+    '%P',   # parent hexshas
+    '%an',  # author name
+    '%ae',  # author email
+    '%at',  # authored date
+    '%cn',  # committer name
+    '%ce',  # committer email
+    '%ct',  # committed date
+    '%B',   # raw message
+])
+LOG_FIELD_COUNT = LOG_FORMAT.count('%x00') + 1
+
+# The order in which GitPython's DiffIndex.iter_change_type is walked by GitHelper
+CHANGE_TYPE_ORDER = ('A', 'C', 'D', 'R', 'M', 'T')
+
+
+class RenameDetection:
+    """How a deleted and an added file are paired up as a rename when a commit is diffed.
+
+    Parameters:
+        enabled (bool): Detect renames, otherwise a renamed file is reported as deleted and added,
+            which is much faster for commits that add and delete thousands of files
+        threshold (int): The percentage similarity for a deleted and added file to be a rename, as
+            ``-M<threshold>%``, defaults to git's 50%. At 100 only identical files are paired, which
+            is cheap as no file's content is compared
+        limit (int): Only pair files by similarity (rather than just identical files) in commits with
+            at most this many added and deleted files, as ``-l<limit>``, defaults to git's limit
+            and is unlimited if 0
+    """
+
+    def __init__(self, enabled=True, threshold=None, limit=None):
+        """Init RenameDetection with whether it is enabled, its threshold and its limit.
+
+        Raises:
+            ValueError: If threshold isn't a percentage or limit is negative, or either is given without
+                rename detection being enabled
+        """
+        if not enabled and (threshold is not None or limit is not None):
+            raise ValueError('A rename threshold or limit can not be given when rename detection is disabled')
+        if threshold is not None and not 0 <= threshold <= 100:
+            raise ValueError(f'The rename threshold must be a percentage between 0 and 100, not {threshold}')
+        if limit is not None and limit < 0:
+            raise ValueError(f'The rename limit must not be negative, not {limit}')
+        self.enabled = enabled
+        self.threshold = threshold
+        self.limit = limit
+
+    @property
+    def args(self):
+        """The options to pass to ``git log`` or ``git diff-tree``.
+
+        Returns:
+            list
+        """
+        if not self.enabled:
+            return ['--no-renames']
+        return [
+            f'-M{self.threshold}%' if self.threshold is not None else '-M',
+            *([f'-l{self.limit}'] if self.limit is not None else [])
+        ]
+
+    @property
+    def diff_kwargs(self):
+        """The keyword arguments to pass to GitPython's :meth:`~git.diff.Diffable.diff`, which otherwise runs ``-M``.
+
+        Returns:
+            dict
+        """
+        if not self.enabled:
+            return {'no_renames': True}
+        kwargs = {'find_renames': f'{self.threshold}%'} if self.threshold is not None else {}
+        if self.limit is not None:
+            kwargs['l'] = self.limit
+        return kwargs
+
+    def __repr__(self):
+        """Return representation of the rename detection."""
+        return f'RenameDetection({self.enabled}, {self.threshold}, {self.limit})'
+
+
+# The options which decide which files are reported as changed and how, by default
+DIFF_ARGS = RenameDetection().args
+# Identifies commit cache entries produced with DIFF_ARGS
+CACHE_VARIANT = ' '.join(DIFF_ARGS)
+
+
+def log_args(diff_args=DIFF_ARGS):
+    """Return the arguments for a ``git log`` whose output :class:`GitLogParser` parses.
+
+    --abbrev also shortens the blob ids in the raw output, which is harmless as they are only compared
+    to each other and an abbreviation is unique within the repository.
+
+    Arguments:
+        diff_args (list): The options which decide which files are reported as changed and how
+    """
+    return ['--raw', '-z', *diff_args, '--abbrev=7', '--no-color', f'--format={LOG_FORMAT}']
+
+
+LOG_ARGS = log_args()
+
+
+class LogCommit:
+    """The metadata of a single commit as read from ``git log``.
+
+    This mimics the parts of :class:`~git.objects.commit.Commit` used by templates,
+    any other attribute is read from the full :class:`~git.objects.commit.Commit`
+    which is loaded lazily the first time it is required.
+
+    Parameters:
+        repo (Repo): The :class:`~git.repo.base.Repo` that the commit is from
+        hexsha (str): Long form commit sha
+        hexsha_short (str): Short form commit sha
+        parent_hexshas (tuple): Long form shas of the commit's parents
+        author (Actor): The :class:`~git.util.Actor` that authored the commit
+        authored_date (int): Authored date as seconds since the epoch
+        committer (Actor): The :class:`~git.util.Actor` that committed the commit
+        committed_date (int): Committed date as seconds since the epoch
+        message (str): The commit message
+
+    Attributes:
+        prefetched (dict): Values of other attributes of the full commit, read ahead of time
+            (e.g. by a worker process) so the full commit need not be loaded for them, or ``None``
+    """
+    __slots__ = (
+        'repo', 'hexsha', 'hexsha_short', 'parent_hexshas', 'author', 'authored_date',
+        'committer', 'committed_date', 'message', 'prefetched', '_commit'
+    )
+    attributes = (
+        'hexsha', 'hexsha_short', 'parent_hexshas', 'author', 'authored_date',
+        'committer', 'committed_date', 'message', 'summary'
+    )
+
+    def __init__(self, repo, hexsha, hexsha_short, parent_hexshas, author, authored_date,
+                 committer, committed_date, message):
+        """Init LogCommit with the fields read from ``git log``."""
+        self.repo = repo
+        self.hexsha = hexsha
+        self.hexsha_short = hexsha_short
+        self.parent_hexshas = parent_hexshas
+        self.author = author
+        self.authored_date = authored_date
+        self.committer = committer
+        self.committed_date = committed_date
+        self.message = message
+        self.prefetched = None
+        self._commit = None
+
+    @classmethod
+    def from_fields(cls, repo, fields, hexsha_short=None):
+        """Create a LogCommit from the output of :meth:`to_fields`."""
+        (hexsha, parent_hexshas, author_name, author_email, authored_date,
+         committer_name, committer_email, committed_date, message) = fields
+        return cls(
+            repo,
+            hexsha,
+            hexsha_short,
+            tuple(parent_hexshas),
+            actor(author_name, author_email),
+            authored_date,
+            actor(committer_name, committer_email),
+            committed_date,
+            message
+        )
+
+    def to_fields(self):
+        """Return the commit's fields (apart from the short sha) as a JSON serialisable list."""
+        return [
+            self.hexsha,
+            self.parent_hexshas,
+            self.author.name,
+            self.author.email,
+            self.authored_date,
+            self.committer.name,
+            self.committer.email,
+            self.committed_date,
+            self.message,
+        ]
+
+    @property
+    def summary(self):
+        """The first line of the commit message.
+
+        Returns:
+            str
+        """
+        return self.message.split('\n', 1)[0]
+
+    @property
+    def commit(self):
+        """The full :class:`~git.objects.commit.Commit` object, loaded on first access."""
+        if self._commit is None:
+            self._commit = self.repo.commit(self.hexsha)
+        return self._commit
+
+    def __getattr__(self, attr):
+        """Return the value from the full commit object if not found directly on LogCommit object."""
+        if attr.startswith('__') or attr in LogCommit.__slots__:
+            raise AttributeError(attr)
+        if self.prefetched and attr in self.prefetched:
+            return self.prefetched[attr]
+        return getattr(self.commit, attr)
+
+    def __eq__(self, other):
+        """Commits are equal when their shas are equal."""
+        return getattr(other, 'hexsha', None) == self.hexsha
+
+    def __hash__(self):
+        """Hash the commit by its sha."""
+        return hash(self.hexsha)
+
+    def __str__(self):
+        """Return the long form commit sha, as GitPython does."""
+        return self.hexsha
+
+    def __repr__(self):
+        """Return representation of the commit."""
+        return f'LogCommit("{self.hexsha}")'
+
+
+@functools.lru_cache(maxsize=4096)
+def actor(name, email):
+    """Return an :class:`~git.util.Actor`, shared with every other commit by the same person.
+
+    Templates only ever read an actor's name and email so sharing one object is safe,
+    and saves holding the same strings once per commit.
+    """
+    return git.Actor(sys.intern(name), sys.intern(email))
+
+
+def expand_raw_changes(raw_changes):
+    """Yield ``(file_path, change_type)`` pairs for the raw changes of a single commit.
+
+    The order and duplication rules match iterating GitPython's
+    :meth:`~git.diff.DiffIndex.iter_change_type` once for each of :data:`CHANGE_TYPE_ORDER`,
+    e.g. a rename with modifications is reported as both `R` and `M`.
+
+    Arguments:
+        raw_changes (list): A list of ``(status, a_blob, b_blob, b_path)`` tuples where
+            `a_blob` and `b_blob` are ``None`` when the file does not exist on that side
+    """
+    for change_type in CHANGE_TYPE_ORDER:
+        for status, a_blob, b_blob, b_path in raw_changes:
+            if status == change_type:
+                yield b_path, change_type
+            elif change_type == 'M' and a_blob and b_blob and a_blob != b_blob:
+                yield b_path, change_type
+
+
+def raw_change(meta, paths):
+    """Return the ``(status, a_blob, b_blob, b_path)`` tuple for a single ``--raw -z`` diff entry.
+
+    Arguments:
+        meta (bytes): The entry's modes, blob ids and status, e.g. ``:100644 100644 af8a489 7af60b5 R094``
+        paths (list): The entry's path (or old and new paths for a rename or copy) as bytes
+    """
+    _, _, a_blob, b_blob, status = meta.lstrip(b'\n:').decode('ascii').split()
+    return status[0], _blob_id(a_blob), _blob_id(b_blob), paths[-1].decode('utf-8', 'replace')
+
+
+def raw_path_count(meta):
+    """Return how many paths follow a ``--raw -z`` diff entry's `meta`, two for a rename or copy."""
+    return 2 if meta.split()[-1][:1] in (b'R', b'C') else 1
+
+
+def _blob_id(raw_blob_id):
+    """Return None for the all zero id git uses for a missing file.
+
+    Older versions of git follow abbreviated ids with an ellipsis.
+    """
+    blob_id = raw_blob_id.rstrip('.')
+    return blob_id if blob_id.strip('0') else None
+
+
+class GitLogParser:
+    """Incrementally parse the output of ``git log`` run with :data:`LOG_ARGS`.
+
+    Feed it chunks of bytes as they are read from git and it will yield a
+    ``(LogCommit, changes)`` tuple for each complete commit, where `changes` is a list
+    of ``(file_path, change_type)`` tuples.
+
+    Parameters:
+        repo (Repo): The :class:`~git.repo.base.Repo` that the log is from
+    """
+
+    def __init__(self, repo):
+        """Init GitLogParser with an empty buffer."""
+        self.repo = repo
+        self._buffer = b''
+        self._fields = []
+        self._commit = None
+        self._raw_changes = []
+        self._meta = None
+        self._paths = []
+
+    def feed(self, data):
+        """Parse a chunk of ``git log`` output, yielding each commit it completes."""
+        self._buffer += data
+        *tokens, self._buffer = self._buffer.split(b'\0')
+        for token in tokens:
+            yield from self._consume(token)
+
+    def close(self):
+        """Yield the final commit once all output has been fed."""
+        if self._buffer:
+            yield from self._consume(self._buffer)
+            self._buffer = b''
+        if self._fields:
+            # A trailing commit whose message was not NUL terminated
+            self._fields.append(b'')
+            self._start_commit()
+        if self._commit is not None:
+            yield self._finish_commit()
+
+    def _consume(self, token):
+        if self._meta is not None:
+            self._paths.append(token)
+            if len(self._paths) == raw_path_count(self._meta):
+                self._add_raw_change()
+            return
+        if self._commit is not None:
+            if token[:2] == b'\n:' or token[:1] == b':':
+                self._meta = token
+                return
+            yield self._finish_commit()
+        self._fields.append(token)
+        if len(self._fields) == LOG_FIELD_COUNT:
+            self._start_commit()
+
+    def _start_commit(self):
+        (hexsha, hexsha_short, parents, author_name, author_email, authored_date,
+         committer_name, committer_email, committed_date, message) = [
+            field.decode('utf-8', 'replace') for field in self._fields
+        ]
+        self._fields = []
+        self._commit = LogCommit(
+            self.repo,
+            hexsha,
+            hexsha_short,
+            tuple(parents.split()),
+            actor(author_name, author_email),
+            int(authored_date),
+            actor(committer_name, committer_email),
+            int(committed_date),
+            message
+        )
+
+    def _add_raw_change(self):
+        self._raw_changes.append(raw_change(self._meta, self._paths))
+        self._meta = None
+        self._paths = []
+
+    def _finish_commit(self):
+        commit, raw_changes = self._commit, self._raw_changes
+        self._commit = None
+        self._raw_changes = []
+        return commit, list(expand_raw_changes(raw_changes))
@@ -0,0 +1,178 @@
+"""Generate one changelog from the commits of many repositories listed in a manifest."""
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+from .generatechangelog import GenerateChangelog
+from .githelper import GitHelper
+from .constants import DEFAULT_MANIFEST_WORKERS
+
+
+class ManifestRepository:
+    """A repository listed in a manifest and the range of its commits to include.
+
+    Parameters:
+        name (str): The name its FileCommits are tagged with as `repository`
+        git_path (str): The path that contains its `.git` folder
+        start_ref (str): The commit sha or git ref that its comparison will start from
+        end_ref (str): The commit sha or git ref that its comparison will end at
+    """
+
+    __slots__ = ('name', 'git_path', 'start_ref', 'end_ref')
+
+    def __init__(self, name, git_path, start_ref, end_ref):
+        """Init ManifestRepository with its name, path and refs."""
+        self.name = name
+        self.git_path = git_path
+        self.start_ref = start_ref
+        self.end_ref = end_ref
+
+    def __eq__(self, other):
+        """Return whether another ManifestRepository has the same fields."""
+        return isinstance(other, ManifestRepository) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    def __repr__(self):
+        """Return representation of the repository."""
+        return f'ManifestRepository({self.name}, {self.git_path}, {self.start_ref}, {self.end_ref})'
+
+
+def load_manifest(path):
+    """Read the repositories listed by a YAML manifest.
+
+    The manifest lists each repository under `repositories` with the same key names as the
+    ``.sgc`` config file, e.g.
+
+    .. code-block :: yaml
+
+        repositories:
+          - name: api
+            git-path: services/api
+            start-ref: 1.4.0
+            end-ref: 1.5.0
+
+    `name` defaults to the name of the repository's folder, and a relative `git-path` is relative to
+    the folder the manifest is in.
+
+    Args:
+        path (str): The path to the manifest
+
+    Returns:
+        list: ManifestRepository objects in the order they are listed
+
+    Raises:
+        ValueError: If the manifest doesn't list any repositories, a repository lacks a field or
+            has an unknown one, or two repositories have the same name
+    """
+    with open(path) as reader:
+        manifest = yaml.safe_load(reader) or {}
+    entries = manifest.get('repositories') if isinstance(manifest, dict) else None
+    if not entries or not isinstance(entries, list):
+        raise ValueError(f'{path} must list the repositories to include under `repositories`')
+    base_path = os.path.dirname(os.path.abspath(path))
+    repositories = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f'Repository {index + 1} in {path} must be a mapping of git-path, start-ref and end-ref')
+        fields = {key.replace('-', '_'): value for key, value in entry.items()}
+        unknown = sorted(set(fields) - set(ManifestRepository.__slots__))
+        if unknown:
+            raise ValueError(f'Unknown fields {", ".join(unknown)} for repository {index + 1} in {path}')
+        missing = [field for field in ('git_path', 'start_ref', 'end_ref') if not fields.get(field)]
+        if missing:
+            raise ValueError(f'Repository {index + 1} in {path} lacks {", ".join(missing)}')
+        git_path = os.path.normpath(os.path.join(base_path, os.path.expanduser(str(fields['git_path']))))
+        repositories.append(ManifestRepository(
+            str(fields.get('name') or os.path.basename(git_path)),
+            git_path,
+            str(fields['start_ref']),
+            str(fields['end_ref'])
+        ))
+    names = [repository.name for repository in repositories]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f'Repository names must be unique, {", ".join(duplicates)} is listed more than once in {path}')
+    return repositories
+
+
+class ManifestChangelog(GenerateChangelog):
+    """Generate a single changelog from the commits of many repositories.
+
+    The repositories are read concurrently, then the template is given the FileCommits of every
+    repository as one `file_commits`, in the order the repositories are listed, with each tagged
+    with its repository's name as `repository`, e.g. to group them with
+    ``file_commits_index.by('repository')``. The template is also given the list of `repositories`,
+    each with its `name`, `start_ref` and `end_ref`, while `start_ref` and `end_ref` are ``None``.
+
+    Parameters:
+        repositories (str): The path to a manifest read by :func:`load_manifest`,
+            or a list of ManifestRepository objects
+        max_workers (int): The number of repositories to read at once
+        aggregate_by (list): As for :class:`~samsgeneratechangelog.GenerateChangelog`, but the aggregates
+            are also separated by repository so that the same path in two repositories isn't folded together
+        **kwargs: Any other :class:`~samsgeneratechangelog.GenerateChangelog` arguments apart from
+            `start_ref`, `end_ref`, `git_path` and `git_helper`, which are used for every repository
+    """
+
+    def __init__(self, repositories, max_workers=DEFAULT_MANIFEST_WORKERS, aggregate_by=None, **kwargs):
+        """Init ManifestChangelog with a GitHelper for each repository."""
+        self.repositories = load_manifest(repositories) if isinstance(repositories, str) else list(repositories)
+        self.max_workers = max_workers
+        self.git_helpers = []
+        super().__init__(aggregate_by=None if aggregate_by is None else ['repository', *aggregate_by], **kwargs)
+
+    def _create_git_helper(self, **options):
+        self.git_helpers = [
+            GitHelper(repository.git_path, self.custom_attributes, **options) for repository in self.repositories
+        ]
+        return None
+
+    def _file_commits(self):
+        """Yield the FileCommits of every repository, read by a pool of threads.
+
+        Each repository's commits are mostly read by git in a process of its own, so threads
+        are enough to read many repositories at once.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            logs = executor.map(_read_log, self.repositories, self.git_helpers)
+            for repository, file_commits in zip(self.repositories, logs):
+                for file_commit in file_commits:
+                    file_commit.repository = repository.name
+                    yield file_commit
+
+    async def _file_commits_async(self, executor):
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def read_log(repository, git_helper):
+            async with semaphore:
+                return [
+                    file_commit async for file_commit in git_helper.commit_log_async(
+                        repository.start_ref, repository.end_ref, executor
+                    )
+                ]
+
+        logs = await asyncio.gather(*(
+            read_log(repository, git_helper) for repository, git_helper in zip(self.repositories, self.git_helpers)
+        ))
+        for repository, file_commits in zip(self.repositories, logs):
+            for file_commit in file_commits:
+                file_commit.repository = repository.name
+                yield file_commit
+
+    def _template_context(self, start_ref, end_ref, file_commits):
+        return dict(super()._template_context(start_ref, end_ref, file_commits), repositories=self.repositories)
+
+    def render_backfill(self, tag_pattern=None, tag_sort='creatordate'):
+        """Backfilling isn't supported as each repository is tagged independently.
+
+        Raises:
+            ValueError: Always
+        """
+        raise ValueError('A changelog of many repositories can not be backfilled')
+
+
+def _read_log(repository, git_helper):
+    logging.debug(f'Reading {repository.name} from {repository.start_ref} to {repository.end_ref}')
+    return list(git_helper.commit_log(repository.start_ref, repository.end_ref))
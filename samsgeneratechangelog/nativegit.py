@@ -0,0 +1,977 @@
+"""A pure Python reader of git's object database, used by the ``native`` git backend.
+
+Commits, trees and refs are read straight from the `.git` folder (loose objects and
+memory-mapped packfiles) and trees are diffed in-process, so no ``git`` processes are run
+for the commits read this way.
+"""
+import os
+import re
+import mmap
+import zlib
+import heapq
+import struct
+import itertools
+from collections import OrderedDict
+import git
+from .gitlog import LogCommit, actor, expand_raw_changes
+from . import profiling
+
+OBJECT_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+OFS_DELTA = 6
+REF_DELTA = 7
+TREE_MODE = 0o40000
+FORMAT_MASK = 0o170000
+REGULAR_FILE_MODE = 0o100000
+HEXSHA_PATTERN = re.compile(r'^[0-9a-f]{4,40}$')
+REVISION_SUFFIX_PATTERN = re.compile(r'(\^\{(?:commit)?\}|[~^][0-9]*)$')
+
+# Rename detection follows git's diffcore-rename and diffcore-delta
+MAX_SCORE = 60000
+DEFAULT_RENAME_SCORE = MAX_SCORE // 2
+DEFAULT_RENAME_LIMIT = 1000
+HASHBASE = 107927
+# How many extra commits the walk reads once only shared history is left, to allow for clock skew
+WALK_SLOP = 5
+LEFT = 1
+RIGHT = 2
+
+
+class PackFile:
+    """A packfile and its version 2 `.idx` file, both memory-mapped.
+
+    Parameters:
+        idx_path (str): The path to the pack's `.idx` file
+    """
+
+    def __init__(self, idx_path):
+        """Init PackFile by mapping the index and pack into memory."""
+        self.idx_path = idx_path
+        self.idx = self._map(idx_path)
+        if self.idx[:8] != b'\377tOc\0\0\0\2':
+            raise ValueError(f'Unsupported pack index format in {idx_path}')
+        self.fanout = struct.unpack('>256I', self.idx[8:1032])
+        self.count = self.fanout[255]
+        self._sha_offset = 1032
+        self._offset_offset = 1032 + self.count * 24
+        self._large_offset_offset = self._offset_offset + self.count * 4
+        self.pack = self._map(idx_path[:-len('.idx')] + '.pack')
+
+    @staticmethod
+    def _map(path):
+        with open(path, 'rb') as reader:
+            return mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def sha_at(self, position):
+        """Return the binary sha at `position` in the index's sorted sha table."""
+        start = self._sha_offset + position * 20
+        return self.idx[start:start + 20]
+
+    def position(self, binsha):
+        """Return the position of the first sha in the index that is not less than `binsha`."""
+        first_byte = binsha[0]
+        low = self.fanout[first_byte - 1] if first_byte else 0
+        high = self.fanout[first_byte]
+        while low < high:
+            middle = (low + high) // 2
+            if self.sha_at(middle) < binsha:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def offset(self, binsha):
+        """Return the offset of the object within the pack, or ``None`` if it is not in this pack."""
+        position = self.position(binsha)
+        if position >= self.count or self.sha_at(position) != binsha:
+            return None
+        start = self._offset_offset + position * 4
+        offset, = struct.unpack('>I', self.idx[start:start + 4])
+        if offset & 0x80000000:
+            start = self._large_offset_offset + (offset & 0x7fffffff) * 8
+            offset, = struct.unpack('>Q', self.idx[start:start + 8])
+        return offset
+
+    def neighbours(self, binsha):
+        """Return the shas either side of where `binsha` is or would be in the index."""
+        position = self.position(binsha)
+        if position < self.count and self.sha_at(position) == binsha:
+            after = position + 1
+        else:
+            after = position
+        return [
+            self.sha_at(index) for index in (position - 1, after)
+            if 0 <= index < self.count
+        ]
+
+    def read_header(self, offset):
+        """Return the type number, size and data offset of the entry at `offset`, plus its delta base.
+
+        The delta base is the base's pack offset for an offset delta or its binary sha
+        for a ref delta, and ``None`` for any other entry.
+        """
+        pack = self.pack
+        byte = pack[offset]
+        type_number = (byte >> 4) & 7
+        size = byte & 15
+        shift = 4
+        offset += 1
+        while byte & 0x80:
+            byte = pack[offset]
+            size |= (byte & 0x7f) << shift
+            shift += 7
+            offset += 1
+        base = None
+        if type_number == OFS_DELTA:
+            byte = pack[offset]
+            offset += 1
+            distance = byte & 0x7f
+            while byte & 0x80:
+                byte = pack[offset]
+                offset += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7f)
+            base = distance
+        elif type_number == REF_DELTA:
+            base = pack[offset:offset + 20]
+            offset += 20
+        return type_number, size, offset, base
+
+    def inflate(self, offset, size):
+        """Return the zlib compressed data starting at `offset` which inflates to `size` bytes."""
+        decompressor = zlib.decompressobj()
+        chunks = []
+        chunk_size = size + 64
+        while not decompressor.eof:
+            compressed = self.pack[offset:offset + chunk_size]
+            if not compressed:
+                raise ValueError(f'Truncated object in {self.idx_path}')
+            chunks.append(decompressor.decompress(compressed))
+            offset += chunk_size
+            chunk_size = max(chunk_size, 65536)
+        return b''.join(chunks)
+
+    def close(self):
+        """Unmap the index and pack."""
+        self.idx.close()
+        self.pack.close()
+
+
+class ObjectDatabase:
+    """Read objects from a repository's loose object folders and packfiles.
+
+    Parameters:
+        objects_dir (str): The path to the `objects` folder of the repository
+        cache_size (int): How many recently read objects to keep, mostly so that
+            delta chains in packs are not inflated repeatedly
+    """
+
+    def __init__(self, objects_dir, cache_size=512):
+        """Init ObjectDatabase with the object folders of the repository and its alternates."""
+        self.objects_dirs = [objects_dir, *self._alternates(objects_dir)]
+        self.packs = []
+        self._pack_paths = set()
+        self._loose_listings = {}
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self.refresh()
+
+    @staticmethod
+    def _alternates(objects_dir):
+        try:
+            with open(os.path.join(objects_dir, 'info', 'alternates')) as reader:
+                lines = reader.read().splitlines()
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.normpath(os.path.join(objects_dir, line.strip()))
+            for line in lines
+            if line.strip() and not line.startswith('#')
+        ]
+
+    def refresh(self):
+        """Pick up any packs created since the database was opened."""
+        for objects_dir in self.objects_dirs:
+            pack_dir = os.path.join(objects_dir, 'pack')
+            try:
+                names = sorted(os.listdir(pack_dir))
+            except FileNotFoundError:
+                continue
+            for name in names:
+                path = os.path.join(pack_dir, name)
+                if name.endswith('.idx') and path not in self._pack_paths \
+                        and os.path.exists(path[:-len('.idx')] + '.pack'):
+                    self.packs.append(PackFile(path))
+                    self._pack_paths.add(path)
+        self._loose_listings = {}
+
+    def read(self, hexsha):
+        """Return the type and content of an object.
+
+        Returns:
+            tuple: ``(type, data)`` where type is one of `commit`, `tree`, `blob` or `tag`
+
+        Raises:
+            BadObject: If the object doesn't exist
+        """
+        cached = self._cache.get(hexsha)
+        if cached is not None:
+            self._cache.move_to_end(hexsha)
+            return cached
+        result = self._read_uncached(hexsha)
+        if result is None:
+            self.refresh()
+            result = self._read_uncached(hexsha)
+            if result is None:
+                raise git.BadObject(hexsha)
+        self._remember(hexsha, result)
+        return result
+
+    def _remember(self, key, value):
+        self._cache[key] = value
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _read_uncached(self, hexsha):
+        binsha = bytes.fromhex(hexsha)
+        for pack in self.packs:
+            offset = pack.offset(binsha)
+            if offset is not None:
+                return self._read_packed(pack, offset)
+        for objects_dir in self.objects_dirs:
+            try:
+                with open(os.path.join(objects_dir, hexsha[:2], hexsha[2:]), 'rb') as reader:
+                    raw = zlib.decompress(reader.read())
+            except FileNotFoundError:
+                continue
+            header, _, data = raw.partition(b'\0')
+            object_type, _ = header.split(b' ')
+            return object_type.decode('ascii'), data
+        return None
+
+    def _read_packed(self, pack, offset):
+        """Return the ``(type, data)`` of the pack entry at `offset`, applying any chain of deltas."""
+        deltas = []
+        while True:
+            key = (pack.idx_path, offset)
+            cached = self._cache.get(key)
+            if cached is not None:
+                object_type, data = cached
+                break
+            type_number, size, data_offset, base = pack.read_header(offset)
+            if type_number == OFS_DELTA:
+                deltas.append((key, pack.inflate(data_offset, size)))
+                offset -= base
+            elif type_number == REF_DELTA:
+                deltas.append((key, pack.inflate(data_offset, size)))
+                object_type, data = self.read(base.hex())
+                break
+            else:
+                object_type, data = OBJECT_TYPES[type_number], pack.inflate(data_offset, size)
+                self._remember(key, (object_type, data))
+                break
+        for key, delta in reversed(deltas):
+            data = apply_delta(data, delta)
+            self._remember(key, (object_type, data))
+        return object_type, data
+
+    def shortest_unique_prefix(self, hexsha, min_length=7):
+        """Return the shortest abbreviation of `hexsha` that no other object shares, as ``git log %h`` does."""
+        binsha = bytes.fromhex(hexsha)
+        length = min_length
+        for pack in self.packs:
+            for other in pack.neighbours(binsha):
+                length = max(length, _common_hex_prefix(other.hex(), hexsha) + 1)
+        for other in self._loose_hexshas(hexsha[:2]):
+            if other != hexsha:
+                length = max(length, _common_hex_prefix(other, hexsha) + 1)
+        return hexsha[:length]
+
+    def resolve_prefix(self, prefix):
+        """Return the sha of the only object whose sha starts with the hex `prefix`, or ``None``.
+
+        Raises:
+            BadName: If more than one object matches
+        """
+        matches = set()
+        padded = bytes.fromhex(prefix[:len(prefix) // 2 * 2] + ('0' * (40 - len(prefix) // 2 * 2)))
+        for pack in self.packs:
+            position = pack.position(padded)
+            while position < pack.count:
+                candidate = pack.sha_at(position).hex()
+                if not candidate.startswith(prefix[:len(prefix) // 2 * 2]):
+                    break
+                if candidate.startswith(prefix):
+                    matches.add(candidate)
+                position += 1
+        matches.update(
+            hexsha for hexsha in self._loose_hexshas(prefix[:2]) if hexsha.startswith(prefix)
+        )
+        if len(matches) > 1:
+            raise git.BadName(f'short sha {prefix} is ambiguous')
+        return matches.pop() if matches else None
+
+    def _loose_hexshas(self, fan):
+        if fan not in self._loose_listings:
+            hexshas = []
+            for objects_dir in self.objects_dirs:
+                try:
+                    hexshas.extend(fan + name for name in os.listdir(os.path.join(objects_dir, fan)) if len(name) == 38)
+                except FileNotFoundError:
+                    pass
+            self._loose_listings[fan] = hexshas
+        return self._loose_listings[fan]
+
+    def close(self):
+        """Unmap every pack."""
+        for pack in self.packs:
+            pack.close()
+        self.packs = []
+        self._pack_paths = set()
+
+
+def apply_delta(base, delta):
+    """Return the object described by a git pack `delta` against `base`."""
+    position = 0
+    for _ in range(2):
+        # The source and target sizes, the latter is implied by the instructions
+        while delta[position] & 0x80:
+            position += 1
+        position += 1
+    result = bytearray()
+    length = len(delta)
+    while position < length:
+        instruction = delta[position]
+        position += 1
+        if instruction & 0x80:
+            copy_offset = copy_size = 0
+            for index in range(4):
+                if instruction & (1 << index):
+                    copy_offset |= delta[position] << (8 * index)
+                    position += 1
+            for index in range(3):
+                if instruction & (0x10 << index):
+                    copy_size |= delta[position] << (8 * index)
+                    position += 1
+            result += base[copy_offset:copy_offset + (copy_size or 0x10000)]
+        elif instruction:
+            result += delta[position:position + instruction]
+            position += instruction
+        else:
+            raise ValueError('Invalid delta instruction')
+    return bytes(result)
+
+
+def _common_hex_prefix(hexsha_a, hexsha_b):
+    length = 0
+    for char_a, char_b in zip(hexsha_a, hexsha_b):
+        if char_a != char_b:
+            break
+        length += 1
+    return length
+
+
+class ParsedCommit:
+    """The raw headers of a commit object.
+
+    Parameters:
+        hexsha (str): Long form commit sha
+        data (bytes): The content of the commit object
+    """
+    __slots__ = ('hexsha', 'tree', 'parents', 'author', 'committer', 'committed_date', 'encoding', 'message')
+
+    def __init__(self, hexsha, data):
+        """Init ParsedCommit by parsing the object's headers."""
+        self.hexsha = hexsha
+        header, _, self.message = data.partition(b'\n\n')
+        self.parents = []
+        self.tree = self.author = self.committer = None
+        self.encoding = 'utf-8'
+        for line in header.split(b'\n'):
+            key, _, value = line.partition(b' ')
+            if key == b'tree':
+                self.tree = value.decode('ascii')
+            elif key == b'parent':
+                self.parents.append(value.decode('ascii'))
+            elif key == b'author':
+                self.author = value
+            elif key == b'committer':
+                self.committer = value
+            elif key == b'encoding':
+                self.encoding = value.decode('ascii', 'replace')
+        self.committed_date = _parse_identity(self.committer)[2] if self.committer else 0
+
+    def to_log_commit(self, repo, hexsha_short):
+        """Return a LogCommit with the commit's metadata decoded as ``git log`` would.
+
+        Arguments:
+            repo (Repo): The :class:`~git.repo.base.Repo` the commit is from
+            hexsha_short (str): Short form commit sha
+        """
+        author_name, author_email, authored_date = _parse_identity(self.author or b'')
+        committer_name, committer_email, committed_date = _parse_identity(self.committer or b'')
+        return LogCommit(
+            repo,
+            self.hexsha,
+            hexsha_short,
+            tuple(self.parents),
+            actor(_decode(author_name, self.encoding), _decode(author_email, self.encoding)),
+            authored_date,
+            actor(_decode(committer_name, self.encoding), _decode(committer_email, self.encoding)),
+            committed_date,
+            _decode(self.message, self.encoding)
+        )
+
+
+def _parse_identity(value):
+    """Split an ``author`` or ``committer`` header value into its name, email and timestamp."""
+    identity, _, rest = value.rpartition(b'>')
+    name, _, email = identity.partition(b'<')
+    timestamp = rest.split()[:1]
+    return name.strip(), email, int(timestamp[0]) if timestamp and timestamp[0].isdigit() else 0
+
+
+class NativeGit:
+    """Read commits and the files they change from a repository without running ``git``.
+
+    The results match ``git log --raw -M`` run with :data:`~samsgeneratechangelog.gitlog.LOG_ARGS`:
+    commits are listed newest first by commit date, merges are not diffed (unless following first
+    parents) and renames are detected with git's similarity estimate, by default with git's limits.
+
+    Parameters:
+        repo (Repo): The :class:`~git.repo.base.Repo` to read, used for its paths and by LogCommit
+            to load any attribute not read here
+        rename_score (int): The similarity, out of :data:`MAX_SCORE`, for an added and deleted file to
+            be treated as a rename
+        rename_limit (int): Skip inexact rename detection for a commit with more than this many
+            added and deleted files
+        detect_renames (bool): Pair deleted and added files as renames, otherwise they are left as they are
+        pathspec (Pathspec): Only diff the files it includes, as ``git log`` would if given it,
+            so that folders it doesn't include are never read
+        first_parent (bool): Only walk the first parent of each commit and diff merges against it,
+            as ``git log --first-parent`` does
+
+    Raises:
+        ValueError: If the repository has replacement objects (``refs/replace``), which aren't read
+            here, unless ``GIT_NO_REPLACE_OBJECTS`` is set so that git would ignore them too
+    """
+
+    def __init__(self, repo, rename_score=DEFAULT_RENAME_SCORE, rename_limit=DEFAULT_RENAME_LIMIT, pathspec=None,
+                 first_parent=False, detect_renames=True):
+        """Init NativeGit with the repository's git folders and object database."""
+        self.repo = repo
+        self.pathspec = pathspec
+        self.first_parent = first_parent
+        self.git_dir = repo.git_dir
+        self.common_dir = getattr(repo, 'common_dir', None) or repo.git_dir
+        self.objects = ObjectDatabase(os.path.join(self.common_dir, 'objects'))
+        self.rename_score = rename_score
+        self.rename_limit = rename_limit
+        self.detect_renames = detect_renames
+        self._packed_refs = None
+        self._packed_refs_state = None
+        if not os.environ.get('GIT_NO_REPLACE_OBJECTS') and self._has_replace_refs():
+            raise ValueError(
+                f'{self.git_dir} has replacement objects (refs/replace) which the native git backend '
+                'can not read, use the subprocess or batch backend instead'
+            )
+        self._shallow = self._read_shallow()
+        self._commits = {}
+        self._trees = OrderedDict()
+        self._span_hashes = OrderedDict()
+
+    def log(self, rev_a, rev_b):
+        """Yield a ``(LogCommit, changes)`` tuple for every commit in ``rev_a...rev_b``, newest first."""
+        for hexsha, hexsha_short in self.list_commits(rev_a, rev_b):
+            yield self.read_commit(hexsha, hexsha_short)
+
+    def list_commits(self, rev_a, rev_b):
+        """Return a ``(hexsha, hexsha_short)`` tuple for every commit in ``rev_a...rev_b``, newest first."""
+        with profiling.stage('resolve_refs'):
+            hexsha_a, hexsha_b = self.resolve(rev_a), self.resolve(rev_b)
+        return [
+            (hexsha, self.objects.shortest_unique_prefix(hexsha))
+            for hexsha in self.walk_symmetric_difference(hexsha_a, hexsha_b)
+        ]
+
+    def read_commits(self, hexshas):
+        """Yield a ``(LogCommit, changes)`` tuple for each commit sha, in order."""
+        for hexsha in hexshas:
+            yield self.read_commit(hexsha)
+
+    def read_commit(self, hexsha, hexsha_short=None):
+        """Return the ``(LogCommit, changes)`` tuple for a single commit."""
+        commit = self.parse_commit(hexsha)
+        log_commit = commit.to_log_commit(self.repo, hexsha_short or self.objects.shortest_unique_prefix(hexsha))
+        if len(commit.parents) > 1 and not self.first_parent:
+            # git log doesn't diff merge commits
+            return log_commit, []
+        parent_tree = self.parse_commit(commit.parents[0]).tree if commit.parents else None
+        raw_changes = [
+            (status, a_sha, b_sha, b_path.decode('utf-8', 'replace'))
+            for status, _, _, a_sha, b_sha, _, b_path in self.diff_trees(parent_tree, commit.tree)
+        ]
+        return log_commit, list(expand_raw_changes(raw_changes))
+
+    def parse_commit(self, hexsha):
+        """Return the :class:`ParsedCommit` with `hexsha`, parents hidden by a shallow clone are dropped."""
+        commit = self._commits.get(hexsha)
+        if commit is None:
+            object_type, data = self.objects.read(hexsha)
+            if object_type != 'commit':
+                raise git.BadName(f'{hexsha} is a {object_type} not a commit')
+            commit = ParsedCommit(hexsha, data)
+            if hexsha in self._shallow:
+                commit.parents = []
+            self._commits[hexsha] = commit
+        return commit
+
+    def walk(self, hexshas):
+        """Return the shas of every commit reachable from any of `hexshas`, newest first like ``git rev-list``."""
+        counter = itertools.count()
+        queue = []
+        seen = set()
+        for hexsha in hexshas:
+            if hexsha not in seen:
+                seen.add(hexsha)
+                heapq.heappush(queue, (-self.parse_commit(hexsha).committed_date, next(counter), hexsha))
+        visited = []
+        while queue:
+            _, _, hexsha = heapq.heappop(queue)
+            visited.append(hexsha)
+            for parent in self.parse_commit(hexsha).parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    heapq.heappush(queue, (-self.parse_commit(parent).committed_date, next(counter), parent))
+        return visited
+
+    def walk_symmetric_difference(self, hexsha_a, hexsha_b):
+        """Return the shas of commits reachable from only one of two commits, newest first.
+
+        Like ``git rev-list a...b`` the walk is ordered by commit date and stops once
+        every commit left to visit is reachable from both sides. When following first parents
+        only the commits on the first parent chain of either commit are returned.
+        """
+        flags = {hexsha_a: LEFT}
+        flags[hexsha_b] = flags.get(hexsha_b, 0) | RIGHT
+        counter = itertools.count()
+        queue = []
+        queued = set()
+        visited = []
+        visited_set = set()
+        unshared_queued = 0
+
+        def enqueue(hexsha):
+            nonlocal unshared_queued
+            heapq.heappush(queue, (-self.parse_commit(hexsha).committed_date, next(counter), hexsha))
+            queued.add(hexsha)
+            if flags[hexsha] != LEFT | RIGHT:
+                unshared_queued += 1
+
+        def add_flags(hexsha, new_flags):
+            nonlocal unshared_queued
+            old_flags = flags.get(hexsha, 0)
+            if old_flags | new_flags == old_flags:
+                return
+            flags[hexsha] = old_flags | new_flags
+            if hexsha in queued:
+                if flags[hexsha] == LEFT | RIGHT and old_flags:
+                    unshared_queued -= 1
+            elif hexsha in visited_set:
+                # Only possible with clock skew, spread the new flags to the commits already visited
+                for parent in self.parse_commit(hexsha).parents:
+                    add_flags(parent, flags[hexsha])
+            else:
+                enqueue(hexsha)
+
+        for hexsha in dict.fromkeys((hexsha_a, hexsha_b)):
+            enqueue(hexsha)
+        slop = WALK_SLOP
+        while queue:
+            if not unshared_queued:
+                slop -= 1
+                if slop <= 0:
+                    break
+            else:
+                slop = WALK_SLOP
+            _, _, hexsha = heapq.heappop(queue)
+            queued.discard(hexsha)
+            if flags[hexsha] != LEFT | RIGHT:
+                unshared_queued -= 1
+            visited.append(hexsha)
+            visited_set.add(hexsha)
+            for parent in self.parse_commit(hexsha).parents:
+                add_flags(parent, flags[hexsha])
+        if self.first_parent:
+            # Commits reachable from both through any parent are still excluded, as by git
+            on_mainline = set()
+            for hexsha in (hexsha_a, hexsha_b):
+                while hexsha is not None and flags.get(hexsha) not in (None, LEFT | RIGHT):
+                    on_mainline.add(hexsha)
+                    parents = self.parse_commit(hexsha).parents
+                    hexsha = parents[0] if parents else None
+            return [hexsha for hexsha in visited if hexsha in on_mainline]
+        return [hexsha for hexsha in visited if flags[hexsha] != LEFT | RIGHT]
+
+    def resolve(self, revision):
+        """Return the commit sha a revision (e.g. `HEAD~2`, `v1.0.0`, a short sha) refers to.
+
+        Only refs, shas (full or abbreviated) and ``~n``, ``^n`` and ``^{commit}`` suffixes are understood,
+        not e.g. reflog entries (``@{1}``) or searches of commit messages (``:/text``).
+
+        Raises:
+            BadName: If the revision can't be resolved
+        """
+        if '@{' in revision or revision.startswith(':'):
+            raise git.BadName(f'{revision} is not supported by the native git backend, use the subprocess backend')
+        suffixes = []
+        match = REVISION_SUFFIX_PATTERN.search(revision)
+        while match and match.start():
+            suffixes.insert(0, match.group())
+            revision = revision[:match.start()]
+            match = REVISION_SUFFIX_PATTERN.search(revision)
+        hexsha = self._peel(self._resolve_name(revision))
+        for suffix in suffixes:
+            if suffix.startswith('^{'):
+                continue
+            count = int(suffix[1:]) if len(suffix) > 1 else 1
+            parents = self.parse_commit(hexsha).parents
+            if suffix[0] == '^':
+                if count:
+                    if count > len(parents):
+                        raise git.BadName(f'{revision}{"".join(suffixes)}')
+                    hexsha = parents[count - 1]
+                continue
+            for _ in range(count):
+                if not parents:
+                    raise git.BadName(f'{revision}{"".join(suffixes)}')
+                hexsha = parents[0]
+                parents = self.parse_commit(hexsha).parents
+        return hexsha
+
+    def _resolve_name(self, name):
+        if len(name) == 40 and HEXSHA_PATTERN.match(name):
+            return name
+        candidates = [f'refs/{name}', f'refs/tags/{name}', f'refs/heads/{name}',
+                      f'refs/remotes/{name}', f'refs/remotes/{name}/HEAD']
+        if name.startswith('refs/') or name.isupper():
+            candidates.insert(0, name)
+        for ref in candidates:
+            hexsha = self.read_ref(ref)
+            if hexsha:
+                return hexsha
+        if HEXSHA_PATTERN.match(name):
+            hexsha = self.objects.resolve_prefix(name)
+            if hexsha:
+                return hexsha
+        raise git.BadName(name)
+
+    def _peel(self, hexsha):
+        """Follow annotated tags until a commit is reached."""
+        while True:
+            object_type, data = self.objects.read(hexsha)
+            if object_type == 'commit':
+                return hexsha
+            if object_type != 'tag':
+                raise git.BadName(f'{hexsha} is a {object_type} not a commit')
+            hexsha = data[len(b'object '):data.index(b'\n')].decode('ascii')
+
+    def read_ref(self, ref, depth=0):
+        """Return the sha a ref points to following any symbolic refs, or ``None`` if it doesn't exist."""
+        for directory in dict.fromkeys((self.git_dir, self.common_dir)):
+            try:
+                with open(os.path.join(directory, ref), 'rb') as reader:
+                    value = reader.read().strip().decode('utf-8', 'replace')
+            except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+                continue
+            if value.startswith('ref: '):
+                return self.read_ref(value[len('ref: '):], depth + 1) if depth < 5 else None
+            return value.split()[0] if value else None
+        return self._read_packed_refs().get(ref)
+
+    def _read_packed_refs(self):
+        """Return the sha of each packed ref, reading `packed-refs` again whenever git has rewritten it."""
+        path = os.path.join(self.common_dir, 'packed-refs')
+        try:
+            stat = os.stat(path)
+            state = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        except FileNotFoundError:
+            state = None
+        if self._packed_refs is None or state != self._packed_refs_state:
+            self._packed_refs = {}
+            try:
+                with open(path, 'rb') as reader:
+                    lines = reader.read().decode('utf-8', 'replace').splitlines()
+            except FileNotFoundError:
+                lines = []
+            for line in lines:
+                if line and line[0] not in '#^':
+                    hexsha, _, ref = line.partition(' ')
+                    self._packed_refs[ref] = hexsha
+            self._packed_refs_state = state
+        return self._packed_refs
+
+    def _has_replace_refs(self):
+        for _, _, file_names in os.walk(os.path.join(self.common_dir, 'refs', 'replace')):
+            if file_names:
+                return True
+        return any(ref.startswith('refs/replace/') for ref in self._read_packed_refs())
+
+    def _read_shallow(self):
+        try:
+            with open(os.path.join(self.common_dir, 'shallow')) as reader:
+                return set(reader.read().split())
+        except FileNotFoundError:
+            return set()
+
+    def read_tree(self, hexsha):
+        """Return the entries of a tree as ``(sort_key, name, mode, hexsha)`` tuples in git's order."""
+        entries = self._trees.get(hexsha)
+        if entries is not None:
+            self._trees.move_to_end(hexsha)
+            return entries
+        _, data = self.objects.read(hexsha)
+        entries = []
+        position = 0
+        while position < len(data):
+            space = data.index(b' ', position)
+            nul = data.index(b'\0', space)
+            mode = int(data[position:space], 8)
+            name = data[space + 1:nul]
+            entries.append((name + b'/' if mode == TREE_MODE else name, name, mode, data[nul + 1:nul + 21].hex()))
+            position = nul + 21
+        self._trees[hexsha] = entries
+        if len(self._trees) > 256:
+            self._trees.popitem(last=False)
+        return entries
+
+    def diff_trees(self, tree_a, tree_b):
+        """Return the raw changes between two trees, as ``git diff-tree -r -M`` would.
+
+        Arguments:
+            tree_a (str): The sha of the old tree, or ``None`` for a root commit
+            tree_b (str): The sha of the new tree
+
+        Returns:
+            list: ``(status, a_mode, b_mode, a_sha, b_sha, a_path, b_path)`` tuples ordered by path,
+                with ``None`` for the side of an added or deleted file that doesn't exist
+        """
+        changes = []
+        self._diff_trees(tree_a, tree_b, b'', changes)
+        return self._detect_renames(changes) if self.detect_renames else changes
+
+    def _diff_trees(self, tree_a, tree_b, prefix, changes):
+        if tree_a == tree_b:
+            return
+        entries_a = self.read_tree(tree_a) if tree_a else []
+        entries_b = self.read_tree(tree_b) if tree_b else []
+        index_a = index_b = 0
+        while index_a < len(entries_a) or index_b < len(entries_b):
+            entry_a = entries_a[index_a] if index_a < len(entries_a) else None
+            entry_b = entries_b[index_b] if index_b < len(entries_b) else None
+            if entry_b is None or (entry_a is not None and entry_a[0] < entry_b[0]):
+                self._add_one_sided(entry_a, prefix, changes, deleted=True)
+                index_a += 1
+            elif entry_a is None or entry_b[0] < entry_a[0]:
+                self._add_one_sided(entry_b, prefix, changes, deleted=False)
+                index_b += 1
+            else:
+                _, name, mode_a, sha_a = entry_a
+                _, _, mode_b, sha_b = entry_b
+                index_a += 1
+                index_b += 1
+                if self.pathspec and not self._in_pathspec(prefix + name, mode_a):
+                    continue
+                if mode_a == TREE_MODE:
+                    self._diff_trees(sha_a, sha_b, prefix + name + b'/', changes)
+                elif sha_a != sha_b or mode_a != mode_b:
+                    status = 'M' if mode_a & FORMAT_MASK == mode_b & FORMAT_MASK else 'T'
+                    changes.append((status, mode_a, mode_b, sha_a, sha_b, prefix + name, prefix + name))
+
+    def _add_one_sided(self, entry, prefix, changes, deleted):
+        _, name, mode, hexsha = entry
+        if self.pathspec and not self._in_pathspec(prefix + name, mode):
+            return
+        if mode == TREE_MODE:
+            trees = (hexsha, None) if deleted else (None, hexsha)
+            self._diff_trees(*trees, prefix + name + b'/', changes)
+        elif deleted:
+            changes.append(('D', mode, None, hexsha, None, prefix + name, prefix + name))
+        else:
+            changes.append(('A', None, mode, None, hexsha, prefix + name, prefix + name))
+
+    def _in_pathspec(self, path, mode):
+        if mode == TREE_MODE:
+            return self.pathspec.may_match_within(path + b'/')
+        return self.pathspec.matches(path)
+
+    def _detect_renames(self, changes):
+        """Pair deleted files with added files following git's diffcore-rename.
+
+        Identical files are paired first (preferring the same file name), then files whose
+        names are unique among those left and which are very similar, and finally the
+        most similar pairs above the rename score unless there are more candidates than
+        the rename limit allows. A rename takes the place of the added file it pairs with.
+        Only identical files are paired if the rename score is :data:`MAX_SCORE`.
+        """
+        sources = [index for index, change in enumerate(changes) if change[0] == 'D']
+        destinations = [index for index, change in enumerate(changes) if change[0] == 'A']
+        if not sources or not destinations:
+            return changes
+        pairs = {}
+        used_sources = set()
+
+        # Exact renames
+        sources_by_sha = {}
+        for source in sources:
+            sources_by_sha.setdefault(changes[source][3], []).append(source)
+        for destination in destinations:
+            _, _, mode_b, _, sha_b, _, path_b = changes[destination]
+            best, best_score = None, -1
+            for source in sources_by_sha.get(sha_b, ()):
+                mode_a = changes[source][1]
+                if source in used_sources or (
+                        not (_is_regular(mode_a) and _is_regular(mode_b)) and mode_a != mode_b):
+                    continue
+                score = 1 + (_basename(changes[source][5]) == _basename(path_b))
+                if score > best_score:
+                    best, best_score = source, score
+            if best is not None:
+                pairs[destination] = (best, MAX_SCORE)
+                used_sources.add(best)
+
+        remaining_sources = [source for source in sources if source not in used_sources]
+        remaining_destinations = [destination for destination in destinations if destination not in pairs]
+
+        # Files moved between folders which kept their unique name
+        if remaining_sources and remaining_destinations and self.rename_score < MAX_SCORE:
+            basename_score = self.rename_score + (MAX_SCORE - self.rename_score) // 2
+            sources_by_name = _group_by_basename(changes, remaining_sources)
+            destinations_by_name = _group_by_basename(changes, remaining_destinations)
+            for name, name_sources in sources_by_name.items():
+                name_destinations = destinations_by_name.get(name, [])
+                if len(name_sources) != 1 or len(name_destinations) != 1:
+                    continue
+                source, destination = name_sources[0], name_destinations[0]
+                score = self._similarity(changes[source], changes[destination], basename_score)
+                if score >= basename_score:
+                    pairs[destination] = (source, score)
+                    used_sources.add(source)
+            remaining_sources = [source for source in remaining_sources if source not in used_sources]
+            remaining_destinations = [
+                destination for destination in remaining_destinations if destination not in pairs
+            ]
+
+        # Inexact renames
+        if remaining_sources and remaining_destinations and self.rename_score < MAX_SCORE and self._within_rename_limit(
+                len(remaining_sources), len(remaining_destinations)):
+            candidates = []
+            for destination in remaining_destinations:
+                scores = []
+                for source in remaining_sources:
+                    score = self._similarity(changes[source], changes[destination], self.rename_score)
+                    if score >= self.rename_score:
+                        same_name = _basename(changes[source][5]) == _basename(changes[destination][6])
+                        scores.append((score, same_name, source))
+                candidates.extend(
+                    (-score, -same_name, destination, source)
+                    for score, same_name, source in sorted(scores, reverse=True)[:4]
+                )
+            for negative_score, _, destination, source in sorted(candidates):
+                if destination in pairs or source in used_sources:
+                    continue
+                pairs[destination] = (source, -negative_score)
+                used_sources.add(source)
+
+        renamed = []
+        for index, change in enumerate(changes):
+            if index in pairs:
+                source = changes[pairs[index][0]]
+                renamed.append(('R', source[1], change[2], source[3], change[4], source[5], change[6]))
+            elif index not in used_sources:
+                renamed.append(change)
+        return renamed
+
+    def _within_rename_limit(self, source_count, destination_count):
+        limit = self.rename_limit
+        return limit <= 0 or (
+            (source_count <= limit or destination_count <= limit)
+            and source_count * destination_count <= limit * limit
+        )
+
+    def _similarity(self, source, destination, minimum_score):
+        """Estimate how much of the larger file is copied from the source, out of :data:`MAX_SCORE`."""
+        mode_a, sha_a = source[1], source[3]
+        mode_b, sha_b = destination[2], destination[4]
+        if not (mode_a & FORMAT_MASK == REGULAR_FILE_MODE and mode_b & FORMAT_MASK == REGULAR_FILE_MODE):
+            return 0
+        data_a = self.objects.read(sha_a)[1]
+        data_b = self.objects.read(sha_b)[1]
+        max_size = max(len(data_a), len(data_b))
+        delta_size = max_size - min(len(data_a), len(data_b))
+        if max_size * (MAX_SCORE - minimum_score) < delta_size * MAX_SCORE or not data_b:
+            return 0
+        hashes_a = self._hash_spans(sha_a, data_a)
+        hashes_b = self._hash_spans(sha_b, data_b)
+        copied = sum(min(count, hashes_b.get(hashval, 0)) for hashval, count in hashes_a.items())
+        return copied * MAX_SCORE // max_size
+
+    def _hash_spans(self, hexsha, data):
+        hashes = self._span_hashes.get(hexsha)
+        if hashes is None:
+            hashes = hash_spans(data, is_text=b'\0' not in data[:8000])
+            self._span_hashes[hexsha] = hashes
+            if len(self._span_hashes) > 64:
+                self._span_hashes.popitem(last=False)
+        return hashes
+
+    def close(self):
+        """Release the memory-mapped packs."""
+        self.objects.close()
+
+
+def hash_spans(data, is_text):
+    """Count the bytes in each span of `data`, keyed by the span's hash, as git's diffcore-delta does.
+
+    A span ends at a newline or after 64 bytes, for text carriage returns before a newline are ignored.
+    """
+    hashes = {}
+    accumulator_1 = accumulator_2 = count = 0
+    length = len(data)
+    for index, byte in enumerate(data):
+        if is_text and byte == 13 and index + 1 < length and data[index + 1] == 10:
+            continue
+        old_1 = accumulator_1
+        accumulator_1 = ((accumulator_1 << 7) ^ (accumulator_2 >> 25)) & 0xffffffff
+        accumulator_2 = ((accumulator_2 << 7) ^ (old_1 >> 25)) & 0xffffffff
+        accumulator_1 = (accumulator_1 + byte) & 0xffffffff
+        count += 1
+        if count < 64 and byte != 10:
+            continue
+        hashval = ((accumulator_1 + accumulator_2 * 0x61) & 0xffffffff) % HASHBASE
+        hashes[hashval] = hashes.get(hashval, 0) + count
+        accumulator_1 = accumulator_2 = count = 0
+    if count:
+        hashval = ((accumulator_1 + accumulator_2 * 0x61) & 0xffffffff) % HASHBASE
+        hashes[hashval] = hashes.get(hashval, 0) + count
+    return hashes
+
+
+def _is_regular(mode):
+    return mode & FORMAT_MASK == REGULAR_FILE_MODE
+
+
+def _basename(path):
+    return path.rpartition(b'/')[2]
+
+
+def _group_by_basename(changes, indexes):
+    groups = {}
+    for index in indexes:
+        groups.setdefault(_basename(changes[index][6]), []).append(index)
+    return groups
+
+
+def _decode(data, encoding):
+    try:
+        return data.decode(encoding, 'replace')
+    except LookupError:
+        return data.decode('utf-8', 'replace')
@@ -0,0 +1,103 @@
+"""Limit the files a changelog is generated from with git pathspecs."""
+import fnmatch
+
+GLOB_CHARACTERS = '*?['
+
+
+class Pathspec:
+    """The files to include in and exclude from a changelog, relative to the root of the repository.
+
+    Each path is a git pathspec without magic: either a file or folder, which includes everything
+    inside it, or a glob pattern whose wildcards also match ``/``, e.g. `services/api` or `*.md`.
+    They are passed to git so that commits which don't touch them are never read, and are matched
+    the same way by the `native` backend so that it never diffs folders outside them.
+
+    Parameters:
+        paths (iterable): Only include files matching any of these, every file is included if there are none
+        exclude_paths (iterable): Exclude files matching any of these
+    """
+
+    def __init__(self, paths=(), exclude_paths=()):
+        """Init Pathspec with the paths to include and exclude.
+
+        Raises:
+            ValueError: If a path uses pathspec magic, e.g. `:(icase)`
+        """
+        for path in [*(paths or ()), *(exclude_paths or ())]:
+            if path.startswith(':'):
+                raise ValueError(f'Pathspec magic is not supported, use --exclude rather than {path}')
+        self.paths = tuple(_normalise(path) for path in paths or ())
+        self.exclude_paths = tuple(_normalise(path) for path in exclude_paths or ())
+        self._includes = [_Pattern(path) for path in self.paths]
+        self._excludes = [_Pattern(path) for path in self.exclude_paths]
+
+    def __bool__(self):
+        """A Pathspec is true if it limits the files at all."""
+        return bool(self.paths or self.exclude_paths)
+
+    @property
+    def args(self):
+        """The pathspecs to pass to git after ``--``.
+
+        Returns:
+            list
+        """
+        return [*(path or '.' for path in self.paths), *(f':(exclude){path or "."}' for path in self.exclude_paths)]
+
+    def matches(self, path):
+        """Return whether a file is included.
+
+        Arguments:
+            path (bytes): The path of the file relative to the root of the repository
+        """
+        if self._includes and not any(pattern.matches(path) for pattern in self._includes):
+            return False
+        return not any(pattern.matches(path) for pattern in self._excludes)
+
+    def may_match_within(self, folder):
+        """Return whether any file within a folder might be included.
+
+        Arguments:
+            folder (bytes): The path of the folder relative to the root of the repository, ending with ``/``
+        """
+        if self._includes and not any(pattern.may_match_within(folder) for pattern in self._includes):
+            return False
+        return not any(pattern.contains(folder) for pattern in self._excludes)
+
+    def __repr__(self):
+        """Return representation of the pathspec."""
+        return f'Pathspec({list(self.paths)}, {list(self.exclude_paths)})'
+
+
+class _Pattern:
+    """A single path or glob pattern, matched against paths as bytes."""
+
+    def __init__(self, path):
+        self.pattern = path.encode('utf-8')
+        glob_start = min((path.find(character) for character in GLOB_CHARACTERS if character in path), default=None)
+        self.is_glob = glob_start is not None
+        if self.is_glob:
+            # Only the part before the first wildcard has to match literally
+            self.prefix = path[:glob_start].encode('utf-8')
+        else:
+            self.prefix = self.pattern + b'/' if self.pattern else b''
+
+    def matches(self, path):
+        if self.is_glob:
+            return fnmatch.fnmatchcase(path, self.pattern)
+        return path == self.pattern or path.startswith(self.prefix)
+
+    def may_match_within(self, folder):
+        return folder.startswith(self.prefix) or self.prefix.startswith(folder)
+
+    def contains(self, folder):
+        """Return whether the pattern matches every file within a folder."""
+        return not self.is_glob and folder.startswith(self.prefix)
+
+
+def _normalise(path):
+    """Strip any leading ``./`` and trailing ``/``, so that ``.`` is every file."""
+    while path.startswith('./'):
+        path = path[2:]
+    path = path.rstrip('/')
+    return '' if path == '.' else path
@@ -0,0 +1,193 @@
+"""Record how long each stage of generating a changelog takes, along with counts of the work done.
+
+Instrumented code calls :func:`stage`, :func:`timed`, :func:`call` and :func:`count`, which do
+next to nothing unless a :class:`Profiler` has been enabled with :func:`profile`, e.g.
+
+    with profile() as profiler:
+        GenerateChangelog('0.0.1', '0.0.2').render_markdown()
+    print(profiler.summary())
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# The enabled Profiler, if any
+profiler = None
+
+
+class Profiler:
+    """Collect the time spent in each stage and any counters.
+
+    Stages nest, e.g. reading commits while a template is rendered, so each stage's `self_seconds`
+    excludes the stages within it while `seconds` includes them. Every timed span is also kept
+    so that it can be written out as a Chrome trace.
+    """
+
+    def __init__(self):
+        """Init Profiler with no stages or counters."""
+        self.stages = {}
+        self.counters = {}
+        self.spans = []
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self, name):
+        """Start timing a stage, which must be ended with :meth:`end` on the same thread."""
+        stack = self._stack()
+        stack.append([name, time.perf_counter(), 0.0])
+
+    def end(self):
+        """End the most recently started stage on this thread."""
+        ended = time.perf_counter()
+        name, started, child_seconds = self._stack().pop()
+        self._record(name, ended - started, child_seconds, started)
+
+    def add(self, name, seconds):
+        """Add time spent in a stage without recording a span, for stages with too many spans to trace."""
+        self._record(name, seconds, 0.0, None)
+
+    def count(self, name, number=1):
+        """Add to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + number
+
+    def summary(self):
+        """Return each stage's calls and times, and the counters.
+
+        Returns:
+            dict
+        """
+        with self._lock:
+            return {
+                'seconds': round(time.perf_counter() - self._started, 6),
+                'stages': {
+                    name: {
+                        'calls': stage['calls'],
+                        'seconds': round(stage['seconds'], 6),
+                        'self_seconds': round(stage['self_seconds'], 6),
+                    }
+                    for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['self_seconds'])
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def chrome_trace(self):
+        """Return the spans and counters in the Chrome trace event format, viewable in ``chrome://tracing``.
+
+        Returns:
+            dict
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {
+                    'name': name, 'ph': 'X', 'pid': pid, 'tid': thread_id,
+                    'ts': round((started - self._started) * 1e6, 3), 'dur': round(seconds * 1e6, 3),
+                }
+                for name, thread_id, started, seconds in self.spans
+            ]
+            events.append({
+                'name': 'counters', 'ph': 'C', 'pid': pid, 'tid': 0,
+                'ts': round((time.perf_counter() - self._started) * 1e6, 3), 'args': dict(self.counters),
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, file_path):
+        """Write :meth:`chrome_trace` to a JSON file."""
+        with open(file_path, 'w') as writer:
+            json.dump(self.chrome_trace(), writer)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, seconds, child_seconds, started):
+        stack = self._stack()
+        if stack:
+            stack[-1][2] += seconds
+        with self._lock:
+            stage = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0})
+            stage['calls'] += 1
+            stage['seconds'] += seconds
+            stage['self_seconds'] += seconds - child_seconds
+            if started is not None:
+                self.spans.append((name, threading.get_ident(), started, seconds))
+
+
+@contextmanager
+def profile(enabled_profiler=None):
+    """Enable a Profiler (a new one by default) for the duration of the context and yield it."""
+    global profiler
+    previous, profiler = profiler, enabled_profiler or Profiler()
+    try:
+        yield profiler
+    finally:
+        profiler = previous
+
+
+@contextmanager
+def stage(name):
+    """Time the code run within the context as a stage."""
+    current = profiler
+    if current is None:
+        yield
+        return
+    current.start(name)
+    try:
+        yield
+    finally:
+        current.end()
+
+
+def timed(name, iterable):
+    """Iterate over `iterable`, timing the production of each item as a stage.
+
+    Returns:
+        iterator: `iterable` itself when not profiling
+    """
+    current = profiler
+    if current is None:
+        return iterable
+    return _timed(current, name, iter(iterable))
+
+
+def _timed(current, name, iterator):
+    try:
+        while True:
+            current.start(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                current.end()
+            yield item
+    finally:
+        # Close a generator which is abandoned part way through, so that it can clean up
+        close = getattr(iterator, 'close', None)
+        if close:
+            close()
+
+
+def call(name, function, *args):
+    """Call a function, adding the time it takes to a stage without recording a span."""
+    current = profiler
+    if current is None:
+        return function(*args)
+    started = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        current.add(name, time.perf_counter() - started)
+
+
+def count(name, number=1):
+    """Add to a counter, if profiling."""
+    current = profiler
+    if current is not None:
+        current.count(name, number)
@@ -0,0 +1,219 @@
+"""A long-running server which renders changelogs on request, used by ``sgc serve``."""
+import os
+import sys
+import json
+import stat
+import logging
+import threading
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import git
+import jinja2
+from .generatechangelog import GenerateChangelog
+from .githelper import GitHelper
+from .commitcache import MemoryCommitCache
+from .constants import GIT_HELPER_OPTIONS, TEMPLATE_NAMES
+
+# The GenerateChangelog arguments which a request may give, all others are fixed when the server starts.
+# Neither the repository nor a template file can be chosen by a request, as the templates aren't sandboxed
+# and anyone who can reach the server would otherwise be able to read any file and run any code.
+REQUEST_FIELDS = ('start_ref', 'end_ref', 'template_name', 'template_variables')
+
+
+class ChangelogServer:
+    """Render changelogs for many requests in one process, so that nothing is imported, opened or read twice.
+
+    A GitHelper is kept for each repository, along with a
+    :class:`~samsgeneratechangelog.commitcache.MemoryCommitCache` of every commit it has read, and Jinja keeps
+    each template compiled (recompiling it if its file changes). The refs of each request are resolved
+    to commits first, which is all it takes to notice new commits, and the rendered entries of recent
+    requests are kept keyed by those commits, the template and the variables, so that a repeated
+    request is answered without reading or rendering anything.
+
+    Parameters:
+        render_cache_size (int): The number of rendered entries to keep, least recently used are dropped first
+        **options: :class:`~samsgeneratechangelog.GenerateChangelog` arguments used by every request,
+            those in :data:`REQUEST_FIELDS` are only defaults which each request may override, while
+            `git_path` and `template_file` are only ever set here
+    """
+    DEFAULT_RENDER_CACHE_SIZE = 128
+
+    def __init__(self, render_cache_size=DEFAULT_RENDER_CACHE_SIZE, **options):
+        """Init ChangelogServer without opening any repository yet."""
+        self.options = {'git_path': '.', **options}
+        self.render_cache_size = render_cache_size
+        self._repositories = {}
+        self._rendered = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, **request):
+        """Return the markdown rendered for a request.
+
+        Arguments:
+            **request: Any of :data:`REQUEST_FIELDS`, `template_variables` are added to the server's own
+
+        Raises:
+            ValueError: If the request has an unknown field, lacks a ref, gives a ref which looks like an option
+                or names a template which isn't bundled
+        """
+        unknown = sorted(set(request) - set(REQUEST_FIELDS))
+        if unknown:
+            raise ValueError(
+                f'Unknown request fields {", ".join(unknown)}, expected any of {", ".join(REQUEST_FIELDS)}'
+            )
+        if 'template_name' in request and request['template_name'] not in TEMPLATE_NAMES:
+            raise ValueError(
+                f'Unknown template {request["template_name"]}, expected any of {", ".join(TEMPLATE_NAMES)}'
+            )
+        options = {**self.options, **request}
+        if 'template_name' in request:
+            options['template_file'] = None
+        options['template_variables'] = {
+            **(self.options.get('template_variables') or {}), **(request.get('template_variables') or {})
+        }
+        for field in ('start_ref', 'end_ref'):
+            ref = options.get(field)
+            if not ref:
+                raise ValueError('Both start_ref and end_ref are required')
+            # Otherwise git would take the ref as an option, e.g. `--output=<path>` to write a file
+            if not isinstance(ref, str) or ref.startswith('-'):
+                raise ValueError(f'{field} must be a commit sha or git ref, not {ref!r}')
+        git_path = os.path.abspath(options['git_path'])
+        git_helper, lock = self._repository(git_path)
+        with lock:
+            changelog = GenerateChangelog(**options, git_helper=git_helper)
+            # The commits are read from the shas the refs resolve to now, so that a ref which moves
+            # while rendering can't leave a stale entry cached under its new commit
+            hexshas = git_helper.resolve_commits([changelog.start_ref, changelog.end_ref])
+            key = (
+                git_path,
+                changelog.start_ref,
+                changelog.end_ref,
+                *hexshas,
+                changelog.template_file,
+                os.stat(changelog.template_file).st_mtime_ns,
+                json.dumps(changelog.template_variables, sort_keys=True, default=str)
+            )
+            with self._lock:
+                markdown = self._rendered.get(key)
+                if markdown is not None:
+                    self._rendered.move_to_end(key)
+                    return markdown
+            markdown = changelog._render(
+                changelog._get_markdown_template(), changelog.start_ref, changelog.end_ref,
+                git_helper.commit_log(*hexshas)
+            )
+        with self._lock:
+            self._rendered[key] = markdown
+            while len(self._rendered) > self.render_cache_size:
+                self._rendered.popitem(last=False)
+        return markdown
+
+    def _repository(self, git_path):
+        """Return the GitHelper for a repository and the lock held while it is used, opening it if need be."""
+        with self._lock:
+            if git_path not in self._repositories:
+                logging.info(f'Opening git repo {git_path}')
+                options = {option: self.options[option] for option in GIT_HELPER_OPTIONS if option in self.options}
+                git_helper = GitHelper(git_path, **options)
+                # Commits are kept in memory, reading through to the persistent cache if there is one
+                git_helper.cache = MemoryCommitCache(backing=git_helper.cache)
+                self._repositories[git_path] = (git_helper, threading.Lock())
+            return self._repositories[git_path]
+
+    def close(self):
+        """Stop any long-lived git processes of every repository."""
+        with self._lock:
+            for git_helper, lock in self._repositories.values():
+                with lock:
+                    git_helper.close()
+            self._repositories.clear()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Answer ``POST /render`` with the markdown for the JSON object of :data:`REQUEST_FIELDS` it is sent.
+
+    ``GET /health`` answers `ok` so that clients can wait for the server to start. A bad request is
+    answered with status 400 and its error as plain text.
+    """
+    server_version = 'sgc'
+
+    def do_GET(self):
+        """Answer health checks."""
+        if self.path != '/health':
+            self._respond(404, f'Not found: {self.path}\n')
+            return
+        self._respond(200, 'ok\n')
+
+    def do_POST(self):
+        """Render a changelog."""
+        if self.path != '/render':
+            self._respond(404, f'Not found: {self.path}\n')
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or '{}')
+            if not isinstance(request, dict):
+                raise ValueError('The request must be a JSON object')
+            markdown = self.server.changelog_server.render(**request)
+        except (ValueError, git.BadName, git.GitCommandError, jinja2.TemplateError) as e:
+            self._respond(400, f'{e}\n')
+            return
+        except Exception:
+            logging.exception('Unable to render changelog')
+            self._respond(500, 'Unable to render changelog, see the server log\n')
+            return
+        self._respond(200, markdown, 'text/markdown')
+
+    def _respond(self, status, text, content_type='text/plain'):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        """Return the client's address, which a Unix socket doesn't have."""
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix socket'
+
+    def log_message(self, format, *args):
+        """Log each request at info level rather than writing it to stderr."""
+        logging.info(f'{self.address_string()} - {format % args}')
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """An HTTP server listening on a Unix socket, answering each request in its own thread."""
+    daemon_threads = True
+
+
+def create_http_server(changelog_server, host='127.0.0.1', port=8000, socket_path=None):
+    """Return an HTTP server for a ChangelogServer, listening on a Unix socket if `socket_path` is given.
+
+    Any stale socket left at `socket_path` by a server that didn't exit cleanly is replaced.
+    """
+    if socket_path:
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)
+        http_server = ThreadingUnixHTTPServer(socket_path, RequestHandler)
+    else:
+        http_server = ThreadingHTTPServer((host, port), RequestHandler)
+        http_server.daemon_threads = True
+    http_server.changelog_server = changelog_server
+    return http_server
+
+
+def serve(changelog_server, host='127.0.0.1', port=8000, socket_path=None):
+    """Answer requests until interrupted, then stop the server and remove its socket."""
+    http_server = create_http_server(changelog_server, host, port, socket_path)
+    address = socket_path or 'http://{}:{}'.format(*http_server.server_address[:2])
+    sys.stderr.write(f'Serving changelogs on {address}\n')
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        changelog_server.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,113 @@
+"""Keep a changelog up to date as commits are made, used by ``sgc watch``."""
+import os
+import time
+import asyncio
+import logging
+from .generatechangelog import GenerateChangelog
+
+
+class WatchedChangelog(GenerateChangelog):
+    """A changelog whose FileCommits are kept between renders and brought up to date when its refs move.
+
+    :meth:`poll` notices any ref being updated from the modification times of `HEAD`, `packed-refs`
+    and the folders under `refs` in the `.git` folder, without running git. Then the refs are resolved,
+    and if only the end of the range has moved on (e.g. it is a branch which has been committed to)
+    just the new commits are read and added to the FileCommits already read, so that updating the changelog
+    takes time proportional to the new commits rather than the size of the range. Otherwise (e.g. after a
+    force push, or if `start_ref` has moved) the whole range is read again.
+
+    Parameters:
+        poll_interval (float): The number of seconds :meth:`watch` waits between polls
+        **kwargs: :class:`~samsgeneratechangelog.GenerateChangelog` arguments
+    """
+    DEFAULT_POLL_INTERVAL = 1.0
+
+    def __init__(self, poll_interval=DEFAULT_POLL_INTERVAL, **kwargs):
+        """Init WatchedChangelog without reading any commits yet."""
+        super().__init__(**kwargs)
+        self.poll_interval = poll_interval
+        self.hexshas = None
+        self._watched_file_commits = []
+        self._extendable = False
+        self._refs_state = None
+
+    def refresh(self):
+        """Bring the FileCommits up to date with the refs, reading only the new commits if possible.
+
+        Returns:
+            bool: Whether the refs have moved since the FileCommits were last read
+        """
+        hexsha_a, hexsha_b = self.git_helper.resolve_commits([self.start_ref, self.end_ref])
+        if self.hexshas == (hexsha_a, hexsha_b):
+            return False
+        new_file_commits = None
+        if self._extendable and self.hexshas[0] == hexsha_a:
+            new_file_commits = self.git_helper.extend_commit_log(self.hexshas[1], hexsha_b)
+        if new_file_commits is None:
+            logging.info(f'Reading every commit in {self.start_ref}...{self.end_ref}')
+            self._watched_file_commits = list(self.git_helper.commit_log(hexsha_a, hexsha_b))
+            # Only a range whose start is an ancestor of its end is the same as the commits of a previous range
+            # and those since, as commits which are reachable from the start would otherwise have to be removed
+            self._extendable = self.git_helper.is_ancestor(hexsha_a, hexsha_b)
+        else:
+            logging.info(f'Read {len(new_file_commits)} new file commits up to {self.end_ref}')
+            self._watched_file_commits = new_file_commits + self._watched_file_commits
+        self.hexshas = (hexsha_a, hexsha_b)
+        return True
+
+    def poll(self):
+        """Refresh the FileCommits if any ref has been updated since the last poll.
+
+        Returns:
+            bool: Whether the refs have moved, which they always have on the first poll
+        """
+        refs_state = self._read_refs_state()
+        if refs_state == self._refs_state:
+            return False
+        self._refs_state = refs_state
+        return self.refresh()
+
+    def watch(self, on_change, polls=None):
+        """Call `on_change` with this changelog (e.g. to render it) now and whenever its refs move.
+
+        Arguments:
+            on_change (callable): Called with the WatchedChangelog once its FileCommits are up to date
+            polls (int): The number of times to poll before returning, or ``None`` to poll until interrupted
+        """
+        while polls is None or polls > 0:
+            if self.poll():
+                on_change(self)
+            if polls is not None:
+                polls -= 1
+                if not polls:
+                    return
+            time.sleep(self.poll_interval)
+
+    def _file_commits(self):
+        if self.hexshas is None:
+            self.refresh()
+        return self._watched_file_commits
+
+    async def _file_commits_async(self, executor):
+        if self.hexshas is None:
+            await asyncio.get_running_loop().run_in_executor(executor, self.refresh)
+        for file_commit in self._watched_file_commits:
+            yield file_commit
+
+    def _read_refs_state(self):
+        """Return the modification time of every file and folder updated when a ref is.
+
+        Git updates a ref by renaming a lock file over it, which changes the modification time of its folder.
+        """
+        git_dir = self.git_helper.repo.common_dir
+        paths = [os.path.join(self.git_helper.repo.git_dir, 'HEAD'), os.path.join(git_dir, 'packed-refs')]
+        for folder, _, _ in os.walk(os.path.join(git_dir, 'refs')):
+            paths.append(folder)
+        state = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state.append((path, stat.st_mtime_ns, stat.st_ino, stat.st_size))
+        return state
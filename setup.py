@@ -8,7 +8,7 @@ with open(path.join(this_directory, 'README.md'), encoding='utf-8') as f:
 
 setup(
     version='1.2.0',
-    python_requires='>=3.6.0',
+    python_requires='>=3.7.0',
     name='samsgeneratechangelog',
     packages=['samsgeneratechangelog'],
     description='Let Sam generate a changelog for you by grouping commits by file, or commit message, or anything!',
@@ -0,0 +1,46 @@
+"""Time deriving custom attributes for a commit which touches many files.
+
+Run with ``python -m tests.benchmarks.bench_custom_attributes [file count]``.
+"""
+import sys
+import timeit
+import git
+from samsgeneratechangelog.customattributes import CustomAttributes
+from samsgeneratechangelog.githelper import FileCommit
+from samsgeneratechangelog.gitlog import LogCommit
+
+CUSTOM_ATTRIBUTES = {
+    'jira_id': {'derived_from': 'message', 'pattern': r'[A-Z]+-\d+'},
+    'first_name': {'derived_from': 'author', 'pattern': r'^(\w+)'},
+    'root_folder': {'derived_from': 'file_path', 'pattern': r'^([^/]+)/'},
+}
+
+
+def build_commit():
+    actor = git.Actor('Sam Martin', 'sam@example.com')
+    message = 'Refactored everything\n\n' + 'Some lengthy explanation. ' * 200 + '\n\nRefs JIRA-1234\n'
+    return LogCommit(None, 'a' * 40, 'a' * 7, ('b' * 40,), actor, 0, actor, 0, message)
+
+
+def main(file_count=2000, repeat=5):
+    commit = build_commit()
+    file_paths = [f'folder{number % 50}/file{number}.py' for number in range(file_count)]
+
+    def per_file():
+        # Every FileCommit handed the raw spec, as before the engine existed
+        return [FileCommit(commit, path, 'M', None, CUSTOM_ATTRIBUTES) for path in file_paths]
+
+    def compiled_once():
+        custom_attributes = CustomAttributes(CUSTOM_ATTRIBUTES)
+        return [FileCommit(commit, path, 'M', None, custom_attributes) for path in file_paths]
+
+    assert [fc.jira_id for fc in per_file()] == [fc.jira_id for fc in compiled_once()]
+    per_file_time = min(timeit.repeat(per_file, number=1, repeat=repeat))
+    compiled_time = min(timeit.repeat(compiled_once, number=1, repeat=repeat))
+    print(f'{file_count} files changed by one commit')
+    print(f'  spec per file:  {per_file_time * 1000:8.2f} ms')
+    print(f'  compiled once:  {compiled_time * 1000:8.2f} ms ({per_file_time / compiled_time:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
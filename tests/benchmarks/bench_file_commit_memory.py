@@ -0,0 +1,62 @@
+"""Measure the memory held by the FileCommits of a large range.
+
+Run with ``python -m tests.benchmarks.bench_file_commit_memory [file change count]``.
+"""
+import sys
+import gc
+import itertools
+import tracemalloc
+from samsgeneratechangelog.customattributes import CustomAttributes
+from samsgeneratechangelog.githelper import FileCommit
+from samsgeneratechangelog.gitlog import GitLogParser
+
+CUSTOM_ATTRIBUTES = {
+    'jira_id': {'derived_from': 'message', 'pattern': r'[A-Z]+-\d+'},
+    'root_folder': {'derived_from': 'file_path', 'pattern': r'^([^/]+)/'},
+}
+AUTHORS = [(f'Author {number}', f'author{number}@example.com') for number in range(20)]
+FILES_PER_COMMIT = 10
+
+
+def log_output(commit_count):
+    """Return synthetic ``git log`` output, as GitHelper would parse it, touching a pool of 2,000 paths."""
+    chunks = []
+    for number in range(commit_count):
+        hexsha = f'{number:040x}'
+        name, email = AUTHORS[number % len(AUTHORS)]
+        fields = [hexsha, hexsha[:7], f'{number + 1:040x}', name, email, str(number), name, email, str(number),
+                  f'JIRA-{number % 500} - Change number {number}\n']
+        chunks.append('\0'.join(fields) + '\0')
+        for file_number in range(FILES_PER_COMMIT):
+            path = f'folder{file_number}/file{(number * 7 + file_number) % 200}.py'
+            chunks.append(f'\n:100644 100644 1111111 2222222 M\0{path}\0')
+    return ''.join(chunks).encode('utf-8')
+
+
+def measure(data, custom_attributes):
+    """Return the number of FileCommits created from `data` and the bytes they hold."""
+    gc.collect()
+    tracemalloc.start()
+    parser = GitLogParser(None)
+    # Streamed as GitHelper.commit_log does, so that only the FileCommits (and what they share) are kept
+    file_commits = [
+        FileCommit(commit, file_path, change_type, None, custom_attributes)
+        for commit, changes in itertools.chain(parser.feed(data), parser.close())
+        for file_path, change_type in changes
+    ]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(file_commits), size
+
+
+def main(file_change_count=100000):
+    data = log_output(file_change_count // FILES_PER_COMMIT)
+    for label, custom_attributes in (('without', None), ('with', CustomAttributes(CUSTOM_ATTRIBUTES))):
+        count, size = measure(data, custom_attributes)
+        print(f'{count} file changes {label} custom attributes hold {size / 1024 / 1024:.1f} MiB, '
+              f'{size / count:.0f} bytes per file change')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
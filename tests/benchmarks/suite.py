@@ -0,0 +1,191 @@
+"""Time and memory-profile each stage of generating a changelog from a generated repository.
+
+Run with ``python -m tests.benchmarks.suite`` to print the results, add ``--save`` to store them
+as the baseline in ``tests/benchmarks/baseline.json`` and ``--check`` to exit with an error if any
+stage has regressed against that baseline. Run with ``--help`` for the repository's options.
+
+Times are also recorded relative to a fixed pure Python workload timed on the same machine, which
+is what ``--check`` compares so that a baseline saved on one machine is still useful on another.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from tests.fixtures.synthetic_repo import generate_repo
+from samsgeneratechangelog.constants import GIT_BACKENDS, TEMPLATE_NAMES
+from samsgeneratechangelog.changelogfilehelper import ChangelogFileHelper
+from samsgeneratechangelog.generatechangelog import GenerateChangelog
+from samsgeneratechangelog.githelper import GitHelper
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'baseline.json')
+CUSTOM_ATTRIBUTES = {
+    'jira_id': {'derived_from': 'message', 'pattern': r'^\w+-\d+'},
+    'root_folder': {'derived_from': 'file_path', 'pattern': r'^([^/]+)/'},
+}
+# How much slower (as a fraction) and how much more memory a stage may use before it has regressed
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.25
+# Differences smaller than these are noise, whatever the tolerance
+TIME_SLACK = 0.005
+MEMORY_SLACK = 256 * 1024
+
+
+def calibrate():
+    """Return the best time of a fixed pure Python workload, which stage times are compared relative to."""
+    return best_time(lambda: sum(number * number for number in range(200000)), repeat=5)
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def peak_memory(function):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def stages(repo_path, entry_count):
+    """Yield a ``(name, function)`` tuple for each stage to measure.
+
+    Every stage but the ``commit_log`` ones works on FileCommits read up front, so that it measures only itself.
+    """
+    for git_backend in GIT_BACKENDS:
+        def commit_log(git_backend=git_backend):
+            git_helper = GitHelper(repo_path, CUSTOM_ATTRIBUTES, git_backend=git_backend)
+            list(git_helper.commit_log('start', 'end'))
+            git_helper.close()
+        yield f'commit_log[{git_backend}]', commit_log
+
+    def commit_logs():
+        git_helper = GitHelper(repo_path, CUSTOM_ATTRIBUTES)
+        tags = git_helper.list_tags()
+        git_helper.commit_logs([(start, end) for (start, _), (end, _) in zip(tags, tags[1:])])
+    yield 'commit_logs[tags]', commit_logs
+
+    file_commits = list(GitHelper(repo_path, CUSTOM_ATTRIBUTES).commit_log('start', 'end'))
+    for template_name in TEMPLATE_NAMES:
+        changelog = GenerateChangelog(
+            'start', 'end', git_path=repo_path, template_name=template_name,
+            custom_attributes=CUSTOM_ATTRIBUTES, template_variables={'header_text': '1.0.0'}
+        )
+        template = changelog._get_markdown_template()
+
+        def render(changelog=changelog, template=template):
+            changelog._render(template, 'start', 'end', file_commits)
+        yield f'render[{template_name}]', render
+
+    changelog = GenerateChangelog('start', 'end', git_path=repo_path, template_variables={'header_text': '1.0.0'})
+    entry = changelog._render(changelog._get_markdown_template(), 'start', 'end', file_commits)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, 'CHANGELOG.md')
+        ChangelogFileHelper(file_path).write_entries([(entry, str(number)) for number in range(entry_count)])
+        file_helper = ChangelogFileHelper(file_path)
+        yield 'write_entry[replace]', lambda: file_helper.write_entry(entry, str(entry_count // 2))
+        yield 'write_entry[prepend]', lambda: file_helper.write_entry(entry, 'new')
+        yield 'write_entry_stream[replace]', lambda: file_helper.write_entry_stream(iter([entry]), '0')
+
+
+def run(repo_options, entry_count=200, repeat=3):
+    """Build a repository and measure every stage against it.
+
+    Returns:
+        dict: The options, the calibration time and each stage's best `seconds`, time `relative`
+            to the calibration and `peak_bytes` allocated
+    """
+    repo = generate_repo(**repo_options)
+    try:
+        calibration = calibrate()
+        results = {}
+        for name, function in stages(repo.path, entry_count):
+            seconds = best_time(function, repeat)
+            results[name] = {
+                'seconds': round(seconds, 6),
+                'relative': round(seconds / calibration, 4),
+                'peak_bytes': peak_memory(function),
+            }
+    finally:
+        repo.cleanup()
+    return {
+        'options': {'repo': repo_options, 'entry_count': entry_count},
+        'calibration_seconds': round(calibration, 6),
+        'stages': results,
+    }
+
+
+def regressions(baseline, results):
+    """Return a description of each stage in `results` which is slower or uses more memory than `baseline`."""
+    found = []
+    slack = TIME_SLACK / results['calibration_seconds']
+    for name, result in results['stages'].items():
+        expected = baseline['stages'].get(name)
+        if expected is None:
+            continue
+        if result['relative'] > expected['relative'] * (1 + TIME_TOLERANCE) + slack:
+            found.append(f"{name} took {result['relative']:.2f} times the calibration, "
+                         f"up from {expected['relative']:.2f}")
+        if result['peak_bytes'] > expected['peak_bytes'] * (1 + MEMORY_TOLERANCE) + MEMORY_SLACK:
+            found.append(f"{name} peaked at {result['peak_bytes']} bytes, up from {expected['peak_bytes']}")
+    return found
+
+
+def arg_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--commits', type=int, default=500)
+    parser.add_argument('--files-per-commit', type=int, default=5)
+    parser.add_argument('--merge-every', type=int, default=20)
+    parser.add_argument('--rename-every', type=int, default=10)
+    parser.add_argument('--tag-every', type=int, default=25)
+    parser.add_argument('--message-pattern', default='JIRA-{number} - Change number {number}')
+    parser.add_argument('--entry-count', type=int, default=200, help='The number of entries in the changelog file')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', action='store_true', help='Store the results as the baseline')
+    parser.add_argument('--check', action='store_true', help='Fail if any stage has regressed against the baseline')
+    return parser
+
+
+def main(argv=None):
+    args = arg_parser().parse_args(argv)
+    repo_options = {
+        'commits': args.commits,
+        'files_per_commit': args.files_per_commit,
+        'merge_every': args.merge_every,
+        'rename_every': args.rename_every,
+        'tag_every': args.tag_every,
+        'message_pattern': args.message_pattern,
+    }
+    results = run(repo_options, args.entry_count, args.repeat)
+    for name, result in results['stages'].items():
+        print(f"{name:40} {result['seconds'] * 1000:10.2f} ms {result['peak_bytes'] / 1024 / 1024:10.2f} MiB")
+    if args.save:
+        with open(BASELINE_FILE, 'w') as writer:
+            json.dump(results, writer, indent=2, sort_keys=True)
+            writer.write('\n')
+    if args.check:
+        with open(BASELINE_FILE) as reader:
+            baseline = json.load(reader)
+        if baseline['options'] != results['options']:
+            sys.exit('The baseline was saved with different options, run with the same options or --save a new one')
+        found = regressions(baseline, results)
+        for regression in found:
+            print(f'REGRESSION: {regression}')
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
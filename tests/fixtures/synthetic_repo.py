@@ -0,0 +1,248 @@
+"""Build throwaway git repositories with a known history using a single git fast-import."""
+import os
+import itertools
+import shutil
+import subprocess
+import tempfile
+
+BASE_TIMESTAMP = 1598918400  # 2020-09-01 00:00:00 UTC
+DEFAULT_AUTHOR = ('Sam Martin', 'sam@example.com')
+
+
+class SyntheticRepo:
+    """Describe a history commit by commit then build it with :meth:`build`.
+
+    Each commit is one minute after the previous one so the log order is predictable.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or tempfile.mkdtemp(prefix='sgc-test-')
+        self._stream = []
+        self._mark = 0
+        self._timestamp = BASE_TIMESTAMP
+        self._shas = {}
+
+    def commit(self, message, files=None, delete=(), rename=None, author=DEFAULT_AUTHOR,
+               branch='master', parent=None, merge=(), timestamp=None, symlinks=None):
+        """Add a commit and return its mark.
+
+        Arguments:
+            message (str): The commit message
+            files (dict): File contents to write keyed by path
+            delete (iterable): Paths to delete
+            rename (dict): New paths keyed by the path to rename
+            author (tuple): The name and email of the author (and committer)
+            branch (str): The branch to commit to
+            parent (int): The mark to branch from (only needed for the first commit of a branch)
+            merge (iterable): Marks to merge into the commit
+            timestamp (int): The author and committer date, defaults to a minute after the last commit
+            symlinks (dict): Symlink targets to write keyed by path
+        """
+        self._mark += 1
+        self._timestamp = timestamp or self._timestamp + 60
+        message = message if message.endswith('\n') else f'{message}\n'
+        identity = f'{author[0]} <{author[1]}> {self._timestamp} +0000'
+        self._stream.extend([
+            f'commit refs/heads/{branch}',
+            f'mark :{self._mark}',
+            f'author {identity}',
+            f'committer {identity}',
+        ])
+        self._add_data(message)
+        if parent:
+            self._stream.append(f'from :{parent}')
+        self._stream.extend(f'merge :{mark}' for mark in merge)
+        for old_path, new_path in (rename or {}).items():
+            self._stream.append(f'R "{old_path}" "{new_path}"')
+        for path in delete:
+            self._stream.append(f'D {path}')
+        for path, content in (files or {}).items():
+            self._stream.append(f'M 100644 inline {path}')
+            self._add_data(content)
+        for path, target in (symlinks or {}).items():
+            self._stream.append(f'M 120000 inline {path}')
+            self._add_data(target)
+        self._stream.append('')
+        return self._mark
+
+    def tag(self, name, mark=None, message=None):
+        """Point a tag at the commit with `mark` (defaults to the last commit), annotated if given a message."""
+        if message is None:
+            self._stream.extend([f'reset refs/tags/{name}', f'from :{mark or self._mark}', ''])
+            return
+        self._stream.extend([
+            f'tag {name}',
+            f'from :{mark or self._mark}',
+            f'tagger {DEFAULT_AUTHOR[0]} <{DEFAULT_AUTHOR[1]}> {self._timestamp} +0000',
+        ])
+        self._add_data(message)
+
+    def build(self):
+        """Create the repository, or add the commits described since it was last built, and return its path.
+
+        The first commit added to an existing branch must give its `parent`.
+        """
+        marks_file = os.path.join(self.path, '.git', 'sgc-test-marks')
+        import_marks = [f'--import-marks={marks_file}'] if self._shas else []
+        if not self._shas:
+            subprocess.run(['git', 'init', '-q', self.path], check=True)
+        subprocess.run(
+            ['git', 'fast-import', '--quiet', *import_marks, f'--export-marks={marks_file}'],
+            input='\n'.join(self._stream).encode('utf-8'),
+            cwd=self.path,
+            check=True
+        )
+        self._stream = []
+        subprocess.run(['git', 'symbolic-ref', 'HEAD', 'refs/heads/master'], cwd=self.path, check=True)
+        with open(marks_file) as reader:
+            for line in reader:
+                mark, sha = line.split()
+                self._shas[int(mark[1:])] = sha
+        return self.path
+
+    def repack(self, *flags, config=()):
+        """Run ``git repack -a -d`` with extra `flags` and ``key=value`` `config` overrides."""
+        options = [option for setting in config for option in ('-c', setting)]
+        subprocess.run(['git', *options, 'repack', '-a', '-d', '-q', *flags], cwd=self.path, check=True)
+
+    def unpack(self):
+        """Explode every pack into loose objects."""
+        pack_dir = os.path.join(self.path, '.git', 'objects', 'pack')
+        for name in os.listdir(pack_dir):
+            if name.endswith('.pack'):
+                pack_path = os.path.join(pack_dir, name)
+                with open(pack_path, 'rb') as reader:
+                    data = reader.read()
+                os.remove(pack_path)
+                os.remove(pack_path[:-len('.pack')] + '.idx')
+                subprocess.run(['git', 'unpack-objects', '-q'], input=data, cwd=self.path, check=True)
+
+    def sha(self, mark):
+        """Return the sha of the commit with `mark`."""
+        return self._shas[mark]
+
+    def cleanup(self):
+        """Delete the repository."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _add_data(self, content):
+        data = content.encode('utf-8')
+        self._stream.append(f'data {len(data)}')
+        self._stream.append(content)
+
+
+def build_default_repo():
+    """Build a small repository exercising every change type GitHelper understands.
+
+    Returns:
+        SyntheticRepo
+    """
+    repo = SyntheticRepo()
+    lines = ''.join(f'line {number}\n' for number in range(20))
+    repo.commit('Initial commit', files={'README.md': '# Readme\n', 'docs/index.rst': lines})
+    repo.tag('0.0.1')
+    repo.commit('JIRA-1234 - Added templates', files={
+        'templates/author.j2': 'author\n',
+        'templates/change_type.j2': 'change type\n',
+        'setup.py': 'setup()\n',
+    })
+    repo.commit('JIRA-1234 - Renamed docs', rename={'docs/index.rst': 'docs/source/index.rst'})
+    feature = repo.commit(
+        'JIRA-42 - Feature work', files={'feature/module.py': 'feature = True\n', 'README.md': '# Feature\n'},
+        author=('Jane Doe', 'jane@example.com'), branch='feature', parent=3
+    )
+    repo.commit('Removed change type template', delete=['templates/change_type.j2'])
+    repo.commit('Merge feature', branch='master', merge=[feature])
+    repo.commit(
+        'JIRA-99 - Edited and moved docs',
+        rename={'docs/source/index.rst': 'docs/index.rst'},
+        files={'docs/index.rst': lines + 'line 20\n'},
+        author=('Jane Doe', 'jane@example.com')
+    )
+    repo.commit('JIRA-99 - Tweaked docs', files={'docs/index.rst': lines.replace('line 3', 'line three')},
+                author=('Jane Doe', 'jane@example.com'))
+    repo.commit('Updated setup', files={'setup.py': 'setup(name="x")\n', 'templates/author.j2': 'AUTHOR\n'})
+    repo.tag('0.0.2')
+    repo.build()
+    return repo
+
+
+def build_merged_branch_repo():
+    """Build a repository with a feature branch of two commits merged between two tags.
+
+    Returns:
+        SyntheticRepo
+    """
+    repo = SyntheticRepo()
+    repo.commit('Initial commit', files={'README.md': '# Readme\n'})
+    repo.tag('0.0.1')
+    repo.commit('JIRA-1 - Feature work', files={'feature/a.py': 'a = 1\n'}, branch='feature', parent=1)
+    repo.commit('JIRA-1 - More feature work', files={'feature/b.py': 'b = 1\n'}, branch='feature')
+    repo.commit('JIRA-2 - Mainline work', files={'README.md': '# Changed\n'})
+    repo.commit('Merge JIRA-1', files={'feature/a.py': 'a = 1\n', 'feature/b.py': 'b = 1\n'}, merge=[3])
+    repo.commit('JIRA-3 - After the merge', files={'setup.py': 'setup()\n'})
+    repo.tag('0.0.2')
+    repo.build()
+    return repo
+
+
+def generate_repo(commits=500, files_per_commit=5, merge_every=0, rename_every=0,
+                  message_pattern='JIRA-{number} - Change number {number}', author_count=5, tag_every=0,
+                  branch_commits=1):
+    """Build a repository with a generated history, e.g. for benchmarks.
+
+    The first commit is tagged `start` and the last `end`. Each commit adds one file and edits
+    the rest of its files, which are spread over ten folders.
+
+    Arguments:
+        commits (int): The number of commits on master, including merges
+        files_per_commit (int): The number of files each commit changes
+        merge_every (int): Make every nth commit a merge of a feature branch, if not zero
+        rename_every (int): Also rename a file in every nth commit, if not zero
+        message_pattern (str): The commit message, formatted with the commit's `number`
+        author_count (int): The number of authors taking turns to commit
+        tag_every (int): Also tag every nth commit as `v{number}`, if not zero
+        branch_commits (int): The number of commits on each feature branch, each of which adds a file
+
+    Returns:
+        SyntheticRepo
+    """
+    repo = SyntheticRepo()
+    authors = [(f'Author {number}', f'author{number}@example.com') for number in range(author_count)]
+    lines = ''.join(f'line {number}\n' for number in range(20))
+    path_numbers = itertools.count()
+    paths = []
+
+    def new_path():
+        number = next(path_numbers)
+        paths.append(f'folder{number % 10}/file{number}.py')
+        return paths[-1]
+
+    last = repo.commit('Initial commit', files={new_path(): lines for _ in range(files_per_commit)})
+    repo.tag('start')
+    for number in range(1, commits):
+        author = authors[number % author_count]
+        message = message_pattern.format(number=number)
+        if merge_every and number % merge_every == 0:
+            feature_files = {}
+            feature = last
+            for branch_number in range(branch_commits):
+                files = {new_path(): lines}
+                feature_files.update(files)
+                feature = repo.commit(f'{message} on a branch', files=files, author=author, branch='feature',
+                                      parent=feature if branch_number == 0 else None)
+            last = repo.commit(f'Merge {message}', files=feature_files, merge=[feature], author=author)
+        else:
+            rename = {}
+            if rename_every and number % rename_every == 0 and len(paths) > files_per_commit:
+                old_path = paths.pop(number % (len(paths) - files_per_commit))
+                rename[old_path] = new_path()
+            files = {new_path(): lines}
+            for offset in range(1, files_per_commit):
+                files.setdefault(paths[(number * files_per_commit + offset) % len(paths)], f'{lines}edit {number}\n')
+            last = repo.commit(message, files=files, rename=rename, author=author)
+        if tag_every and number % tag_every == 0:
+            repo.tag(f'v{number}')
+    repo.tag('end')
+    repo.build()
+    return repo
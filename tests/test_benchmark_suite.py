@@ -0,0 +1,33 @@
+import copy
+import unittest
+from samsgeneratechangelog.constants import TEMPLATE_NAMES
+from .benchmarks import suite
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.results = suite.run(
+            {'commits': 20, 'files_per_commit': 3, 'merge_every': 5, 'rename_every': 4, 'tag_every': 5},
+            entry_count=5,
+            repeat=1
+        )
+
+    def test_every_stage_is_measured(self):
+        stages = self.results['stages']
+
+        assert {f'render[{template_name}]' for template_name in TEMPLATE_NAMES} < set(stages)
+        assert {'commit_log[subprocess]', 'commit_logs[tags]', 'write_entry[replace]'} < set(stages)
+        assert all(stage['seconds'] > 0 and stage['peak_bytes'] > 0 for stage in stages.values())
+
+    def test_regressions_are_found(self):
+        slower = copy.deepcopy(self.results)
+        slower['stages']['commit_log[native]']['relative'] += 1000
+        slower['stages']['write_entry[prepend]']['peak_bytes'] *= 100
+
+        assert suite.regressions(self.results, self.results) == []
+        found = suite.regressions(self.results, slower)
+        assert len(found) == 2
+        assert found[0].startswith('commit_log[native] took')
+        assert found[1].startswith('write_entry[prepend] peaked')
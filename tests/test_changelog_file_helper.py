@@ -0,0 +1,133 @@
+import os
+import stat
+import tempfile
+import unittest
+import tracemalloc
+from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+from samsgeneratechangelog.changelogfilehelper import ChangelogFileHelper
+
+
+def write_entry(args):
+    file_path, entry_id = args
+    ChangelogFileHelper(file_path).write_entry(f'# {entry_id}', entry_id)
+
+
+class TestChangelogFileHelper(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, 'CHANGELOG.md')
+        self.file_helper = ChangelogFileHelper(self.file_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _read(self):
+        with open(self.file_path) as reader:
+            return reader.read()
+
+    def test_entries_are_prepended_and_replaced(self):
+        self.file_helper.write_entry('# 1.0.0', '1.0.0')
+        self.file_helper.write_entry('# 2.0.0', '2.0.0')
+        self.file_helper.write_entry('# 1.0.0 again', '1.0.0')
+
+        assert self._read() == (
+            '[//]: # (SamsGenerateChangelog-2.0.0)\n# 2.0.0\n[//]: # (SamsGenerateChangelog-2.0.0)\n\n'
+            '[//]: # (SamsGenerateChangelog-1.0.0)\n# 1.0.0 again\n[//]: # (SamsGenerateChangelog-1.0.0)\n\n'
+        )
+
+    def test_write_entries_matches_writing_each_entry(self):
+        entries = [('# 1', '1'), ('# 2', '2'), ('# 1 again', '1')]
+        for entry, entry_id in entries:
+            self.file_helper.write_entry(entry, entry_id)
+        expected = self._read()
+        os.remove(self.file_path)
+
+        with patch('builtins.open', wraps=open) as mock_open:
+            self.file_helper.write_entries(entries)
+
+        assert self._read() == expected
+        assert mock_open.call_count == 2
+
+    def test_entries_are_written_verbatim(self):
+        entry = r'C:\new\folder \1 \g<0>'
+
+        self.file_helper.write_entry('first', '1.0.0')
+        self.file_helper.write_entry(entry, '1.0.0')
+
+        assert entry in self._read()
+
+    def test_file_is_replaced_atomically_and_keeps_its_mode(self):
+        self.file_helper.write_entry('# 1.0.0', '1.0.0')
+        os.chmod(self.file_path, 0o640)
+
+        with patch('os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.file_helper.write_entry('# 2.0.0', '2.0.0')
+        self.file_helper.write_entry('# 3.0.0', '3.0.0')
+
+        assert '2.0.0' not in self._read()
+        assert '3.0.0' in self._read()
+        assert os.listdir(self.temp_dir.name) == ['CHANGELOG.md']
+        assert stat.S_IMODE(os.stat(self.file_path).st_mode) == 0o640
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), 'Open files are listed in /proc')
+    def test_changelog_is_closed_before_it_is_replaced_without_fcntl(self):
+        replace = os.replace
+
+        def replace_closed_file(source, destination):
+            # As Windows would, refuse to replace a file which is still open
+            open_paths = set()
+            for fd in os.listdir('/proc/self/fd'):
+                with suppress(OSError):
+                    open_paths.add(os.readlink(os.path.join('/proc/self/fd', fd)))
+            if os.path.realpath(destination) in open_paths:
+                raise PermissionError(f'{destination} is open')
+            replace(source, destination)
+
+        with patch('samsgeneratechangelog.changelogfilehelper.fcntl', None), \
+                patch('os.replace', side_effect=replace_closed_file):
+            self.file_helper.write_entry('# 1', '1')
+            self.file_helper.write_entry('# 1 again', '1')
+            self.file_helper.write_entry_stream(iter('# 2'), '2')
+
+        assert '# 1 again' in self._read()
+        assert '# 2' in self._read()
+
+    def test_write_entry_stream_matches_write_entry(self):
+        entries = [('# 1', '1'), ('# 2\nsecond', '2'), ('# 1 again', '1'), ('', '3'), ('# 2 again', '2')]
+        for entry, entry_id in entries:
+            self.file_helper.write_entry(entry, entry_id)
+        expected = self._read()
+        os.remove(self.file_path)
+
+        for entry, entry_id in entries:
+            self.file_helper.write_entry_stream(iter(entry), entry_id)
+
+        assert self._read() == expected
+
+    def test_write_entry_stream_does_not_hold_the_entry_in_memory(self):
+        self.file_helper.write_entry('# 1.0.0\n' * 100000, '1.0.0')
+        chunks = ('- a line of a very long changelog entry\n' for _ in range(200000))
+
+        tracemalloc.start()
+        try:
+            self.file_helper.write_entry_stream(chunks, '2.0.0')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert os.path.getsize(self.file_path) > 8000000
+        assert peak < 1000000
+
+    def test_parallel_writes_keep_every_entry(self):
+        entry_ids = [str(number) for number in range(16)]
+
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(write_entry, [(self.file_path, entry_id) for entry_id in entry_ids]))
+
+        contents = self._read()
+        for entry_id in entry_ids:
+            assert contents.count(f'[//]: # (SamsGenerateChangelog-{entry_id})\n# {entry_id}\n') == 1
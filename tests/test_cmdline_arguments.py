@@ -1,8 +1,13 @@
+import io
 import os
+import json
+import tempfile
 import unittest
 from unittest.mock import patch
 import pytest
 from .test_helper import TestMixin
+from .fixtures.synthetic_repo import build_default_repo, build_merged_branch_repo
+from samsgeneratechangelog import GenerateChangelog
 from samsgeneratechangelog.__main__ import main
 
 TEST_FOLDER = os.path.dirname(os.path.realpath(__file__))
@@ -85,5 +90,321 @@ class TestCmdlineArguments(unittest.TestCase, TestMixin):
         )
 
 
+@patch.dict('os.environ', {'TZ': 'UTC'})
+class TestStreamArguments(unittest.TestCase, TestMixin):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+        cls.args = [
+            '--git-path', cls.synthetic_repo.path,
+            '--start-ref', '0.0.1',
+            '--end-ref', '0.0.2',
+            '--var', 'header_text', '0.0.2'
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def setUp(self):
+        self._delete_files()
+
+    def tearDown(self):
+        self._delete_files()
+
+    def _main(self, verb, *args):
+        with patch('sys.stdout') as mock_stdout, patch('argparse._sys.argv', ['test.py', verb, *self.args, *args]):
+            main()
+        return ''.join(str(call.args[0]) for call in mock_stdout.write.call_args_list)
+
+    def test_stream_prints_the_same_output(self):
+        expected = self._main('print')
+
+        assert self._main('print', '--stream') == expected
+        assert expected.startswith('# 0.0.2')
+
+    def test_stream_saves_the_same_output(self):
+        save_args = ['--output-file', os.path.join(TEST_FOLDER, 'CHANGELOG.md'), '--entry-id', '0.0.2']
+        self._main('save', *save_args)
+        with open(os.path.join(TEST_FOLDER, 'CHANGELOG.md')) as reader:
+            expected = reader.read()
+
+        self._main('save', '--stream', *save_args)
+        self._main('save', '--stream', *save_args)
+
+        with open(os.path.join(TEST_FOLDER, 'CHANGELOG.md')) as reader:
+            assert reader.read() == expected
+
+
+@patch.dict('os.environ', {'TZ': 'UTC'})
+class TestPathArguments(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def test_path_and_exclude(self):
+        args = [
+            'test.py', 'print', '--git-path', self.synthetic_repo.path, '--start-ref', '0.0.1', '--end-ref', '0.0.2',
+            '--template-name', 'change_type_all_commits',
+            '--path', 'docs', '--path', 'templates', '--exclude', '*/change_type.j2'
+        ]
+        with patch('sys.stdout') as mock_stdout, patch('argparse._sys.argv', args):
+            main()
+        result = mock_std_to_string(mock_stdout)
+
+        assert 'templates/author.j2' in result
+        assert 'docs/index.rst' in result
+        assert 'change_type.j2' not in result
+        assert 'README.md' not in result
+
+
+class TestRenameArguments(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def _main(self, *args):
+        argv = [
+            'test.py', 'print', '--git-path', self.synthetic_repo.path, '--start-ref', '0.0.1', '--end-ref', '0.0.2',
+            '--template-name', 'change_type_all_commits', '--no-cache', *args
+        ]
+        with patch('sys.stdout') as mock_stdout, patch('argparse._sys.argv', argv):
+            main()
+        return mock_std_to_string(mock_stdout)
+
+    def test_no_renames(self):
+        result = self._main('--no-renames')
+
+        assert 'Renamed Files' not in result
+        assert 'docs/source/index.rst' in result.split('## Added Files')[1].split('##')[0]
+
+    def test_rename_threshold_and_limit(self):
+        assert 'Renamed Files' in self._main('--rename-threshold', '100', '--rename-limit', '10')
+
+    def test_no_renames_with_threshold_or_limit_raises(self):
+        for args in (('--rename-threshold', '80'), ('--rename-limit', '10')):
+            with self.assertRaises(ValueError):
+                self._main('--no-renames', *args)
+
+
+class TestAggregateArguments(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def _main(self, *args):
+        argv = [
+            'test.py', 'print', '--git-path', self.synthetic_repo.path, '--start-ref', '0.0.1', '--end-ref', '0.0.2',
+            '--var', 'header_text', '0.0.2', '--no-cache', *args
+        ]
+        with patch('sys.stdout') as mock_stdout, patch('argparse._sys.argv', argv):
+            main()
+        return mock_std_to_string(mock_stdout)
+
+    def test_aggregate(self):
+        template_file = os.path.join(TEST_FOLDER, 'fixtures/path_aggregate_template.j2')
+        result = self._main('--aggregate', '--template-file', template_file)
+
+        assert ' - docs/index.rst - 3 changes - ' in result
+        assert f'{self.synthetic_repo.sha(7)[:7]}..{self.synthetic_repo.sha(8)[:7]} - Jane Doe' in result
+        assert result.count('\n - ') == 7
+
+    def test_aggregate_by_renders_the_same_entry(self):
+        aggregated = self._main('--aggregate-by', 'author.name', '--aggregate-by', 'friendly_change_type')
+
+        assert aggregated == self._main()
+
+
+class TestFirstParentArgument(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_merged_branch_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def _main(self, *args):
+        argv = [
+            'test.py', 'print', '--git-path', self.synthetic_repo.path, '--start-ref', '0.0.1', '--end-ref', '0.0.2',
+            '--template-name', 'change_type_all_commits', '--no-cache', *args
+        ]
+        with patch('sys.stdout') as mock_stdout, patch('argparse._sys.argv', argv):
+            main()
+        return mock_std_to_string(mock_stdout)
+
+    def test_first_parent(self):
+        result = self._main('--first-parent')
+
+        assert f'feature/b.py - {self.synthetic_repo.sha(5)[:7]}' in result
+        assert self.synthetic_repo.sha(3)[:7] not in result
+
+    def test_without_first_parent(self):
+        result = self._main()
+
+        assert f'feature/b.py - {self.synthetic_repo.sha(3)[:7]}' in result
+        assert self.synthetic_repo.sha(5)[:7] not in result
+
+
+class TestManifestArgument(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.default_repo = build_default_repo()
+        cls.merged_repo = build_merged_branch_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.default_repo.cleanup()
+        cls.merged_repo.cleanup()
+
+    def test_manifest(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = os.path.join(temp_dir, 'manifest.yml')
+            with open(manifest, 'w') as writer:
+                writer.write(
+                    'repositories:\n'
+                    f'  - {{name: default, git-path: {self.default_repo.path}, start-ref: 0.0.1, end-ref: 0.0.2}}\n'
+                    f'  - {{name: merged, git-path: {self.merged_repo.path}, start-ref: 0.0.1, end-ref: 0.0.2}}\n'
+                )
+            argv = [
+                'test.py', 'print', '--manifest', manifest, '--manifest-workers', '2', '--no-cache',
+                '--template-file', os.path.join(TEST_FOLDER, 'fixtures/repository_template.j2')
+            ]
+            with patch('sys.stdout') as mock_stdout, patch('argparse._sys.argv', argv):
+                main()
+
+        result = mock_std_to_string(mock_stdout)
+        assert '## default\n' in result
+        assert f' - feature/b.py - {self.merged_repo.sha(3)[:7]}' in result
+        assert result.index('## default') < result.index('docs/index.rst') < result.index('## merged')
+
+
+class TestCacheArguments(unittest.TestCase):
+
+    def setUp(self):
+        self.synthetic_repo = build_default_repo()
+        self.cache_dir = os.path.join(self.synthetic_repo.path, '.git', 'sgc-cache')
+
+    def tearDown(self):
+        self.synthetic_repo.cleanup()
+
+    def _main(self, *args):
+        argv = [
+            'test.py', 'print', '--git-path', self.synthetic_repo.path, '--start-ref', '0.0.1', '--end-ref', '0.0.2',
+            *args
+        ]
+        with patch('sys.stdout') as mock_stdout, patch('argparse._sys.argv', argv):
+            main()
+        return mock_std_to_string(mock_stdout)
+
+    def test_commits_are_not_cached_by_default(self):
+        self._main()
+        self._main('--cache', '--no-cache')
+
+        assert not os.path.exists(self.cache_dir)
+
+    def test_cache(self):
+        expected = self._main()
+
+        assert self._main('--cache') == expected
+        assert os.listdir(self.cache_dir)
+        assert self._main('--cache') == expected
+
+
+class TestExportArgument(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def _main(self, *args):
+        argv = [
+            'test.py', 'export', '--git-path', self.synthetic_repo.path, '--start-ref', '0.0.1', '--end-ref', '0.0.2',
+            '--no-cache', *args
+        ]
+        with patch('sys.stdout', new_callable=io.StringIO) as mock_stdout, patch('argparse._sys.argv', argv):
+            main()
+        return mock_stdout.getvalue()
+
+    def test_export(self):
+        records = [json.loads(line) for line in self._main().splitlines()]
+
+        assert len(records) == 12
+        assert records[0]['hexsha'] == self.synthetic_repo.sha(9)
+        assert [record['file_path'] for record in records[:2]] == ['setup.py', 'templates/author.j2']
+
+    def test_export_json(self):
+        assert json.loads(self._main('--export-format', 'json')) == [
+            json.loads(line) for line in self._main().splitlines()
+        ]
+
+
+class TestWatchArgument(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def _main(self, *args):
+        argv = [
+            'test.py', 'watch', '--git-path', self.synthetic_repo.path, '--start-ref', '0.0.1', '--end-ref', '0.0.2',
+            '--template-name', 'author_all_commits', '--no-cache', *args
+        ]
+        # Interrupt the watch once the changelog has been rendered for the first time
+        with patch('sys.stdout', new_callable=io.StringIO) as mock_stdout, patch('argparse._sys.argv', argv), \
+                patch('samsgeneratechangelog.watch.time.sleep', side_effect=KeyboardInterrupt):
+            main()
+        return mock_stdout.getvalue()
+
+    def test_watch_prints_changelog(self):
+        expected = GenerateChangelog(
+            git_path=self.synthetic_repo.path, start_ref='0.0.1', end_ref='0.0.2', template_name='author_all_commits'
+        ).render_markdown()
+
+        assert self._main() == expected + '\n'
+
+    def test_watch_saves_changelog(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, 'CHANGELOG.md')
+
+            assert self._main('--output-file', output_file, '--entry-id', '0.0.2', '--poll-interval', '0.5') == ''
+            with open(output_file) as reader:
+                assert 'Jane Doe' in reader.read()
+
+    def test_watch_with_manifest_raises(self):
+        argv = ['test.py', 'watch', '--manifest', 'manifest.yml', '--output-file', 'CHANGELOG.md', '--no-cache']
+
+        with patch('argparse._sys.argv', argv), self.assertRaises(ValueError) as context:
+            main()
+
+        assert '--manifest' in str(context.exception)
+
+
 if __name__ == '__main__':
     pytest.main([os.path.realpath(__file__)])
@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from .fixtures.synthetic_repo import build_default_repo
+from .test_git_helper import summarise
+from samsgeneratechangelog.githelper import GitHelper
+from samsgeneratechangelog.commitcache import MemoryCommitCache
+from samsgeneratechangelog.gitlog import CACHE_VARIANT
+
+
+class TestCommitCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='sgc-cache-')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _git_helper(self, **kwargs):
+        return GitHelper(path=self.synthetic_repo.path, use_cache=True, cache_dir=self.cache_dir, **kwargs)
+
+    def test_cached_commit_log_matches_uncached(self):
+        expected = summarise(GitHelper(path=self.synthetic_repo.path).commit_log('0.0.1', '0.0.2'))
+
+        first_run = summarise(self._git_helper().commit_log('0.0.1', '0.0.2'))
+        second_run = summarise(self._git_helper().commit_log('0.0.1', '0.0.2'))
+
+        assert first_run == expected
+        assert second_run == expected
+
+    def test_cached_commits_are_not_read_from_git_again(self):
+        list(self._git_helper().commit_log('0.0.1', '0.0.2'))
+
+        gh = self._git_helper()
+        with patch.object(GitHelper, '_stream_log', side_effect=AssertionError('commit read from git')):
+            file_commits = list(gh.commit_log('0.0.1', '0.0.2'))
+
+        assert [fc.hexsha_short for fc in file_commits] == [fc.hexsha[:7] for fc in file_commits]
+
+    def test_only_missing_commits_are_read_from_git(self):
+        repo = self.synthetic_repo
+        gh = self._git_helper()
+        list(gh.commit_log(repo.sha(1), repo.sha(3)))
+
+        with patch.object(GitHelper, '_stream_log', wraps=gh._stream_log) as mock_stream_log:
+            list(gh.commit_log('0.0.1', '0.0.2'))
+
+        assert mock_stream_log.call_count == 1
+        fed_hexshas = mock_stream_log.call_args.kwargs['input'].split('\n')
+        assert repo.sha(2) not in fed_hexshas
+        assert repo.sha(3) not in fed_hexshas
+        assert repo.sha(9) in fed_hexshas
+
+    def test_pathspec_entries_are_cached_separately(self):
+        expected = summarise(GitHelper(path=self.synthetic_repo.path).commit_log('0.0.1', '0.0.2'))
+
+        in_docs = summarise(self._git_helper(paths=['docs']).commit_log('0.0.1', '0.0.2'))
+        in_docs_cached = summarise(self._git_helper(paths=['docs']).commit_log('0.0.1', '0.0.2'))
+
+        assert in_docs == in_docs_cached == [fc for fc in expected if fc[2].startswith('docs/')]
+        assert summarise(self._git_helper().commit_log('0.0.1', '0.0.2')) == expected
+
+    def test_rename_detection_entries_are_cached_separately(self):
+        gh = GitHelper(path=self.synthetic_repo.path, detect_renames=False)
+        expected = summarise(gh.commit_log('0.0.1', '0.0.2'))
+
+        list(self._git_helper().commit_log('0.0.1', '0.0.2'))
+
+        assert summarise(self._git_helper(detect_renames=False).commit_log('0.0.1', '0.0.2')) == expected
+        assert 'R' not in {fc[3] for fc in expected}
+
+    def test_first_parent_entries_are_cached_separately(self):
+        expected = summarise(GitHelper(path=self.synthetic_repo.path, first_parent=True).commit_log('0.0.1', '0.0.2'))
+
+        list(self._git_helper().commit_log('0.0.1', '0.0.2'))
+
+        assert summarise(self._git_helper(first_parent=True).commit_log('0.0.1', '0.0.2')) == expected
+        assert summarise(self._git_helper(first_parent=True).commit_log('0.0.1', '0.0.2')) == expected
+
+    def test_rebuild_cache_discards_existing_entries(self):
+        list(self._git_helper().commit_log('0.0.1', '0.0.2'))
+
+        gh = self._git_helper(rebuild_cache=True)
+
+        assert gh.cache.contains([self.synthetic_repo.sha(9)], CACHE_VARIANT) == set()
+
+    def test_cache_is_evicted_down_to_max_size(self):
+        gh = self._git_helper(cache_max_size=1000)
+
+        list(gh.commit_log('0.0.1', '0.0.2'))
+
+        total_size = gh.cache._connection.execute('SELECT SUM(size) FROM commits').fetchone()[0]
+        assert 0 < total_size <= 1000
+
+
+class TestMemoryCommitCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='sgc-cache-')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _git_helper(self, backing=True, **kwargs):
+        gh = GitHelper(path=self.synthetic_repo.path, use_cache=backing, cache_dir=self.cache_dir)
+        gh.cache = MemoryCommitCache(backing=gh.cache, **kwargs)
+        return gh
+
+    def test_commits_are_read_through_the_backing_cache(self):
+        expected = summarise(GitHelper(path=self.synthetic_repo.path).commit_log('0.0.1', '0.0.2'))
+        assert summarise(self._git_helper().commit_log('0.0.1', '0.0.2')) == expected
+
+        gh = self._git_helper()
+        with patch.object(GitHelper, '_stream_log', side_effect=AssertionError('commit read from git')):
+            assert summarise(gh.commit_log('0.0.1', '0.0.2')) == expected
+
+        assert len(gh.cache) == 8
+        assert gh.cache.backing.contains([self.synthetic_repo.sha(9)], CACHE_VARIANT) == {self.synthetic_repo.sha(9)}
+
+    def test_least_recently_used_commits_are_evicted(self):
+        repo = self.synthetic_repo
+        gh = self._git_helper(backing=False, max_commits=3)
+
+        list(gh.commit_log('0.0.1', '0.0.2'))
+        # Commits are read newest first, so the oldest were used last
+        assert gh.cache.contains([repo.sha(mark) for mark in range(2, 10)], CACHE_VARIANT) == {
+            repo.sha(2), repo.sha(3), repo.sha(4)
+        }
+
+        gh.cache.get_many(gh.repo, [repo.sha(4)], CACHE_VARIANT)
+        list(gh.commit_log(repo.sha(5), repo.sha(6)))
+
+        assert gh.cache.contains([repo.sha(mark) for mark in range(2, 10)], CACHE_VARIANT) == {
+            repo.sha(2), repo.sha(4), repo.sha(6)
+        }
@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import Mock, PropertyMock
+import git
+from samsgeneratechangelog.customattributes import CustomAttributes
+from samsgeneratechangelog.githelper import FileCommit
+
+
+class TestCustomAttributes(unittest.TestCase):
+
+    def _file_commits(self, commit, paths, custom_attributes):
+        return [FileCommit(commit, path, 'M', Mock(), custom_attributes) for path in paths]
+
+    def test_commit_level_attributes_are_evaluated_once_per_commit(self):
+        mock_commit = Mock()
+        message = PropertyMock(return_value='JIRA-1234 - My first commit')
+        type(mock_commit).message = message
+        custom_attributes = CustomAttributes({'jira_id': {'derived_from': 'message', 'pattern': r'^\w+-\d+'}})
+
+        file_commits = self._file_commits(mock_commit, ['README.md', 'setup.py', 'docs/index.rst'], custom_attributes)
+
+        assert [fc.jira_id for fc in file_commits] == ['JIRA-1234'] * 3
+        assert message.call_count == 1
+
+    def test_file_level_attributes_are_evaluated_per_file(self):
+        custom_attributes = CustomAttributes({
+            'root_folder': {'derived_from': 'file_path', 'pattern': r'^([^/]+)/'},
+            'root_folder_initial': {'derived_from': 'root_folder', 'pattern': r'^\w'},
+        })
+
+        file_commits = self._file_commits(Mock(), ['docs/index.rst', 'tests/test_x.py'], custom_attributes)
+
+        assert [fc.root_folder for fc in file_commits] == ['docs', 'tests']
+        assert [fc.root_folder_initial for fc in file_commits] == ['d', 't']
+        assert [name for name, _, _ in custom_attributes.file_attributes] == ['root_folder', 'root_folder_initial']
+
+    def test_each_commit_gets_its_own_values(self):
+        custom_attributes = CustomAttributes({'jira_id': {'derived_from': 'message', 'pattern': r'^\w+-\d+'}})
+        first, second = Mock(message='JIRA-1 - First'), Mock(message='JIRA-2 - Second')
+
+        file_commits = self._file_commits(first, ['a'], custom_attributes) + \
+            self._file_commits(second, ['a'], custom_attributes) + \
+            self._file_commits(first, ['b'], custom_attributes)
+
+        assert [fc.jira_id for fc in file_commits] == ['JIRA-1', 'JIRA-2', 'JIRA-1']
+
+    def test_actor_sources_are_matched_against_their_name(self):
+        mock_commit = Mock(author=git.Actor('Jane Doe', 'jane@example.com'))
+
+        fc = FileCommit(
+            mock_commit, 'README.md', 'M', Mock(), {'first_name': {'derived_from': 'author', 'pattern': r'^\w+'}}
+        )
+
+        assert fc.first_name == 'Jane'
+
+    def test_from_spec_reuses_compiled_attributes(self):
+        custom_attributes = CustomAttributes({'jira_id': {'derived_from': 'message', 'pattern': r'^\w+-\d+'}})
+
+        assert CustomAttributes.from_spec(custom_attributes) is custom_attributes
+        assert CustomAttributes.from_spec({}).specs == {}
@@ -0,0 +1,74 @@
+import io
+import json
+import unittest
+from datetime import datetime, timezone
+import pytest
+from .fixtures.synthetic_repo import build_default_repo
+from samsgeneratechangelog.githelper import GitHelper
+from samsgeneratechangelog.export import export_file_commits, file_commit_records
+
+
+class TestExport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def _file_commits(self, **kwargs):
+        return list(GitHelper(self.synthetic_repo.path, **kwargs).commit_log('0.0.1', '0.0.2'))
+
+    def test_records_hold_every_field_of_the_file_commit(self):
+        file_commits = self._file_commits()
+
+        records = [json.loads(record) for record in file_commit_records(file_commits)]
+
+        assert len(records) == len(file_commits) == 12
+        for record, fc in zip(records, file_commits):
+            assert record['hexsha'] == fc.hexsha
+            assert record['hexsha_short'] == fc.hexsha_short
+            assert record['parent_hexshas'] == list(fc.commit.parent_hexshas)
+            assert record['author'] == {'name': fc.author.name, 'email': fc.author.email}
+            assert record['committer'] == {'name': fc.committer.name, 'email': fc.committer.email}
+            assert record['message'] == fc.message
+            committed_date = datetime.fromtimestamp(fc.commit.committed_date, timezone.utc)
+            assert record['committed_date'] == committed_date.isoformat()
+            assert (record['file_path'], record['change_type']) == (fc.file_path, fc.change_type)
+            assert 'custom_attributes' not in record and 'repository' not in record
+        assert records[-1]['authored_date'] == '2020-09-01T00:02:00+00:00'
+
+    def test_records_hold_custom_attributes(self):
+        file_commits = self._file_commits(custom_attributes={
+            'jira_id': {'derived_from': 'message', 'pattern': r'^\w+-\d+'}
+        })
+
+        records = [json.loads(record) for record in file_commit_records(file_commits)]
+
+        assert [record['custom_attributes'] for record in records] == [{'jira_id': fc.jira_id} for fc in file_commits]
+        assert {record['custom_attributes']['jira_id'] for record in records} == {'JIRA-1234', 'JIRA-42', 'JIRA-99', ''}
+
+    def test_export_formats(self):
+        file_commits = self._file_commits()
+        ndjson, array = io.StringIO(), io.StringIO()
+
+        assert export_file_commits(file_commits, ndjson) == 12
+        assert export_file_commits(iter(file_commits), array, 'json') == 12
+
+        assert [json.loads(line) for line in ndjson.getvalue().splitlines()] == json.loads(array.getvalue())
+        assert ndjson.getvalue().endswith('}\n')
+
+    def test_export_nothing(self):
+        ndjson, array = io.StringIO(), io.StringIO()
+
+        export_file_commits([], ndjson)
+        export_file_commits([], array, 'json')
+
+        assert ndjson.getvalue() == ''
+        assert json.loads(array.getvalue()) == []
+
+    def test_unknown_format_raises(self):
+        with pytest.raises(ValueError):
+            export_file_commits([], io.StringIO(), 'csv')
@@ -0,0 +1,130 @@
+import unittest
+from types import SimpleNamespace
+from datetime import datetime
+from jinja2 import Environment
+from samsgeneratechangelog.filecommitindex import FileCommitIndex, PathAggregate, aggregate_file_commits
+
+
+def file_commit(author, change_type, file_path, day):
+    return SimpleNamespace(
+        author=SimpleNamespace(name=author),
+        friendly_change_type=change_type,
+        file_path=file_path,
+        committed_date=datetime(2020, 1, day),
+        commit=SimpleNamespace(committed_date=datetime(2020, 1, day).timestamp())
+    )
+
+
+class TestFileCommitIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.file_commits = [
+            file_commit('bob', 'Modified', 'setup.py', 3),
+            file_commit('Alice', 'Added', 'README.md', 1),
+            file_commit('alice', 'Added', 'readme.md', 2),
+            file_commit('Bob', 'Modified', 'setup.py', 3),
+            file_commit('alice', 'Modified', 'README.md', 1),
+        ]
+
+    def test_by_groups_like_jinja_groupby(self):
+        index = FileCommitIndex(iter(self.file_commits))
+        expected = Environment().from_string(
+            "{% for grouper, items in file_commits | groupby('author.name') | sort(attribute='grouper') %}"
+            "{{ grouper }}:{% for fc in items %}{{ fc.file_path }},{% endfor %};{% endfor %}"
+        ).render(file_commits=self.file_commits)
+
+        result = ''.join(
+            f"{group.grouper}:{''.join(fc.file_path + ',' for fc in group.list)};"
+            for group in index.by('author.name')
+        )
+
+        assert result == expected == 'Alice:README.md,readme.md,README.md,;bob:setup.py,setup.py,;'
+
+    def test_by_nests_groups_and_tracks_the_latest_commit(self):
+        index = FileCommitIndex(self.file_commits)
+
+        groups = index.by('author.name', 'friendly_change_type', 'file_path')
+
+        assert [(group.grouper, [change_type.grouper for change_type in group.list]) for group in groups] == [
+            ('Alice', ['Added', 'Modified']),
+            ('bob', ['Modified']),
+        ]
+        added = groups[0].list[0]
+        assert [(path.grouper, len(path.list)) for path in added.list] == [('README.md', 2)]
+        assert added.latest is self.file_commits[2]
+        # The last of equally recent commits, as sort(attribute='committed_date') | last would pick
+        assert groups[1].list[0].list[0].latest is self.file_commits[3]
+
+    def test_groups_unpack_and_are_cached(self):
+        index = FileCommitIndex(iter(self.file_commits))
+
+        grouper, items = index.by('friendly_change_type')[0]
+
+        assert grouper == 'Added'
+        assert len(items) == 2
+        assert index.by('friendly_change_type') is index.by('friendly_change_type')
+        assert len(index) == len(list(index)) == 5
+
+    def test_sorted_is_case_insensitive_and_stable(self):
+        index = FileCommitIndex(self.file_commits)
+
+        assert [fc.file_path for fc in index.sorted('file_path')] == [
+            'README.md', 'readme.md', 'README.md', 'setup.py', 'setup.py'
+        ]
+        assert [fc.author.name for fc in index.by('author.name')[1].sorted('committed_date')] == ['bob', 'Bob']
+
+
+class TestAggregateFileCommits(unittest.TestCase):
+
+    def setUp(self):
+        self.alice = SimpleNamespace(name='alice')
+        self.bob = SimpleNamespace(name='bob')
+        self.file_commits = [
+            file_commit('bob', 'Modified', 'setup.py', 4),
+            file_commit('alice', 'Modified', 'README.md', 3),
+            file_commit('bob', 'Modified', 'README.md', 3),
+            file_commit('alice', 'Added', 'README.md', 1),
+            file_commit('alice', 'Added', 'setup.py', 1),
+        ]
+        for fc in self.file_commits:
+            fc.author = self.alice if fc.author.name == 'alice' else self.bob
+
+    def test_folds_every_change_to_a_path(self):
+        aggregates = list(aggregate_file_commits(iter(self.file_commits)))
+
+        assert [aggregate.file_path for aggregate in aggregates] == ['setup.py', 'README.md']
+        readme = aggregates[1]
+        assert isinstance(readme, PathAggregate)
+        assert readme.count == 3
+        assert readme.authors == [self.alice, self.bob]
+        # The last of equally recent changes, as FileCommitIndex picks
+        assert readme.latest is self.file_commits[2]
+        assert readme.first is self.file_commits[3]
+        assert readme.group == ()
+        assert readme.friendly_change_type == 'Modified'
+        assert readme.author is self.bob
+
+    def test_folds_each_value_of_the_attributes_separately(self):
+        aggregates = list(aggregate_file_commits(self.file_commits, ['author.name', 'friendly_change_type']))
+
+        assert [(aggregate.group, aggregate.file_path, aggregate.count) for aggregate in aggregates] == [
+            (('bob', 'Modified'), 'setup.py', 1),
+            (('alice', 'Modified'), 'README.md', 1),
+            (('bob', 'Modified'), 'README.md', 1),
+            (('alice', 'Added'), 'README.md', 1),
+            (('alice', 'Added'), 'setup.py', 1),
+        ]
+
+    def test_index_of_aggregates_groups_like_index_of_file_commits(self):
+        attributes = ('author.name', 'friendly_change_type', 'file_path')
+        aggregates = aggregate_file_commits(self.file_commits, attributes[:-1])
+
+        def summarise(groups):
+            return [
+                (author.grouper, change_type.grouper, path.grouper, path.latest.committed_date)
+                for author in groups for change_type in author.list for path in change_type.list
+            ]
+
+        assert summarise(FileCommitIndex(aggregates).by(*attributes)) == summarise(
+            FileCommitIndex(self.file_commits).by(*attributes)
+        )
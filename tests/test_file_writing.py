@@ -5,6 +5,7 @@ import logging
 import pytest
 from .test_helper import TestMixin
 from .fixtures.defaults import DEFAULT_ARGS, TEST_FOLDER
+from .fixtures.synthetic_repo import build_default_repo
 from samsgeneratechangelog import GenerateChangelog
 
 logging.basicConfig(level='DEBUG')
@@ -60,3 +61,37 @@ class TestFileWriting(unittest.TestCase, TestMixin):
 
 if __name__ == '__main__':
     pytest.main([os.path.realpath(__file__)])
+
+
+@patch.dict('os.environ', {'TZ': 'UTC'})
+class TestBackfillFileWriting(unittest.TestCase, TestMixin):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def setUp(self):
+        self._delete_files()
+
+    def tearDown(self):
+        self._delete_files()
+
+    def test_render_backfill_to_file_writes_an_entry_per_tag_range(self):
+        file_path = os.path.join(TEST_FOLDER, 'CHANGELOG.md')
+        template_variables = {'header_text': '0.0.2'}
+        expected = GenerateChangelog(
+            '0.0.1', '0.0.2', git_path=self.synthetic_repo.path, template_variables=template_variables
+        ).render_markdown()
+
+        gc = GenerateChangelog(git_path=self.synthetic_repo.path, template_variables=template_variables)
+        gc.render_backfill_to_file(file_path=file_path)
+        gc.render_backfill_to_file(file_path=file_path)
+
+        with open(file_path) as reader:
+            result = reader.read()
+        delimiter = '[//]: # (SamsGenerateChangelog-0.0.2)'
+        assert result == f'{delimiter}\n{expected}\n{delimiter}\n\n'
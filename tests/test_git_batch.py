@@ -0,0 +1,84 @@
+import shutil
+import tempfile
+import unittest
+import subprocess
+from unittest.mock import patch
+import git
+from .fixtures.synthetic_repo import build_default_repo
+from .test_git_helper import summarise
+from samsgeneratechangelog.githelper import GitHelper
+
+
+class TestGitBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def setUp(self):
+        self.gh = GitHelper(path=self.synthetic_repo.path, git_backend='batch')
+
+    def tearDown(self):
+        self.gh.close()
+
+    def test_commit_log_matches_subprocess_backend(self):
+        expected = summarise(GitHelper(path=self.synthetic_repo.path).commit_log('0.0.1', '0.0.2'))
+
+        assert summarise(self.gh.commit_log('0.0.1', '0.0.2')) == expected
+
+    def test_commit_log_starts_each_git_process_once(self):
+        with patch.object(subprocess, 'Popen', wraps=subprocess.Popen) as mock_popen:
+            list(self.gh.commit_log('0.0.1', '0.0.2'))
+            list(self.gh.commit_log('0.0.1', 'master'))
+
+        commands = [call.args[0][1] for call in mock_popen.call_args_list]
+        assert commands.count('diff-tree') == 1
+        assert commands.count('cat-file') == 1
+
+    def test_generate_file_commits_from_commit_matches_subprocess_backend(self):
+        subprocess_gh = GitHelper(path=self.synthetic_repo.path)
+
+        for mark in range(1, 10):
+            commit = self.gh.repo.commit(self.synthetic_repo.sha(mark))
+            expected = summarise(subprocess_gh.generate_file_commits_from_commit(commit))
+
+            assert summarise(self.gh.generate_file_commits_from_commit(commit)) == expected, mark
+
+    def test_generate_file_commits_from_root_commit(self):
+        commit = self.gh.repo.commit(self.synthetic_repo.sha(1))
+
+        results = [(fc.file_path, fc.change_type) for fc in self.gh.generate_file_commits_from_commit(commit)]
+
+        assert results == [('README.md', 'A'), ('docs/index.rst', 'A')]
+
+    def test_processes_restart_after_close(self):
+        list(self.gh.commit_log('0.0.1', '0.0.2'))
+        self.gh.close()
+
+        assert len(list(self.gh.commit_log('0.0.1', '0.0.2'))) == 12
+
+    def test_read_missing_object_raises(self):
+        with self.assertRaises(git.BadObject):
+            self.gh.batch.read_commit('0' * 40)
+
+    def test_commit_log_of_shallow_clone_matches_subprocess_backend(self):
+        clone_dir = tempfile.mkdtemp(prefix='sgc-shallow-')
+        self.addCleanup(shutil.rmtree, clone_dir, ignore_errors=True)
+        # Four commits deep the boundary is the merge of feature, whose parents are missing
+        subprocess.run([
+            'git', 'clone', '-q', '--depth', '4', '--no-single-branch', f'file://{self.synthetic_repo.path}', clone_dir
+        ], check=True)
+
+        for first_parent in (False, True):
+            expected = summarise(
+                GitHelper(path=clone_dir, first_parent=first_parent).commit_log('origin/feature', 'origin/master')
+            )
+            gh = GitHelper(path=clone_dir, git_backend='batch', first_parent=first_parent)
+            self.addCleanup(gh.close)
+
+            assert summarise(gh.commit_log('origin/feature', 'origin/master')) == expected, first_parent
+            assert self.synthetic_repo.sha(6) in {row[0] for row in expected}
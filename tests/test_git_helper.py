@@ -1,7 +1,12 @@
+import asyncio
+import tempfile
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
+import git
 from .fixtures.defaults import GIT_FOLDER
+from .fixtures.synthetic_repo import build_default_repo, build_merged_branch_repo
 from samsgeneratechangelog.githelper import FileCommit, GitHelper
+from samsgeneratechangelog.gitlog import GitLogParser, LogCommit, RenameDetection, LOG_ARGS, actor
 
 
 class TestGitHelper(unittest.TestCase):
@@ -15,6 +20,280 @@ class TestGitHelper(unittest.TestCase):
             assert len(commit.commit.parents) == 1
 
 
+def summarise(file_commits):
+    return [
+        (fc.hexsha, fc.hexsha_short, fc.file_path, fc.change_type, fc.author.name, fc.author.email,
+         fc.committed_date, fc.message)
+        for fc in file_commits
+    ]
+
+
+class TestGitHelperSyntheticRepo(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def test_commit_log_matches_diffing_each_commit(self):
+        gh = GitHelper(path=self.synthetic_repo.path)
+
+        expected = []
+        for commit_id in gh.git.log('--pretty=%H', '0.0.1...0.0.2').split('\n'):
+            commit = gh.repo.commit(commit_id)
+            if len(commit.parents) == 1:
+                expected.extend(gh.generate_file_commits_from_commit(commit))
+
+        assert summarise(gh.commit_log('0.0.1', '0.0.2')) == summarise(expected)
+
+    def test_commit_log_reports_renames_with_modifications_twice(self):
+        gh = GitHelper(path=self.synthetic_repo.path)
+
+        results = [
+            (fc.file_path, fc.change_type)
+            for fc in gh.commit_log('0.0.1', '0.0.2')
+            if fc.summary == 'JIRA-99 - Edited and moved docs'
+        ]
+
+        assert results == [('docs/index.rst', 'R'), ('docs/index.rst', 'M')]
+
+    def test_commit_log_without_rename_detection_reports_deleted_and_added_files(self):
+        for git_backend in ('subprocess', 'batch', 'native'):
+            gh = GitHelper(path=self.synthetic_repo.path, git_backend=git_backend, detect_renames=False)
+
+            results = [
+                (fc.file_path, fc.change_type)
+                for fc in gh.commit_log('0.0.1', '0.0.2')
+                if fc.summary == 'JIRA-1234 - Renamed docs'
+            ]
+
+            assert results == [('docs/source/index.rst', 'A'), ('docs/index.rst', 'D')], git_backend
+
+    def test_generate_file_commits_from_commit_uses_rename_detection(self):
+        gh = GitHelper(path=self.synthetic_repo.path, detect_renames=False)
+        commit = gh.repo.commit(self.synthetic_repo.sha(3))
+
+        results = [(fc.file_path, fc.change_type) for fc in gh.generate_file_commits_from_commit(commit)]
+
+        assert results == [('docs/source/index.rst', 'A'), ('docs/index.rst', 'D')]
+
+    def test_aggregate_log_folds_each_path(self):
+        gh = GitHelper(path=self.synthetic_repo.path)
+        file_commits = list(gh.commit_log('0.0.1', '0.0.2'))
+
+        aggregates = {aggregate.file_path: aggregate for aggregate in gh.aggregate_log('0.0.1', '0.0.2')}
+
+        assert set(aggregates) == {fc.file_path for fc in file_commits}
+        assert sum(aggregate.count for aggregate in aggregates.values()) == len(file_commits)
+        docs = aggregates['docs/index.rst']
+        assert docs.latest.summary == 'JIRA-99 - Tweaked docs'
+        assert docs.first.summary == 'JIRA-99 - Edited and moved docs'
+        assert docs.count == 3
+        assert [author.name for author in docs.authors] == ['Jane Doe']
+
+    def test_commit_log_resolves_short_shas_without_extra_processes(self):
+        gh = GitHelper(path=self.synthetic_repo.path)
+        file_commits = list(gh.commit_log('0.0.1', '0.0.2'))
+
+        with patch.object(git.cmd.Git, 'execute') as mock_execute:
+            short_shas = {fc.hexsha: fc.hexsha_short for fc in file_commits}
+        mock_execute.assert_not_called()
+
+        for hexsha, hexsha_short in short_shas.items():
+            assert hexsha_short == gh.git.rev_parse(hexsha, short=7)
+
+    def test_commit_log_with_jobs_matches_single_process(self):
+        expected = summarise(GitHelper(path=self.synthetic_repo.path).commit_log('0.0.1', '0.0.2'))
+
+        gh = GitHelper(path=self.synthetic_repo.path, jobs=2)
+        gh._max_job_chunk_size = 2
+
+        assert summarise(gh.commit_log('0.0.1', '0.0.2')) == expected
+
+    def test_commit_log_with_jobs_prefetches_custom_attribute_sources(self):
+        gh = GitHelper(
+            path=self.synthetic_repo.path,
+            custom_attributes={'encoding': {'derived_from': 'encoding', 'pattern': r'\w+'}},
+            jobs=2
+        )
+
+        file_commits = list(gh.commit_log('0.0.1', '0.0.2'))
+
+        assert {fc.encoding for fc in file_commits} == {'UTF'}
+        assert all(fc.commit._commit is None for fc in file_commits)
+
+    def test_commit_logs_matches_commit_log_for_each_range(self):
+        gh = GitHelper(path=self.synthetic_repo.path)
+        ranges = [
+            ('0.0.1', self.synthetic_repo.sha(3)),
+            (self.synthetic_repo.sha(3), '0.0.2'),
+            (self.synthetic_repo.sha(4), self.synthetic_repo.sha(5)),
+            ('0.0.1', '0.0.2'),
+        ]
+
+        with patch.object(gh, '_read_commits', wraps=gh._read_commits) as mock_read_commits:
+            results = gh.commit_logs(ranges)
+
+        for (rev_a, rev_b), file_commits in zip(ranges, results):
+            assert summarise(file_commits) == summarise(gh.commit_log(rev_a, rev_b)), (rev_a, rev_b)
+        mock_read_commits.assert_called_once()
+        hexshas = [hexsha for hexsha, _ in mock_read_commits.call_args.args[0]]
+        assert len(hexshas) == len(set(hexshas)) == 8
+
+    def test_commit_log_with_pathspec_only_reads_matching_commits(self):
+        expected = [
+            fc for fc in summarise(GitHelper(path=self.synthetic_repo.path).commit_log('0.0.1', '0.0.2'))
+            if fc[2].startswith('docs/') or fc[2] == 'templates/author.j2'
+        ]
+
+        for git_backend in ('subprocess', 'batch', 'native'):
+            for jobs in (1, 2):
+                gh = GitHelper(
+                    path=self.synthetic_repo.path, git_backend=git_backend, jobs=jobs,
+                    paths=['docs', 'templates/*.j2'], exclude_paths=['templates/change_type.j2']
+                )
+                assert summarise(gh.commit_log('0.0.1', '0.0.2')) == expected, (git_backend, jobs)
+                gh.close()
+
+        listed = GitHelper(path=self.synthetic_repo.path, paths=['docs'])._list_commits('0.0.1', '0.0.2')
+        assert [hexsha for hexsha, _ in listed] == [self.synthetic_repo.sha(mark) for mark in (8, 7, 3)]
+
+    def test_commit_logs_with_pathspec_matches_commit_log_for_each_range(self):
+        gh = GitHelper(path=self.synthetic_repo.path, paths=['README.md'])
+        ranges = [('0.0.1', self.synthetic_repo.sha(3)), (self.synthetic_repo.sha(3), '0.0.2')]
+
+        with patch.object(gh, '_read_commits', wraps=gh._read_commits) as mock_read_commits:
+            results = gh.commit_logs(ranges)
+
+        for (rev_a, rev_b), file_commits in zip(ranges, results):
+            assert summarise(file_commits) == summarise(gh.commit_log(rev_a, rev_b)), (rev_a, rev_b)
+        assert [hexsha for hexsha, _ in mock_read_commits.call_args.args[0]] == [self.synthetic_repo.sha(4)]
+
+    def test_commit_log_async_matches_commit_log(self):
+        expected = summarise(GitHelper(path=self.synthetic_repo.path).commit_log('0.0.1', '0.0.2'))
+
+        async def commit_log(gh):
+            return [file_commit async for file_commit in gh.commit_log_async('0.0.1', '0.0.2')]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for kwargs in ({}, {'git_backend': 'native'}, {'use_cache': True, 'cache_dir': cache_dir}):
+                gh = GitHelper(path=self.synthetic_repo.path, **kwargs)
+                assert summarise(asyncio.run(commit_log(gh))) == expected, kwargs
+                gh.close()
+
+    def test_commit_log_async_streams_with_asyncio(self):
+        gh = GitHelper(path=self.synthetic_repo.path)
+
+        async def commit_logs():
+            return await asyncio.gather(*(
+                asyncio.ensure_future(self._collect(gh.commit_log_async(rev_a, rev_b)))
+                for rev_a, rev_b in [('0.0.1', '0.0.2'), ('0.0.1', self.synthetic_repo.sha(3)), ('0.0.1', 'no-such')]
+            ), return_exceptions=True)
+
+        with patch.object(GitHelper, '_stream_git', side_effect=AssertionError('blocking git process')):
+            results = asyncio.run(commit_logs())
+
+        assert summarise(results[0]) == summarise(gh.commit_log('0.0.1', '0.0.2'))
+        assert summarise(results[1]) == summarise(gh.commit_log('0.0.1', self.synthetic_repo.sha(3)))
+        assert isinstance(results[2], git.GitCommandError)
+
+    @staticmethod
+    async def _collect(file_commits):
+        return [file_commit async for file_commit in file_commits]
+
+    def test_list_tags(self):
+        gh = GitHelper(path=self.synthetic_repo.path)
+
+        assert gh.list_tags() == [('0.0.1', self.synthetic_repo.sha(1)), ('0.0.2', self.synthetic_repo.sha(9))]
+        assert gh.list_tags('*.2') == [('0.0.2', self.synthetic_repo.sha(9))]
+
+    def test_log_parser_handles_arbitrary_chunking(self):
+        gh = GitHelper(path=self.synthetic_repo.path)
+        output = gh.git.log(*LOG_ARGS, '0.0.1...0.0.2', stdout_as_string=False)
+
+        parser = GitLogParser(gh.repo)
+        whole = list(parser.feed(output)) + list(parser.close())
+        parser = GitLogParser(gh.repo)
+        chunked = [parsed for byte in range(len(output)) for parsed in parser.feed(output[byte:byte + 1])]
+        chunked.extend(parser.close())
+
+        assert [(c.hexsha, changes) for c, changes in chunked] == [(c.hexsha, changes) for c, changes in whole]
+        assert len(whole) == 8
+
+
+class TestGitHelperFirstParent(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_merged_branch_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def test_commit_log_diffs_merges_against_their_first_parent(self):
+        for git_backend in ('subprocess', 'batch', 'native'):
+            for jobs in (1, 2):
+                gh = GitHelper(path=self.synthetic_repo.path, git_backend=git_backend, jobs=jobs, first_parent=True)
+
+                results = [(fc.summary, fc.file_path, fc.change_type) for fc in gh.commit_log('0.0.1', '0.0.2')]
+
+                assert results == [
+                    ('JIRA-3 - After the merge', 'setup.py', 'A'),
+                    ('Merge JIRA-1', 'feature/a.py', 'A'),
+                    ('Merge JIRA-1', 'feature/b.py', 'A'),
+                    ('JIRA-2 - Mainline work', 'README.md', 'M'),
+                ], (git_backend, jobs)
+                gh.close()
+
+    def test_commit_log_excludes_commits_reachable_from_both_ends(self):
+        # The feature branch was merged into 0.0.2, so nothing is new in it
+        for git_backend in ('subprocess', 'batch', 'native'):
+            gh = GitHelper(path=self.synthetic_repo.path, git_backend=git_backend, first_parent=True)
+
+            results = list(dict.fromkeys(fc.summary for fc in gh.commit_log('0.0.2', self.synthetic_repo.sha(3))))
+
+            assert results == ['JIRA-3 - After the merge', 'Merge JIRA-1', 'JIRA-2 - Mainline work'], git_backend
+
+    def test_commit_logs_matches_commit_log_for_each_range(self):
+        ranges = [
+            ('0.0.1', self.synthetic_repo.sha(4)),
+            (self.synthetic_repo.sha(4), '0.0.2'),
+            (self.synthetic_repo.sha(3), '0.0.2'),
+        ]
+        for git_backend in ('subprocess', 'native'):
+            gh = GitHelper(path=self.synthetic_repo.path, git_backend=git_backend, first_parent=True)
+
+            for (rev_a, rev_b), file_commits in zip(ranges, gh.commit_logs(ranges)):
+                assert summarise(file_commits) == summarise(gh.commit_log(rev_a, rev_b)), (git_backend, rev_a, rev_b)
+
+
+class TestRenameDetection(unittest.TestCase):
+
+    def test_args(self):
+        assert RenameDetection().args == ['-M']
+        assert RenameDetection(threshold=90, limit=0).args == ['-M90%', '-l0']
+        assert RenameDetection(enabled=False).args == ['--no-renames']
+
+    def test_diff_kwargs(self):
+        assert RenameDetection().diff_kwargs == {}
+        assert RenameDetection(threshold=90, limit=5).diff_kwargs == {'find_renames': '90%', 'l': 5}
+        assert RenameDetection(enabled=False).diff_kwargs == {'no_renames': True}
+
+    def test_invalid_options_raise(self):
+        with self.assertRaises(ValueError):
+            RenameDetection(threshold=101)
+        with self.assertRaises(ValueError):
+            RenameDetection(limit=-1)
+        with self.assertRaises(ValueError):
+            RenameDetection(enabled=False, threshold=90)
+        with self.assertRaises(ValueError):
+            RenameDetection(enabled=False, limit=0)
+
+
 class TestFileCommit(unittest.TestCase):
 
     def test_properties(self):
@@ -25,6 +304,16 @@ class TestFileCommit(unittest.TestCase):
         assert fc.friendly_change_type == 'Modified'
         self.assertIsInstance(fc.author.name, Mock)
 
+    def test_hexsha_short_is_resolved_once(self):
+        mock_commit = Mock(spec=['hexsha'], hexsha='ac77514f027554af76506833825d418e5072a866')
+        mock_repo = Mock()
+        mock_repo.git.rev_parse.return_value = 'ac77514'
+        fc = FileCommit(mock_commit, 'README.md', 'M', mock_repo)
+
+        assert fc.hexsha_short == 'ac77514'
+        assert fc.hexsha_short == 'ac77514'
+        mock_repo.git.rev_parse.assert_called_once_with('ac77514f027554af76506833825d418e5072a866', short=7)
+
     def test_custom_properties(self):
         mock_commit = Mock()
         mock_commit.message = 'JIRA-1234 - My first commit'
@@ -89,3 +378,46 @@ class TestFileCommit(unittest.TestCase):
         )
 
         assert fc.jira_id == ''
+
+    def test_file_commits_are_compact_and_share_strings(self):
+        commit = LogCommit(None, 'a' * 40, 'aaaaaaa', (), actor('Sam', 'sam@example.com'), 0,
+                           actor('Sam', 'sam@example.com'), 0, 'JIRA-1 - Change')
+        custom_attributes = {'jira_id': {'derived_from': 'message', 'pattern': r'^\w+-\d+'}}
+        first, second = [
+            FileCommit(commit, ''.join(['docs/', 'index.rst']), 'M', Mock(), custom_attributes) for _ in range(2)
+        ]
+
+        assert not hasattr(first, '__dict__')
+        assert first.file_path is second.file_path
+        assert commit.author is commit.committer
+        assert (first.jira_id, first.author.name, first.friendly_change_type) == ('JIRA-1', 'Sam', 'Modified')
+        assert commit._commit is None
+
+
+class TestGitHelperAbbreviation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+        cls.synthetic_repo_git = git.Repo(cls.synthetic_repo.path).git
+        cls.synthetic_repo_git.config('core.abbrev', '12')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def test_hexsha_short_ignores_core_abbrev(self):
+        expected = [
+            self.synthetic_repo_git.rev_parse(fc.hexsha, short=7)
+            for fc in GitHelper(path=self.synthetic_repo.path).commit_log('0.0.1', '0.0.2')
+        ]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for kwargs in (
+                {'git_backend': 'batch'}, {'git_backend': 'native'}, {'jobs': 2},
+                {'use_cache': True, 'cache_dir': cache_dir}, {'use_cache': True, 'cache_dir': cache_dir},
+            ):
+                gh = GitHelper(path=self.synthetic_repo.path, **kwargs)
+                assert [fc.hexsha_short for fc in gh.commit_log('0.0.1', '0.0.2')] == expected, kwargs
+                gh.close()
+        assert {len(hexsha_short) for hexsha_short in expected} == {7}
@@ -1,7 +1,10 @@
+import asyncio
 import os
+import tempfile
 import unittest
 from unittest.mock import patch
 from .fixtures.defaults import DEFAULT_ARGS, TEST_FOLDER
+from .fixtures.synthetic_repo import build_default_repo
 from .test_helper import TestMixin
 from samsgeneratechangelog import GenerateChangelog
 
@@ -32,3 +35,67 @@ class TestJinjaFeatures(unittest.TestCase, TestMixin):
         result = gc.render_markdown()
 
         assert result == "I appended successfully"
+
+
+class TestTemplateEnvironment(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.template_file = os.path.join(self.temp_dir.name, 'template.j2')
+        self._write_template('{{ file_commits | length }} files')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_template(self, content, mtime=None):
+        with open(self.template_file, 'w') as writer:
+            writer.write(content)
+        if mtime:
+            os.utime(self.template_file, (mtime, mtime))
+
+    def _generate_changelog(self, **kwargs):
+        return GenerateChangelog(
+            '0.0.1', '0.0.2', git_path=self.synthetic_repo.path, template_file=self.template_file, **kwargs
+        )
+
+    def test_environment_is_shared_between_renders(self):
+        templates = [self._generate_changelog()._get_markdown_template() for _ in range(2)]
+
+        assert templates[0].environment is templates[1].environment
+        assert templates[0] is templates[1]
+
+    def test_changed_template_is_recompiled(self):
+        assert self._generate_changelog().render_markdown() == '12 files'
+
+        self._write_template('{{ start_ref }}...{{ end_ref }}', mtime=os.path.getmtime(self.template_file) + 10)
+
+        assert self._generate_changelog().render_markdown() == '0.0.1...0.0.2'
+
+    def test_compiled_templates_are_cached_in_template_cache_dir(self):
+        cache_dir = os.path.join(self.temp_dir.name, 'cache')
+
+        assert self._generate_changelog(template_cache_dir=cache_dir).render_markdown() == '12 files'
+
+        assert len(os.listdir(cache_dir)) == 1
+
+    def test_render_markdown_async_matches_render_markdown(self):
+        changelogs = [
+            self._generate_changelog(),
+            GenerateChangelog(
+                '0.0.1', self.synthetic_repo.sha(5), git_path=self.synthetic_repo.path, template_file=self.template_file
+            )
+        ]
+        self._write_template('{% for fc in file_commits %}{{ fc.file_path }} {{ fc.hexsha_short }}\n{% endfor %}')
+
+        async def render_all():
+            return await asyncio.gather(*(changelog.render_markdown_async() for changelog in changelogs))
+
+        assert asyncio.run(render_all()) == [changelog.render_markdown() for changelog in changelogs]
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import pytest
+from .fixtures.synthetic_repo import build_default_repo, build_merged_branch_repo
+from .test_git_helper import summarise
+from samsgeneratechangelog.githelper import GitHelper
+from samsgeneratechangelog.manifest import ManifestChangelog, ManifestRepository, load_manifest
+
+
+class TestManifest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.default_repo = build_default_repo()
+        cls.merged_repo = build_merged_branch_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.default_repo.cleanup()
+        cls.merged_repo.cleanup()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manifest = os.path.join(self.temp_dir.name, 'manifest.yml')
+        self.template_file = os.path.join(self.temp_dir.name, 'template.j2')
+        with open(self.template_file, 'w') as writer:
+            writer.write(
+                "{% for repository in repositories %}{{ repository.name }} {{ repository.end_ref }}\n{% endfor %}"
+                "{% for fc in file_commits %}{{ fc.repository }} {{ fc.file_path }} {{ fc.hexsha_short }}\n{% endfor %}"
+            )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_manifest(self, content):
+        with open(self.manifest, 'w') as writer:
+            writer.write(content)
+
+    def _repositories(self):
+        return [
+            ManifestRepository('default', self.default_repo.path, '0.0.1', '0.0.2'),
+            ManifestRepository('merged', self.merged_repo.path, '0.0.1', '0.0.2'),
+        ]
+
+    def _expected(self):
+        lines = ['default 0.0.2', 'merged 0.0.2']
+        for repository in self._repositories():
+            for fc in GitHelper(repository.git_path).commit_log(repository.start_ref, repository.end_ref):
+                lines.append(f'{repository.name} {fc.file_path} {fc.hexsha_short}')
+        return '\n'.join(lines) + '\n'
+
+    def test_load_manifest(self):
+        self._write_manifest(
+            'repositories:\n'
+            f'  - git-path: {os.path.relpath(self.default_repo.path, self.temp_dir.name)}\n'
+            '    start-ref: 0.0.1\n'
+            '    end-ref: 0.0.2\n'
+            '  - name: merged\n'
+            f'    git_path: {self.merged_repo.path}\n'
+            '    start_ref: 0.0.1\n'
+            '    end_ref: 1\n'
+        )
+
+        assert load_manifest(self.manifest) == [
+            ManifestRepository(
+                os.path.basename(self.default_repo.path), os.path.normpath(self.default_repo.path), '0.0.1', '0.0.2'
+            ),
+            ManifestRepository('merged', self.merged_repo.path, '0.0.1', '1'),
+        ]
+
+    def test_invalid_manifests_raise(self):
+        for content in (
+            '',
+            'repositories: []',
+            'repositories:\n  - ../api',
+            'repositories:\n  - {git-path: a, start-ref: 1}',
+            'repositories:\n  - {git-path: a, start-ref: 1, end-ref: 2, template: x}',
+            'repositories:\n'
+            '  - {git-path: a/api, start-ref: 1, end-ref: 2}\n'
+            '  - {git-path: b/api, start-ref: 1, end-ref: 2}',
+        ):
+            self._write_manifest(content)
+            with pytest.raises(ValueError):
+                load_manifest(self.manifest)
+
+    def test_render_markdown_tags_every_repository(self):
+        self._write_manifest(
+            'repositories:\n'
+            f'  - {{name: default, git-path: {self.default_repo.path}, start-ref: 0.0.1, end-ref: 0.0.2}}\n'
+            f'  - {{name: merged, git-path: {self.merged_repo.path}, start-ref: 0.0.1, end-ref: 0.0.2}}\n'
+        )
+
+        result = ManifestChangelog(self.manifest, max_workers=2, template_file=self.template_file).render_markdown()
+
+        assert result == self._expected()
+
+    def test_render_markdown_async_and_stream_match(self):
+        expected = ManifestChangelog(self._repositories(), template_file=self.template_file).render_markdown()
+
+        result_async = asyncio.run(
+            ManifestChangelog(self._repositories(), template_file=self.template_file).render_markdown_async()
+        )
+        result_stream = ''.join(
+            ManifestChangelog(self._repositories(), template_file=self.template_file).render_markdown_stream()
+        )
+
+        assert result_async == result_stream == expected
+
+    def test_aggregates_are_separated_by_repository(self):
+        repositories = [
+            ManifestRepository('first', self.default_repo.path, '0.0.1', '0.0.2'),
+            ManifestRepository('second', self.default_repo.path, '0.0.1', '0.0.2'),
+        ]
+        changelog = ManifestChangelog(repositories, aggregate_by=[])
+
+        aggregates = list(changelog._template_context(None, None, changelog._file_commits())['file_commits'])
+        single = summarise(agg.latest for agg in GitHelper(self.default_repo.path).aggregate_log('0.0.1', '0.0.2'))
+
+        assert [agg.repository for agg in aggregates] == ['first'] * len(single) + ['second'] * len(single)
+        assert summarise(agg.latest for agg in aggregates) == single * 2
+
+    def test_backfill_raises(self):
+        with pytest.raises(ValueError):
+            list(ManifestChangelog(self._repositories()).render_backfill())
@@ -0,0 +1,193 @@
+import shutil
+import tempfile
+import unittest
+import subprocess
+from unittest.mock import patch
+import git
+from .fixtures.synthetic_repo import SyntheticRepo, build_default_repo
+from .test_git_helper import summarise
+from samsgeneratechangelog.githelper import GitHelper
+
+
+def build_rename_repo():
+    """Build a repository whose commits need every step of rename detection."""
+    repo = SyntheticRepo()
+    paragraphs = {
+        name: ''.join(f'{name} line {number}\n' for number in range(30))
+        for name in ('alpha', 'beta', 'gamma', 'delta')
+    }
+    repo.commit('Initial commit', files={
+        'src/alpha.py': paragraphs['alpha'],
+        'src/beta.py': paragraphs['beta'],
+        'src/gamma.py': paragraphs['gamma'],
+        'docs/delta.txt': paragraphs['delta'].replace('\n', '\r\n'),
+        'copy_a.txt': 'same\n',
+        'copy_b.txt': 'same\n',
+        'binary.dat': '\0binary\0' * 20,
+    }, symlinks={'link': 'src/alpha.py'})
+    repo.tag('start', message='Annotated start tag\n')
+    repo.commit('Moved and edited', files={
+        'lib/alpha.py': paragraphs['alpha'] + 'one more line\n',
+        'lib/renamed_beta.py': paragraphs['beta'].replace('line 3\n', 'line three\n'),
+        'docs/delta.md': paragraphs['delta'].replace('line 1\n', 'line one\n').replace('\n', '\r\n'),
+        'copy_c.txt': 'same\n',
+        'binary.bin': '\0binary\0' * 20,
+    }, delete=['src/alpha.py', 'src/beta.py', 'docs/delta.txt', 'copy_a.txt', 'binary.dat'])
+    repo.commit('Rewrote gamma and replaced the link', files={
+        'src/gamma.py': 'entirely new content\n', 'link': 'no longer a link\n',
+    })
+    repo.commit('Added a folder where a file was', delete=['copy_b.txt'], files={'copy_b.txt/nested': 'nested\n'})
+    repo.tag('end')
+    repo.build()
+    return repo
+
+
+class TestNativeGit(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def assert_backends_match(self, path, rev_a, rev_b, **kwargs):
+        expected = summarise(GitHelper(path=path).commit_log(rev_a, rev_b))
+        gh = GitHelper(path=path, git_backend='native', **kwargs)
+        file_commits = list(gh.commit_log(rev_a, rev_b))
+
+        assert summarise(file_commits) == expected
+        assert [fc.hexsha_short for fc in file_commits] == [gh.git.rev_parse(fc.hexsha, short=7) for fc in file_commits]
+        return file_commits
+
+    def test_commit_log_matches_subprocess_backend(self):
+        file_commits = self.assert_backends_match(self.synthetic_repo.path, '0.0.1', '0.0.2')
+
+        assert len(file_commits) == 12
+
+    def test_commit_log_matches_subprocess_backend_in_reverse(self):
+        self.assert_backends_match(self.synthetic_repo.path, '0.0.2', '0.0.1')
+
+    def test_commit_log_runs_no_git_processes(self):
+        gh = GitHelper(path=self.synthetic_repo.path, git_backend='native')
+
+        with patch.object(git.cmd.Git, 'execute', side_effect=AssertionError('git executed')), \
+                patch.object(subprocess, 'Popen', side_effect=AssertionError('process started')):
+            file_commits = list(gh.commit_log('0.0.1', 'master'))
+            summaries = [(fc.hexsha_short, fc.author.name, fc.summary, fc.committed_date) for fc in file_commits]
+
+        assert len(summaries) == 12
+
+    def test_commit_log_reads_loose_objects(self):
+        repo = build_default_repo()
+        try:
+            repo.unpack()
+            self.assert_backends_match(repo.path, '0.0.1', '0.0.2')
+        finally:
+            repo.cleanup()
+
+    def test_commit_log_reads_offset_and_ref_deltas(self):
+        repo = build_rename_repo()
+        try:
+            for config in (['repack.useDeltaBaseOffset=true'], ['repack.useDeltaBaseOffset=false']):
+                repo.repack('-f', '--depth=50', config=config)
+                self.assert_backends_match(repo.path, 'start', 'end')
+        finally:
+            repo.cleanup()
+
+    def test_commit_log_detects_renames_as_git_does(self):
+        repo = build_rename_repo()
+        try:
+            file_commits = self.assert_backends_match(repo.path, 'start', 'end')
+        finally:
+            repo.cleanup()
+
+        renames = {fc.file_path for fc in file_commits if fc.change_type == 'R'}
+        assert renames == {
+            'lib/alpha.py', 'lib/renamed_beta.py', 'docs/delta.md', 'copy_c.txt', 'binary.bin'
+        }
+        assert ('link', 'T') in [(fc.file_path, fc.change_type) for fc in file_commits]
+
+    def test_commit_log_rename_detection_options_match_git(self):
+        repo = build_rename_repo()
+        renames = {}
+        try:
+            for options in ({'detect_renames': False}, {'rename_threshold': 100}, {'rename_threshold': 95},
+                            {'rename_threshold': 10}, {'rename_limit': 1}, {'rename_limit': 0}):
+                expected = summarise(GitHelper(path=repo.path, **options).commit_log('start', 'end'))
+                for git_backend in ('batch', 'native'):
+                    gh = GitHelper(path=repo.path, git_backend=git_backend, **options)
+                    assert summarise(gh.commit_log('start', 'end')) == expected, (git_backend, options)
+                    gh.close()
+                renames[tuple(options.items())] = {fc[2] for fc in expected if fc[3] == 'R'}
+        finally:
+            repo.cleanup()
+
+        assert renames[(('detect_renames', False),)] == set()
+        assert renames[(('rename_threshold', 100),)] == {'copy_c.txt', 'binary.bin'}
+        # Files which kept their name are still paired beyond the limit
+        assert renames[(('rename_limit', 1),)] == {'copy_c.txt', 'binary.bin', 'lib/alpha.py'}
+
+    def test_commit_log_with_jobs_and_cache_matches_subprocess_backend(self):
+        cache_dir = tempfile.mkdtemp(prefix='sgc-cache-')
+        try:
+            for _ in range(2):
+                self.assert_backends_match(
+                    self.synthetic_repo.path, '0.0.1', '0.0.2', jobs=2, use_cache=True, cache_dir=cache_dir
+                )
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def test_resolve_matches_rev_parse(self):
+        gh = GitHelper(path=self.synthetic_repo.path, git_backend='native')
+        revisions = [
+            'HEAD', 'master', 'refs/heads/feature', '0.0.2', 'HEAD~3', 'HEAD~3^2', 'HEAD^^',
+            'HEAD~1^{commit}', self.synthetic_repo.sha(4)[:9], self.synthetic_repo.sha(5)
+        ]
+
+        for revision in revisions:
+            assert gh.native.resolve(revision) == gh.git.rev_parse(f'{revision}^{{commit}}'), revision
+
+    def test_resolve_rereads_packed_refs(self):
+        repo = build_default_repo()
+        self.addCleanup(repo.cleanup)
+        subprocess.run(['git', 'pack-refs', '--all'], cwd=repo.path, check=True)
+        gh = GitHelper(path=repo.path, git_backend='native')
+        assert gh.resolve_commits(['master']) == [repo.sha(9)]
+
+        mark = repo.commit('JIRA-100 - Added a module', files={'module.py': 'module = True\n'}, parent=9)
+        repo.build()
+        subprocess.run(['git', 'pack-refs', '--all'], cwd=repo.path, check=True)
+
+        assert gh.resolve_commits(['master']) == [repo.sha(mark)]
+
+    def test_resolve_unknown_revision_raises(self):
+        gh = GitHelper(path=self.synthetic_repo.path, git_backend='native')
+
+        with self.assertRaises(git.BadName):
+            gh.native.resolve('no-such-ref')
+
+    def test_unsupported_revisions_raise(self):
+        gh = GitHelper(path=self.synthetic_repo.path, git_backend='native')
+
+        for revision in ('master@{1}', ':/Merge', '@{-1}'):
+            with self.assertRaises(git.BadName):
+                gh.native.resolve(revision)
+
+    def test_replacement_objects_are_refused(self):
+        repo = build_default_repo()
+        self.addCleanup(repo.cleanup)
+        subprocess.run(['git', 'replace', repo.sha(8), repo.sha(7)], cwd=repo.path, check=True)
+
+        with self.assertRaises(ValueError):
+            GitHelper(path=repo.path, git_backend='native')
+        subprocess.run(['git', 'pack-refs', '--all'], cwd=repo.path, check=True)
+        with self.assertRaises(ValueError):
+            GitHelper(path=repo.path, git_backend='native')
+        with patch.dict('os.environ', {'GIT_NO_REPLACE_OBJECTS': '1'}):
+            self.assert_backends_match(repo.path, '0.0.1', '0.0.2')
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            GitHelper(path=self.synthetic_repo.path, git_backend='telepathy')
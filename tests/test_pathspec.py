@@ -0,0 +1,48 @@
+import unittest
+from samsgeneratechangelog.pathspec import Pathspec
+
+
+class TestPathspec(unittest.TestCase):
+
+    def test_paths_include_everything_within_them(self):
+        pathspec = Pathspec(['./docs/', 'setup.py'])
+
+        assert pathspec.matches(b'docs/index.rst')
+        assert pathspec.matches(b'docs/source/index.rst')
+        assert pathspec.matches(b'setup.py')
+        assert not pathspec.matches(b'docsrc/index.rst')
+        assert not pathspec.matches(b'setup.py.bak')
+
+    def test_glob_wildcards_match_slashes(self):
+        pathspec = Pathspec(['templates/*.j2'], ['*/change_*'])
+
+        assert pathspec.matches(b'templates/author.j2')
+        assert pathspec.matches(b'templates/nested/author.j2')
+        assert not pathspec.matches(b'templates/change_type.j2')
+        assert not pathspec.matches(b'README.md')
+
+    def test_folders_are_only_entered_if_they_may_match(self):
+        pathspec = Pathspec(['docs/source', 'templates/*.j2'], ['docs/source/build'])
+
+        assert pathspec.may_match_within(b'docs/')
+        assert pathspec.may_match_within(b'docs/source/')
+        assert pathspec.may_match_within(b'templates/nested/')
+        assert not pathspec.may_match_within(b'feature/')
+        assert not pathspec.may_match_within(b'docs/other/')
+        assert not pathspec.may_match_within(b'docs/source/build/')
+
+    def test_exclude_only(self):
+        pathspec = Pathspec(exclude_paths=['docs'])
+
+        assert pathspec
+        assert pathspec.matches(b'README.md')
+        assert not pathspec.matches(b'docs/index.rst')
+        assert pathspec.args == [':(exclude)docs']
+        assert not Pathspec()
+
+    def test_args(self):
+        assert Pathspec(['.', 'docs/'], ['*.md']).args == ['.', 'docs', ':(exclude)*.md']
+
+    def test_magic_raises(self):
+        with self.assertRaises(ValueError):
+            Pathspec([':(icase)docs'])
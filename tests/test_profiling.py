@@ -0,0 +1,123 @@
+import io
+import os
+import json
+import time
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch
+from samsgeneratechangelog import profiling
+from samsgeneratechangelog.decorators import DebugOutput
+from samsgeneratechangelog.__main__ import main
+from .fixtures.synthetic_repo import build_default_repo
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_nothing_is_recorded_unless_profiling(self):
+        iterable = [1, 2]
+
+        with profiling.stage('render'):
+            profiling.count('commits')
+
+        assert profiling.profiler is None
+        assert profiling.timed('diffs', iterable) is iterable
+        assert profiling.call('custom_attributes', len, iterable) == 2
+
+    def test_nested_stages_exclude_their_children_from_self_time(self):
+        with profiling.profile() as profiler:
+            with profiling.stage('render'):
+                with profiling.stage('diffs'):
+                    time.sleep(0.02)
+            profiling.count('commits', 3)
+            profiling.count('commits')
+
+        stages = profiler.summary()['stages']
+        assert list(stages) == ['diffs', 'render']
+        assert stages['render']['seconds'] >= 0.02
+        assert stages['render']['self_seconds'] < 0.02
+        assert profiler.summary()['counters'] == {'commits': 4}
+        assert profiling.profiler is None
+
+    def test_timed_iteration(self):
+        def generate():
+            try:
+                yield from range(5)
+            finally:
+                closed.append(True)
+        closed = []
+
+        with profiling.profile() as profiler:
+            iterator = profiling.timed('log_walk', generate())
+            assert next(iterator) == 0
+            iterator.close()
+
+        assert closed == [True]
+        assert profiler.summary()['stages']['log_walk']['calls'] == 1
+
+    def test_chrome_trace(self):
+        with profiling.profile() as profiler:
+            with profiling.stage('file_write'):
+                profiling.count('git_processes', 2)
+
+        events = profiler.chrome_trace()['traceEvents']
+        assert [event['ph'] for event in events] == ['X', 'C']
+        assert events[0]['name'] == 'file_write' and events[0]['dur'] >= 0
+        assert events[1]['args'] == {'git_processes': 2}
+
+
+@patch.dict('os.environ', {'TZ': 'UTC'})
+class TestProfileArguments(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def _main(self, *args):
+        argv = [
+            'test.py', 'print', '--git-path', self.synthetic_repo.path, '--start-ref', '0.0.1', '--end-ref', '0.0.2',
+            '--var', 'header_text', '0.0.2', '--no-cache', *args
+        ]
+        with patch('sys.stdout'), patch('sys.stderr', new_callable=io.StringIO) as mock_stderr, \
+                patch('argparse._sys.argv', argv):
+            main()
+        return mock_stderr.getvalue()
+
+    def test_profile(self):
+        summary = json.loads(self._main('--profile', '--custom-attributes', '{"jira_id": {"derived_from": "message", '
+                                        '"pattern": "^\\\\w+-\\\\d+"}}'))
+
+        assert {'setup', 'log_walk', 'custom_attributes', 'template_compile', 'render'} <= set(summary['stages'])
+        assert summary['counters']['commits'] == 8
+        assert summary['counters']['merge_commits_skipped'] == 1
+        assert summary['counters']['git_processes'] >= 1
+        assert summary['counters']['file_commits'] > 0
+
+    def test_profile_trace(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            trace_path = os.path.join(temp_dir, 'trace.json')
+            summary = json.loads(self._main('--git-backend', 'native', '--profile-trace', trace_path))
+            with open(trace_path) as reader:
+                trace = json.load(reader)
+
+        assert 'git_processes' not in summary['counters']
+        assert {event['name'] for event in trace['traceEvents']} >= {'resolve_refs', 'diffs', 'render', 'counters'}
+
+    def test_no_profile(self):
+        assert self._main() == ''
+
+
+class TestDebugOutput(unittest.TestCase):
+
+    def test_generators_are_counted_once_exhausted(self):
+        @DebugOutput
+        def generate():
+            yield from 'abc'
+
+        with self.assertLogs(level=logging.DEBUG) as logs:
+            assert list(generate()) == ['a', 'b', 'c']
+        assert logs.output == ['DEBUG:root:Returned 3 values from generate']
@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.client import HTTPConnection
+from unittest.mock import patch
+from .fixtures.synthetic_repo import build_default_repo
+from samsgeneratechangelog.generatechangelog import GenerateChangelog
+from samsgeneratechangelog.githelper import GitHelper
+from samsgeneratechangelog.server import ChangelogServer, create_http_server
+
+
+class TestChangelogServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def setUp(self):
+        self.server = ChangelogServer(git_path=self.synthetic_repo.path, template_variables={'header_text': '0.0.2'})
+        self.addCleanup(self.server.close)
+
+    def _expected(self, start_ref='0.0.1', end_ref='0.0.2', **kwargs):
+        return GenerateChangelog(
+            git_path=self.synthetic_repo.path, start_ref=start_ref, end_ref=end_ref,
+            template_variables={'header_text': '0.0.2'}, **kwargs
+        ).render_markdown()
+
+    def test_render_matches_generate_changelog(self):
+        assert self.server.render(start_ref='0.0.1', end_ref='0.0.2') == self._expected()
+        assert self.server.render(
+            start_ref='0.0.1', end_ref='0.0.2', template_name='change_type_all_commits'
+        ) == self._expected(template_name='change_type_all_commits')
+
+    def test_commits_are_only_read_once(self):
+        self.server.render(start_ref='0.0.1', end_ref='0.0.2')
+
+        with patch.object(GitHelper, '_stream_log', side_effect=AssertionError('commit read from git')):
+            result = self.server.render(start_ref='0.0.1', end_ref='0.0.2', template_variables={'header_text': 'x'})
+
+        assert result.startswith('# x')
+
+    def test_repeated_requests_are_not_rendered_again(self):
+        first = self.server.render(start_ref='0.0.1', end_ref='0.0.2')
+
+        with patch.object(GenerateChangelog, '_render', side_effect=AssertionError('rendered again')):
+            assert self.server.render(start_ref='0.0.1', end_ref='0.0.2') == first
+
+    def test_new_commits_are_noticed(self):
+        repo = self.synthetic_repo
+        git_path = repo.path
+        self.addCleanup(subprocess.run, ['git', 'update-ref', 'refs/heads/master', repo.sha(9)], cwd=git_path)
+        assert self.server.render(start_ref='0.0.1', end_ref='master') == self._expected(end_ref='master')
+
+        subprocess.run(['git', 'update-ref', 'refs/heads/master', repo.sha(3)], cwd=git_path, check=True)
+
+        assert self.server.render(start_ref='0.0.1', end_ref='master') == self._expected(end_ref=repo.sha(3))
+
+    def test_moved_refs_are_not_cached_under_their_new_commit(self):
+        repo = self.synthetic_repo
+        self.addCleanup(subprocess.run, ['git', 'update-ref', 'refs/heads/master', repo.sha(9)], cwd=repo.path)
+        resolve_commits = GitHelper.resolve_commits
+
+        def resolve_then_move(git_helper, revisions):
+            hexshas = resolve_commits(git_helper, revisions)
+            subprocess.run(['git', 'update-ref', 'refs/heads/master', repo.sha(3)], cwd=repo.path, check=True)
+            return hexshas
+
+        with patch.object(GitHelper, 'resolve_commits', resolve_then_move):
+            assert self.server.render(start_ref='0.0.1', end_ref='master') == self._expected(end_ref=repo.sha(9))
+
+    def test_bad_requests_raise(self):
+        with self.assertRaises(ValueError):
+            self.server.render(start_ref='0.0.1', end_ref='0.0.2', template='author')
+        with self.assertRaises(ValueError):
+            self.server.render(start_ref='0.0.1')
+
+    def test_requests_can_not_choose_files(self):
+        for request in (
+            {'template_file': '/etc/hostname'},
+            {'git_path': '/'},
+            {'template_name': '../../../tests/fixtures/custom_template'},
+        ):
+            with self.assertRaises(ValueError):
+                self.server.render(start_ref='0.0.1', end_ref='0.0.2', **request)
+
+
+class TestHTTPServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic_repo = build_default_repo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.synthetic_repo.cleanup()
+
+    def _serve(self, **kwargs):
+        changelog_server = ChangelogServer(git_path=self.synthetic_repo.path, template_variables={'header_text': 'v'})
+        http_server = create_http_server(changelog_server, **kwargs)
+        thread = threading.Thread(target=http_server.serve_forever)
+        thread.start()
+        self.addCleanup(changelog_server.close)
+        self.addCleanup(http_server.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(http_server.shutdown)
+        return http_server
+
+    def _post(self, url, request):
+        data = json.dumps(request).encode('utf-8')
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=data, method='POST')) as response:
+                return response.status, response.read().decode('utf-8')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode('utf-8')
+
+    def test_render_over_tcp(self):
+        url = 'http://127.0.0.1:{}'.format(self._serve(port=0).server_address[1])
+
+        with urllib.request.urlopen(f'{url}/health') as response:
+            assert response.read() == b'ok\n'
+        status, result = self._post(f'{url}/render', {'start_ref': '0.0.1', 'end_ref': '0.0.2'})
+        assert status == 200
+        assert result.startswith('# v')
+        assert 'docs/index.rst' in result
+        status, result = self._post(f'{url}/render', {'start_ref': 'no-such-ref', 'end_ref': '0.0.2'})
+        assert status == 400
+        status, result = self._post(f'{url}/render', ['0.0.1', '0.0.2'])
+        assert (status, result) == (400, 'The request must be a JSON object\n')
+
+    def test_refs_which_look_like_options_are_rejected(self):
+        url = 'http://127.0.0.1:{}'.format(self._serve(port=0).server_address[1])
+        output_dir = tempfile.mkdtemp(prefix='sgc-output-')
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+
+        for request in (
+            {'start_ref': f'--output={output_dir}/written', 'end_ref': '0.0.2'},
+            {'start_ref': '0.0.1', 'end_ref': f'--output={output_dir}/written'},
+            {'start_ref': '0.0.1', 'end_ref': 2},
+        ):
+            status, _ = self._post(f'{url}/render', request)
+            assert status == 400, request
+        assert os.listdir(output_dir) == []
+
+    def test_render_over_unix_socket(self):
+        socket_dir = tempfile.mkdtemp(prefix='sgc-socket-')
+        self.addCleanup(shutil.rmtree, socket_dir, ignore_errors=True)
+        socket_path = os.path.join(socket_dir, 'sgc.sock')
+        self._serve(socket_path=socket_path)
+
+        connection = UnixHTTPConnection(socket_path)
+        connection.request('POST', '/render', body=json.dumps({'start_ref': '0.0.1', 'end_ref': '0.0.2'}))
+        response = connection.getresponse()
+
+        assert response.status == 200
+        assert response.read().decode('utf-8').startswith('# v')
+        connection.close()
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """An HTTPConnection to a server listening on a Unix socket."""
+
+    def __init__(self, socket_path):
+        super().__init__('localhost')
+        self.socket_path = socket_path
+
+    def connect(self):
+        import socket
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
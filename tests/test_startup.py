@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import unittest
+import subprocess
+from .fixtures.synthetic_repo import build_default_repo
+from samsgeneratechangelog.constants import TEMPLATES_DIR, TEMPLATE_NAMES
+
+PACKAGE_ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+# How much longer than starting Python itself `sgc --help` may take
+STARTUP_BUDGET_SECONDS = 0.15
+HELP = '''
+import sys
+sys.argv = ['sgc', '--help']
+from samsgeneratechangelog.__main__ import main
+try:
+    main()
+except SystemExit:
+    pass
+print(','.join(module for module in ('git', 'jinja2') if module in sys.modules), file=sys.stderr)
+'''
+
+EXPORT = '''
+import sys
+sys.argv = ['sgc', 'export', '--git-path', sys.argv[1], '--start-ref', '0.0.1', '--end-ref', '0.0.2', '--no-cache']
+from samsgeneratechangelog.__main__ import main
+main()
+print(','.join(module for module in ('jinja2',) if module in sys.modules), file=sys.stderr)
+'''
+
+
+def run_python(code, *args):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', code, *args],
+        cwd=PACKAGE_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True
+    )
+    return time.perf_counter() - started, result.stderr.decode().strip()
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_help_does_not_import_git_or_jinja(self):
+        _, imported = run_python(HELP)
+
+        assert imported == ''
+
+    def test_help_is_within_startup_budget(self):
+        python_time = min(run_python('pass')[0] for _ in range(3))
+        help_time = min(run_python(HELP)[0] for _ in range(3))
+
+        assert help_time - python_time < STARTUP_BUDGET_SECONDS, f'{help_time:.3f}s vs {python_time:.3f}s'
+
+    def test_export_does_not_import_jinja(self):
+        synthetic_repo = build_default_repo()
+        self.addCleanup(synthetic_repo.cleanup)
+
+        _, imported = run_python(EXPORT, synthetic_repo.path)
+
+        assert imported == ''
+
+    def test_template_names_match_bundled_templates(self):
+        bundled = sorted(os.path.splitext(file_name)[0] for file_name in os.listdir(TEMPLATES_DIR))
+
+        assert list(TEMPLATE_NAMES) == bundled
@@ -0,0 +1,129 @@
+import asyncio
+import subprocess
+import unittest
+from unittest.mock import Mock, patch
+from .fixtures.synthetic_repo import build_default_repo, build_merged_branch_repo
+from .test_git_helper import summarise
+from samsgeneratechangelog import GenerateChangelog
+from samsgeneratechangelog.githelper import GitHelper
+from samsgeneratechangelog.watch import WatchedChangelog
+
+
+class TestWatchedChangelog(unittest.TestCase):
+
+    def setUp(self):
+        self.repo = build_default_repo()
+        self.options = dict(
+            git_path=self.repo.path, start_ref='0.0.1', end_ref='master', template_name='author_all_commits'
+        )
+
+    def tearDown(self):
+        self.repo.cleanup()
+
+    def _add_commits(self):
+        self.repo.commit('JIRA-100 - Added a module', files={'module.py': 'module = True\n'}, parent=9)
+        self.repo.commit('JIRA-101 - Edited the readme', files={'README.md': '# Edited\n'},
+                         author=('Jane Doe', 'jane@example.com'))
+        self.repo.build()
+
+    def _assert_matches_fresh_changelog(self, changelog):
+        fresh = GenerateChangelog(**self.options)
+        assert summarise(changelog._file_commits()) == summarise(fresh._file_commits())
+        assert changelog.render_markdown() == fresh.render_markdown()
+
+    def test_refresh_only_reads_new_commits(self):
+        changelog = WatchedChangelog(**self.options)
+        changelog.render_markdown()
+        self._add_commits()
+
+        with patch.object(GitHelper, 'commit_log', side_effect=AssertionError('Read every commit')):
+            assert changelog.refresh() is True
+        assert changelog.refresh() is False
+        self._assert_matches_fresh_changelog(changelog)
+
+    def test_refresh_rereads_every_commit_when_the_end_is_rewound(self):
+        changelog = WatchedChangelog(**self.options)
+        changelog.refresh()
+        subprocess.run(['git', 'update-ref', 'refs/heads/master', self.repo.sha(8)], cwd=self.repo.path, check=True)
+
+        assert changelog.refresh() is True
+        self._assert_matches_fresh_changelog(changelog)
+
+    def test_refresh_rereads_every_commit_when_the_start_moves(self):
+        changelog = WatchedChangelog(**dict(self.options, start_ref='feature'))
+        changelog.refresh()
+        self._add_commits()
+        subprocess.run(['git', 'update-ref', 'refs/heads/feature', self.repo.sha(5)], cwd=self.repo.path, check=True)
+
+        assert changelog.refresh() is True
+        fresh = GenerateChangelog(**dict(self.options, start_ref='feature'))
+        assert summarise(changelog._file_commits()) == summarise(fresh._file_commits())
+
+    def test_poll_only_runs_git_when_a_ref_moves(self):
+        changelog = WatchedChangelog(**self.options)
+        assert changelog.poll() is True
+
+        with patch.object(GitHelper, 'resolve_commits', side_effect=AssertionError('Ran git')):
+            assert changelog.poll() is False
+        self._add_commits()
+        assert changelog.poll() is True
+        self._assert_matches_fresh_changelog(changelog)
+
+    def test_poll_notices_packed_refs_with_the_native_backend(self):
+        changelog = WatchedChangelog(git_backend='native', **self.options)
+        subprocess.run(['git', 'pack-refs', '--all'], cwd=self.repo.path, check=True)
+        assert changelog.poll() is True
+
+        self._add_commits()
+        subprocess.run(['git', 'pack-refs', '--all'], cwd=self.repo.path, check=True)
+
+        assert changelog.poll() is True
+        self._assert_matches_fresh_changelog(changelog)
+
+    def test_watch_calls_on_change_when_a_ref_moves(self):
+        changelog = WatchedChangelog(poll_interval=0, **self.options)
+        on_change = Mock()
+
+        changelog.watch(on_change, polls=2)
+
+        on_change.assert_called_once_with(changelog)
+
+    def test_render_markdown_async_matches_render_markdown(self):
+        changelog = WatchedChangelog(**self.options)
+
+        assert asyncio.run(changelog.render_markdown_async()) == GenerateChangelog(**self.options).render_markdown()
+
+
+class TestWatchedChangelogFirstParent(unittest.TestCase):
+
+    def setUp(self):
+        self.repo = build_merged_branch_repo()
+        self.options = dict(git_path=self.repo.path, start_ref='0.0.1', end_ref='master', first_parent=True)
+
+    def tearDown(self):
+        self.repo.cleanup()
+
+    def test_refresh_includes_a_branch_merged_into_the_end(self):
+        changelog = WatchedChangelog(**self.options)
+        changelog.refresh()
+        self.repo.commit('JIRA-4 - Other work', files={'other.py': 'other = 1\n'}, branch='other', parent=6)
+        self.repo.commit('Merge JIRA-4', files={'other.py': 'other = 1\n'}, branch='master', parent=6, merge=[7])
+        self.repo.build()
+
+        assert changelog.refresh() is True
+        fresh = GenerateChangelog(**self.options)
+        assert summarise(changelog._file_commits()) == summarise(fresh._file_commits())
+
+    def test_refresh_rereads_every_commit_when_the_end_is_no_longer_first_parent_of_the_new_end(self):
+        changelog = WatchedChangelog(**self.options)
+        changelog.refresh()
+        self.repo.commit('JIRA-4 - Other work', files={'other.py': 'other = 1\n'}, branch='other', parent=1)
+        merge = self.repo.commit('Merge master', files={'setup.py': 'setup()\n'}, branch='other', merge=[6])
+        self.repo.build()
+        subprocess.run(['git', 'update-ref', 'refs/heads/master', self.repo.sha(merge)], cwd=self.repo.path, check=True)
+
+        with patch.object(GitHelper, 'commit_log', wraps=changelog.git_helper.commit_log) as commit_log:
+            assert changelog.refresh() is True
+        commit_log.assert_called_once()
+        fresh = GenerateChangelog(**self.options)
+        assert summarise(changelog._file_commits()) == summarise(fresh._file_commits())